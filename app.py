@@ -82,8 +82,43 @@ def create_app(config_name='default'):
     with app.app_context():
         try:
             print("📊 Cargando modelo de predicción LSTM...")
-            app.modelo = get_modelo()
+            socket_inferencia = app.config.get('SOCKET_INFERENCIA')
+            app.modelo = get_modelo(
+                motor_inferencia=app.config.get('MOTOR_INFERENCIA'),
+                fusionado=app.config.get('INFERENCIA_FUSIONADA'),
+                # Con servidor de inferencia el modelo local solo carga sus redes si el servidor cae
+                carga_diferida=True if socket_inferencia else app.config.get('CARGA_DIFERIDA_MODELOS'),
+                precalentar=False if socket_inferencia else app.config.get('PRECALENTAR_MODELOS'),
+                arquitectura=app.config.get('ARQUITECTURA_MODELO'),
+                microbatch=app.config.get('MICROBATCH_INFERENCIA'),
+                microbatch_espera_ms=app.config.get('MICROBATCH_ESPERA_MS'),
+                microbatch_max_lote=app.config.get('MICROBATCH_MAX_LOTE')
+            )
+            if socket_inferencia:
+                from models.servidor_inferencia import ClienteInferencia
+                app.modelo = ClienteInferencia(socket_inferencia, app.modelo, app.config.get('TIMEOUT_INFERENCIA', 30))
+                print(f"🔌 Predicciones delegadas al servidor de inferencia ({socket_inferencia})")
             print("✅ Modelo de predicción cargado exitosamente")
+            
+            # Resumen de /info calculado una vez por versión del modelo
+            from services.info_modelo_service import servicio_info_modelo
+            servicio_info_modelo.registrar(app.modelo)
+            
+            # Llenar el caché con el horizonte de pronóstico en segundo plano
+            # (con servidor de inferencia lo hace el servidor)
+            if app.config.get('PRECALCULAR_HORIZONTE') and not socket_inferencia:
+                from services.precalculo_service import servicio_precalculo
+                servicio_precalculo.horizonte = app.config.get('HORIZONTE_PRECALCULO', 24)
+                servicio_precalculo.registrar(app.modelo)
+            
+            # Comparar el pronóstico con las incidencias registradas (lecturas incrementales)
+            if app.config.get('MONITOR_DERIVA'):
+                from services.deriva_service import servicio_deriva
+                servicio_deriva.umbral = app.config.get('UMBRAL_DERIVA', 2.0)
+                servicio_deriva.ventana = app.config.get('VENTANA_DERIVA_MESES', 6)
+                servicio_deriva.reentrenar = app.config.get('REENTRENAR_POR_DERIVA', True)
+                servicio_deriva.marca_inicial = app.config.get('MARCA_AGUA_DERIVA')
+                servicio_deriva.registrar(app.modelo, app.config.get('INTERVALO_DERIVA_HORAS', 24))
         except Exception as e:
             print(f"⚠️  Advertencia: No se pudo cargar el modelo de predicción")
             print(f"   Razón: {e}")
@@ -163,6 +198,7 @@ def create_app(config_name='default'):
         return {
             'status': 'healthy',
             'modelo_cargado': app.modelo is not None and app.modelo.trained if hasattr(app, 'modelo') else False,
+            'version_modelo': app.modelo.version_modelo if getattr(app, 'modelo', None) else None,
             'version': '2.0'
         }
     
@@ -230,6 +266,12 @@ def create_app(config_name='default'):
 # ============================================
 # CREAR APLICACIÓN
 # ============================================
+if __name__ == '__main__':
+    # Antes de crear la aplicación: los procesos spawn de los pools de
+    # entrenamiento no deben re-ejecutar este script
+    from models.procesos_entrenamiento import sin_reimportar_main
+    sin_reimportar_main()
+
 app = create_app()
 
 
@@ -46,6 +46,28 @@ class Config:
     DATA_DIR = 'datos_procesados'
     CACHE_DIR = 'cache_predicciones'
     DATASET_PATH = 'dataset_incidencias_reque_2015_2024.csv'
+    MOTOR_INFERENCIA = os.environ.get('MOTOR_INFERENCIA') or 'keras'  # 'keras' | 'numpy' | 'plano'
+    INFERENCIA_FUSIONADA = os.environ.get('INFERENCIA_FUSIONADA', 'false').lower() == 'true'
+    CARGA_DIFERIDA_MODELOS = os.environ.get('CARGA_DIFERIDA_MODELOS', 'false').lower() == 'true'
+    PRECALENTAR_MODELOS = os.environ.get('PRECALENTAR_MODELOS', 'false').lower() == 'true'
+    ARQUITECTURA_MODELO = os.environ.get('ARQUITECTURA_MODELO') or 'por_tipo'  # 'por_tipo' | 'global'
+    PROCESOS_ENTRENAMIENTO = int(os.environ.get('PROCESOS_ENTRENAMIENTO', 1))  # 1 = secuencial
+    BATCH_SIZE_ENTRENAMIENTO = int(os.environ.get('BATCH_SIZE_ENTRENAMIENTO', 16))
+    JIT_ENTRENAMIENTO = os.environ.get('JIT_ENTRENAMIENTO', 'false').lower() == 'true'  # pasos compilados con XLA
+    MICROBATCH_INFERENCIA = os.environ.get('MICROBATCH_INFERENCIA', 'false').lower() == 'true'  # lotes entre solicitudes
+    MICROBATCH_ESPERA_MS = float(os.environ.get('MICROBATCH_ESPERA_MS', 5))
+    MICROBATCH_MAX_LOTE = int(os.environ.get('MICROBATCH_MAX_LOTE', 32))
+    PRECALCULAR_HORIZONTE = os.environ.get('PRECALCULAR_HORIZONTE', 'true').lower() == 'true'  # tras cargar/reentrenar
+    HORIZONTE_PRECALCULO = int(os.environ.get('HORIZONTE_PRECALCULO', 24))  # meses
+    SOCKET_INFERENCIA = os.environ.get('SOCKET_INFERENCIA') or None  # servidor de inferencia compartido (None = en proceso)
+    TIMEOUT_INFERENCIA = float(os.environ.get('TIMEOUT_INFERENCIA', 30))  # segundos por solicitud al servidor
+    MONITOR_DERIVA = os.environ.get('MONITOR_DERIVA', 'false').lower() == 'true'  # pronóstico vs. tabla incidencia
+    UMBRAL_DERIVA = float(os.environ.get('UMBRAL_DERIVA', 2.0))  # MAE móvil / MAE de validación que dispara el reentrenamiento
+    VENTANA_DERIVA_MESES = int(os.environ.get('VENTANA_DERIVA_MESES', 6))
+    INTERVALO_DERIVA_HORAS = float(os.environ.get('INTERVALO_DERIVA_HORAS', 24))
+    REENTRENAR_POR_DERIVA = os.environ.get('REENTRENAR_POR_DERIVA', 'true').lower() == 'true'
+    # id_incidencia desde el que empieza la primera ingesta (None = primera incidencia posterior al histórico)
+    MARCA_AGUA_DERIVA = int(os.environ['MARCA_AGUA_DERIVA']) if os.environ.get('MARCA_AGUA_DERIVA') else None
     
     # DBSCAN
     DBSCAN_DEFAULT_EPS = 50
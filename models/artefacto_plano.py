@@ -0,0 +1,385 @@
+"""
+models/artefacto_plano.py
+Artefacto plano: todas las redes en un solo archivo cuantizado y mapeable en memoria
+
+Cargar 18 archivos .keras significa abrir 18 zips, parsear 18 HDF5 (h5py) y
+copiar los pesos a memoria privada de cada proceso. El artefacto plano guarda
+los pesos de todas las redes (y los scalers) en un único archivo:
+
+  MAGIA (8 bytes) | largo del índice ('<Q') | índice JSON | bloques alineados a 64 bytes
+
+  - float32 (default): los pesos se usan tal cual desde el mapeo
+  - float16: la mitad del tamaño
+  - int8: kernels con una escala float32 por columna (simétrica); bias en float32
+
+En todas las precisiones los pesos quedan en el mapeo (vistas de solo lectura):
+las páginas las comparte el sistema operativo entre todos los procesos. Con
+float16 e int8 el forward descuantiza capa por capa en arreglos temporales
+(ver RedPlana), lo que agrega ~0.8 ms por red y paso: el archivo es más chico
+a cambio de latencia.
+
+Lo usa el motor de inferencia 'plano' de ModeloPrediccionIncidencias. El índice
+guarda la versión del modelo exportada: si no coincide con la versión en disco
+el motor vuelve a leer los .keras.
+
+Ejecutar desde la raíz del proyecto:
+  python -m models.artefacto_plano exportar [--precision float16]
+  python -m models.artefacto_plano verificar
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import threading
+
+import numpy as np
+
+from models.inferencia_numpy import RedLSTMNumpy, _forward
+
+ARCHIVO_PLANO = 'modelos_planos.bin'
+PRECISIONES = ('float32', 'float16', 'int8')
+PRECISION_DEFAULT = 'float32'
+MAGIA = b'MPLANO01'
+ALINEACION = 64
+
+# Máximo aumento del MAE de validación (en incidencias) frente a los pesos float32
+TOLERANCIA_MAE = 0.05
+
+_LARGO_INDICE = struct.Struct('<Q')
+_CLAVES_ARREGLO = ('kernel', 'recurrent_kernel', 'bias')
+
+
+def _nombre_red(ruta):
+    """den_tipo_3.keras → den_tipo_3"""
+    return os.path.splitext(os.path.basename(ruta))[0]
+
+
+def _cuantizar(arreglo, precision):
+    """Retorna (datos, escala o None) según la precisión"""
+    if precision == 'float32' or arreglo.ndim != 2:
+        return arreglo.astype(np.float32), None
+    if precision == 'float16':
+        return arreglo.astype(np.float16), None
+
+    # int8 simétrico por columna (cada unidad de salida tiene su escala)
+    escala = np.abs(arreglo).max(axis=0) / 127.0
+    escala[escala == 0] = 1.0
+    datos = np.clip(np.round(arreglo / escala), -127, 127).astype(np.int8)
+    return datos, escala.astype(np.float32)
+
+
+class _Escritor:
+    """Acumula bloques alineados y describe cada uno para el índice"""
+
+    def __init__(self):
+        self.bloques = []
+        self.tamano = 0
+
+    def agregar(self, arreglo):
+        arreglo = np.ascontiguousarray(arreglo)
+        relleno = -self.tamano % ALINEACION
+        if relleno:
+            self.bloques.append(b'\0' * relleno)
+            self.tamano += relleno
+        descriptor = {'offset': self.tamano, 'shape': list(arreglo.shape), 'dtype': arreglo.dtype.str}
+        self.bloques.append(arreglo.tobytes())
+        self.tamano += arreglo.nbytes
+        return descriptor
+
+    def agregar_pesos(self, arreglo, precision):
+        datos, escala = _cuantizar(arreglo, precision if arreglo.ndim == 2 else 'float32')
+        descriptor = self.agregar(datos)
+        if escala is not None:
+            descriptor['escala'] = self.agregar(escala)
+        return descriptor
+
+
+def _describir_red(red, escritor, precision):
+    """Capas de una RedLSTMNumpy con sus arreglos reemplazados por descriptores"""
+    capas = []
+    for capa in red.capas:
+        if capa['tipo'] == 'bidirectional':
+            # Se conserva el resto de la capa (tipo y tasa de dropout)
+            descriptor = {clave: valor for clave, valor in capa.items() if clave not in ('forward', 'backward')}
+            for direccion in ('forward', 'backward'):
+                celda = dict(capa[direccion])
+                for clave in _CLAVES_ARREGLO:
+                    celda[clave] = escritor.agregar_pesos(celda[clave], precision)
+                descriptor[direccion] = celda
+        else:
+            descriptor = dict(capa)
+            for clave in ('kernel', 'bias'):
+                descriptor[clave] = escritor.agregar_pesos(capa[clave], precision)
+        capas.append(descriptor)
+    return {'input_shape': list(red.input_shape), 'capas': capas}
+
+
+def exportar_artefacto_plano(modelo, precision=PRECISION_DEFAULT, ruta=None):
+    """
+    Escribe el artefacto plano de los modelos cargados en `modelo`.
+
+    Los pesos se leen siempre de los .keras (no de las redes en memoria), así
+    el artefacto corresponde exactamente a la versión en disco.
+
+    Args:
+        modelo: ModeloPrediccionIncidencias con cargar_modelos() hecho
+        precision: 'float32', 'float16' o 'int8'
+        ruta: Destino (default: MODEL_DIR/modelos_planos.bin)
+    Returns:
+        dict: {'ruta', 'precision', 'redes', 'bytes', 'version_modelo'}
+    """
+    from models.modelo_PREDICCION import _reemplazo_atomico
+
+    if precision not in PRECISIONES:
+        raise ValueError(f"Precisión no válida: {precision}. Opciones: {PRECISIONES}")
+    if not modelo.trained:
+        raise Exception("Modelos no entrenados. Ejecuta entrenar_modelos() o cargar_modelos() primero.")
+    ruta = ruta or os.path.join(modelo._dir_modelos(), ARCHIVO_PLANO)
+
+    escritor = _Escritor()
+    redes = {}
+    scalers = {}
+    for prefijo, model_dict in (('den', modelo.models_den), ('eme', modelo.models_eme)):
+        for tipo_id, info in model_dict.items():
+            nombre = _nombre_red(info['ruta'])
+            if nombre not in redes:  # la red global la comparten todos los tipos
+                redes[nombre] = _describir_red(RedLSTMNumpy.desde_archivo(info['ruta']), escritor, precision)
+            scalers[f'{prefijo}_{int(tipo_id)}'] = {
+                columna: {'center': scaler.center_.tolist(), 'scale': scaler.scale_.tolist()}
+                for columna, scaler in info['scalers'].items()
+            }
+
+    indice = json.dumps({
+        'version_modelo': modelo.version_modelo,
+        'precision': precision,
+        'redes': redes,
+        'scalers': scalers
+    }).encode()
+    inicio_datos = len(MAGIA) + _LARGO_INDICE.size + len(indice)
+    inicio_datos += -inicio_datos % ALINEACION
+
+    def escribir(ruta_tmp):
+        with open(ruta_tmp, 'wb') as f:
+            f.write(MAGIA + _LARGO_INDICE.pack(len(indice)) + indice)
+            f.write(b'\0' * (inicio_datos - f.tell()))
+            for bloque in escritor.bloques:
+                f.write(bloque)
+
+    _reemplazo_atomico(ruta, escribir)
+    print(f"💾 Artefacto plano ({precision}): {len(redes)} redes, {os.path.getsize(ruta) / 1024:.0f} KB → {ruta}")
+
+    return {
+        'ruta': ruta,
+        'precision': precision,
+        'redes': len(redes),
+        'bytes': os.path.getsize(ruta),
+        'version_modelo': modelo.version_modelo
+    }
+
+
+def _descuantizar(pesos):
+    """float32 de un arreglo del mapeo; (datos int8, escala) se multiplica por la escala"""
+    if isinstance(pesos, tuple):
+        datos, escala = pesos
+        return datos.astype(np.float32) * escala
+    return pesos if pesos.dtype == np.float32 else pesos.astype(np.float32)
+
+
+def _descuantizar_capa(capa):
+    """Copia de la capa con sus pesos en float32 (dropout, activaciones, etc. se conservan)"""
+    capa = dict(capa)
+    if capa['tipo'] == 'bidirectional':
+        for direccion in ('forward', 'backward'):
+            celda = dict(capa[direccion])
+            for clave in _CLAVES_ARREGLO:
+                celda[clave] = _descuantizar(celda[clave])
+            capa[direccion] = celda
+    else:
+        for clave in ('kernel', 'bias'):
+            capa[clave] = _descuantizar(capa[clave])
+    return capa
+
+
+class RedPlana(RedLSTMNumpy):
+    """
+    RedLSTMNumpy con los pesos en el mapeo, en la precisión del archivo.
+
+    Cada forward descuantiza una capa a la vez: los float32 temporales duran
+    lo que dura la capa y el proceso no guarda copias privadas de los pesos.
+    `capas` entrega la red completa en float32 (p. ej. para apilar redes).
+    """
+
+    def __init__(self, capas_mapeadas, input_shape):
+        self._capas_mapeadas = capas_mapeadas
+        self.input_shape = input_shape
+
+    def _capas(self):
+        for capa in self._capas_mapeadas:
+            yield _descuantizar_capa(capa)
+
+    @property
+    def capas(self):
+        return list(self._capas())
+
+    def __call__(self, X):
+        return _forward(self._capas(), X)
+
+    def predict_estocastico(self, X, rng):
+        return _forward(self._capas(), X, rng)
+
+
+class ArtefactoPlano:
+    """
+    Artefacto plano mapeado en memoria (solo lectura).
+
+    red(nombre) construye la RedPlana de un archivo .keras ('den_tipo_1',
+    'red_global', ...) sobre el mapeo, una sola vez por red.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        with open(ruta, 'rb') as f:
+            self._mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mapa[:len(MAGIA)] != MAGIA:
+            raise ValueError(f"{ruta} no es un artefacto plano")
+        largo, = _LARGO_INDICE.unpack_from(self._mapa, len(MAGIA))
+        inicio = len(MAGIA) + _LARGO_INDICE.size
+        self.indice = json.loads(self._mapa[inicio:inicio + largo])
+        self._inicio_datos = inicio + largo + (-(inicio + largo) % ALINEACION)
+
+        self.version_modelo = self.indice['version_modelo']
+        self.precision = self.indice['precision']
+        self._redes = {}
+        self._lock = threading.Lock()
+
+    def nombres(self):
+        return list(self.indice['redes'])
+
+    def _arreglo(self, descriptor):
+        """Vista de solo lectura sobre el mapeo; (datos, escala) si está cuantizado a int8"""
+        datos = np.frombuffer(self._mapa, dtype=np.dtype(descriptor['dtype']), count=int(np.prod(descriptor['shape'])),
+                              offset=self._inicio_datos + descriptor['offset']).reshape(descriptor['shape'])
+        if 'escala' in descriptor:
+            return datos, self._arreglo(descriptor['escala'])
+        return datos
+
+    def red(self, nombre):
+        with self._lock:
+            if nombre not in self._redes:
+                if nombre not in self.indice['redes']:
+                    raise KeyError(f"La red {nombre} no está en el artefacto plano")
+                descripcion = self.indice['redes'][nombre]
+                capas = []
+                for descriptor in descripcion['capas']:
+                    capa = dict(descriptor)
+                    if capa['tipo'] == 'bidirectional':
+                        for direccion in ('forward', 'backward'):
+                            celda = dict(capa[direccion])
+                            for clave in _CLAVES_ARREGLO:
+                                celda[clave] = self._arreglo(celda[clave])
+                            capa[direccion] = celda
+                    else:
+                        for clave in ('kernel', 'bias'):
+                            capa[clave] = self._arreglo(capa[clave])
+                    capas.append(capa)
+                self._redes[nombre] = RedPlana(capas, tuple(descripcion['input_shape']))
+            return self._redes[nombre]
+
+
+_abiertos = {}
+_lock_abiertos = threading.Lock()
+
+
+def abrir_artefacto_plano(ruta):
+    """ArtefactoPlano compartido por todo el proceso (se reabre si el archivo cambió)"""
+    estado = os.stat(ruta)
+    clave = (os.path.abspath(ruta), estado.st_mtime_ns, estado.st_size)
+    with _lock_abiertos:
+        if clave not in _abiertos:
+            for vieja in [c for c in _abiertos if c[0] == clave[0]]:
+                del _abiertos[vieja]
+            _abiertos[clave] = ArtefactoPlano(ruta)
+        return _abiertos[clave]
+
+
+def verificar_artefacto_plano(modelo, ruta=None, tolerancia=TOLERANCIA_MAE):
+    """
+    Regresión de precisión: MAE de validación (último 20% de las ventanas
+    históricas, mismo corte que el entrenamiento) con los pesos float32 de los
+    .keras frente a los del artefacto plano.
+
+    Returns:
+        dict: {'ok', 'precision', 'tolerancia', 'denuncias': {tipo: {...}}, 'emergencias': {...}}
+    """
+    from models.inferencia_fusionada import agregar_tipo
+
+    artefacto = ArtefactoPlano(ruta or os.path.join(modelo._dir_modelos(), ARCHIVO_PLANO))
+    resultado = {'ok': True, 'precision': artefacto.precision, 'tolerancia': tolerancia,
+                 'version_modelo': artefacto.version_modelo}
+    originales = {}
+
+    for nombre, model_dict, df_month in (('denuncias', modelo.models_den, modelo.den_monthly),
+                                         ('emergencias', modelo.models_eme, modelo.eme_monthly)):
+        col_tipo = df_month.columns[2]
+        resultado[nombre] = {}
+        for tipo_id, info in model_dict.items():
+            sub = df_month[df_month[col_tipo] == tipo_id]
+            X, y, _ = modelo.make_lstm_dataset(sub, info['lookback'], scalers=info['scalers'])
+            split_idx = int(len(X) * 0.8)
+            X_test, y_test = X[split_idx:].astype(np.float32), y[split_idx:]
+            if 'indice_global' in info:
+                X_test = agregar_tipo(X_test, info['indice_global'], info['predictor'].n_tipos)
+
+            red = _nombre_red(info['ruta'])
+            if red not in originales:
+                originales[red] = RedLSTMNumpy.desde_archivo(info['ruta'])
+            pred_float32 = originales[red].predict(X_test)
+            pred_plano = artefacto.red(red).predict(X_test)
+
+            mae_float32, _ = modelo._errores(pred_float32, y_test, info['scalers'])
+            mae_plano, rmse_plano = modelo._errores(pred_plano, y_test, info['scalers'])
+            escala = info['scalers']['count'].scale_[0]
+            fila = {
+                'mae_float32': float(mae_float32),
+                'mae_plano': float(mae_plano),
+                'rmse_plano': float(rmse_plano),
+                'diferencia_mae': float(mae_plano - mae_float32),
+                'max_dif_incidencias': float(np.abs(pred_plano - pred_float32).max() * escala)
+            }
+            resultado[nombre][int(tipo_id)] = fila
+            resultado['ok'] = resultado['ok'] and fila['diferencia_mae'] <= tolerancia
+
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Artefacto plano cuantizado de los modelos LSTM')
+    parser.add_argument('accion', choices=('exportar', 'verificar'))
+    parser.add_argument('--precision', choices=PRECISIONES, default=PRECISION_DEFAULT)
+    parser.add_argument('--ruta', help=f'Archivo (default: MODEL_DIR/{ARCHIVO_PLANO})')
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA_MAE)
+    args = parser.parse_args()
+
+    from models.modelo_PREDICCION import ModeloPrediccionIncidencias
+    modelo = ModeloPrediccionIncidencias(motor_inferencia='numpy', carga_diferida=True)
+    modelo.cargar_modelos()
+
+    if args.accion == 'exportar':
+        exportar_artefacto_plano(modelo, args.precision, args.ruta)
+
+    resultado = verificar_artefacto_plano(modelo, args.ruta, args.tolerancia)
+    print(f"\n{'Tipo':<16}{'MAE float32':>12}{'MAE plano':>12}{'Δ MAE':>10}{'Máx Δ':>10}")
+    for nombre in ('denuncias', 'emergencias'):
+        for tipo_id, fila in resultado[nombre].items():
+            print(f"{nombre[:3]} {tipo_id:<12}{fila['mae_float32']:>12.3f}{fila['mae_plano']:>12.3f}"
+                  f"{fila['diferencia_mae']:>10.4f}{fila['max_dif_incidencias']:>10.4f}")
+    estado = '✅ OK' if resultado['ok'] else '❌ FALLA'
+    print(f"\n{estado}: precisión {resultado['precision']}, tolerancia Δ MAE ≤ {resultado['tolerancia']}")
+    raise SystemExit(0 if resultado['ok'] else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+"""
+models/backtesting.py
+Backtesting walk-forward (origen móvil) de los pronosticadores por tipo
+
+La única señal de calidad del entrenamiento es el MAE/RMSE del corte 80/20 a un
+paso. Aquí se repite el pronóstico recursivo desde cada uno de los últimos
+`n_origenes` meses del histórico (den_monthly / eme_monthly) hasta `horizonte`
+meses adelante, con los modelos ya entrenados (sin reentrenar), y se compara
+con lo observado:
+
+  - Todas las ventanas de origen de un tipo avanzan juntas: un solo llamado al
+    predictor por paso del horizonte, con el mismo avance de estado que
+    _forecast_trayectoria_cached (conteos redondeados, trend = n_filas)
+  - Cada tipo es una tarea independiente; con n_procesos > 1 se reparten en un
+    ProcessPoolExecutor y cada proceso carga el modelo una sola vez
+  - La tabla por tipo y horizonte (n, MAE, RMSE, sesgo y MAE de persistencia)
+    se guarda en MODEL_DIR/backtest_<engine>.json con la versión del modelo; no
+    forma parte de los artefactos que definen la versión
+
+Ejecutar desde la raíz del proyecto:
+  python -m models.backtesting --horizonte 12 --origenes 24 --procesos 2
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+HORIZONTE_BACKTEST = 12
+N_ORIGENES_BACKTEST = 24
+
+_modelo_trabajador = None
+
+
+def _archivo_backtest(modelo, engine):
+    return os.path.join(modelo._dir_modelos(), f'backtest_{engine}.json')
+
+
+def _inicializar_trabajador(model_dir, data_dir, cache_dir, motor_inferencia, arquitectura):
+    """Inicializa cada proceso del pool: carga el modelo una vez (redes bajo demanda)"""
+    global _modelo_trabajador
+    import models.modelo_PREDICCION as modulo
+
+    # Con spawn el proceso no hereda rutas cambiadas en tiempo de ejecución
+    modulo.MODEL_DIR, modulo.DATA_DIR, modulo.CACHE_DIR = model_dir, data_dir, cache_dir
+    _modelo_trabajador = modulo.ModeloPrediccionIncidencias(
+        motor_inferencia=motor_inferencia, carga_diferida=True, arquitectura=arquitectura
+    )
+    _modelo_trabajador.cargar_modelos()
+
+
+def _backtest_tipo_en_proceso(tipo_modelo, tipo_id, horizonte, n_origenes, engine):
+    """Tarea del pool: (versión del modelo del proceso, tabla del tipo)"""
+    activos = _modelo_trabajador._instantanea()
+    tabla = backtest_tipo(_modelo_trabajador, activos, tipo_modelo, tipo_id, horizonte, n_origenes, engine)
+    return activos['version'], tabla
+
+
+def backtest_tipo(modelo, activos, tipo_modelo, tipo_id, horizonte=HORIZONTE_BACKTEST,
+                  n_origenes=N_ORIGENES_BACKTEST, engine='lstm'):
+    """
+    Pronóstico walk-forward de un tipo desde cada origen hasta `horizonte` meses.
+
+    Args:
+        activos: Instantánea de modelos (ver ModeloPrediccionIncidencias._instantanea)
+        tipo_modelo: 'denuncias' o 'emergencias'
+    Returns:
+        list: Una fila por horizonte {'horizonte', 'n', 'mae', 'rmse', 'sesgo', 'mae_ingenuo'}
+              (vacía si la serie no alcanza para un origen)
+    """
+    from models.modelo_PREDICCION import FEATURES, IDX_COUNT
+
+    if tipo_modelo == 'denuncias':
+        model_dict, df_month = activos['models_den'], activos['den_monthly']
+    else:
+        model_dict, df_month = activos['models_eme'], activos['eme_monthly']
+    info = model_dict[tipo_id]
+    lookback = info['lookback']
+    centros, escalas = info['estado']['centros'], info['estado']['escalas']
+
+    col_tipo = df_month.columns[2]
+    valores = df_month.loc[df_month[col_tipo] == tipo_id, FEATURES].to_numpy(dtype=np.float64)
+    escalados = (valores - centros) / escalas
+    reales = valores[:, IDX_COUNT]
+    n_filas = len(valores)
+
+    # Orígenes: últimas filas con al menos un mes observado después
+    origenes = np.arange(max(lookback - 1, n_filas - 1 - n_origenes), n_filas - 1)
+    if len(origenes) == 0:
+        return []
+
+    ventanas = np.stack([escalados[o - lookback + 1:o + 1] for o in origenes])
+    meses = valores[origenes, FEATURES.index('month_idx')].astype(int)
+
+    if engine == 'lstm':
+        if modelo.carga_diferida:
+            modelo._asegurar_redes(model_dict, [tipo_id], tipo_modelo, activos)
+        predictor = info['predictor']
+        paso = lambda X: predictor(X.astype(np.float32))[:, 0].astype(np.float64)
+    else:
+        coef, intercepto = info['rapido']['coef'], info['rapido']['intercepto']
+        paso = lambda X: X.reshape(len(X), -1) @ coef + intercepto
+
+    tabla = []
+    for h in range(1, horizonte + 1):
+        objetivo = origenes + h
+        validos = objetivo < n_filas
+        if not validos.any():
+            break
+
+        cantidad = np.maximum(0, np.round(paso(ventanas) * escalas[IDX_COUNT] + centros[IDX_COUNT]))
+
+        error = cantidad[validos] - reales[objetivo[validos]]
+        error_ingenuo = reales[origenes[validos]] - reales[objetivo[validos]]
+        tabla.append({
+            'horizonte': h,
+            'n': int(validos.sum()),
+            'mae': float(np.abs(error).mean()),
+            'rmse': float(np.sqrt((error ** 2).mean())),
+            'sesgo': float(error.mean()),
+            'mae_ingenuo': float(np.abs(error_ingenuo).mean())
+        })
+
+        # Mismo avance que _avanzar_estado, para todos los orígenes a la vez
+        meses = meses % 12 + 1
+        fila = (modelo._fila_mes(meses, objetivo, cantidad) - centros) / escalas
+        ventanas = np.concatenate([ventanas[:, 1:], fila[:, np.newaxis]], axis=1)
+
+    return tabla
+
+
+def _resumen_familia(tablas):
+    """Error agregado por horizonte de una familia (ponderado por número de pronósticos)"""
+    acumulado = {}
+    for tabla in tablas.values():
+        for fila in tabla:
+            suma = acumulado.setdefault(fila['horizonte'], [0, 0.0, 0.0, 0.0, 0.0])
+            suma[0] += fila['n']
+            suma[1] += fila['mae'] * fila['n']
+            suma[2] += fila['rmse'] ** 2 * fila['n']
+            suma[3] += fila['sesgo'] * fila['n']
+            suma[4] += fila['mae_ingenuo'] * fila['n']
+
+    resumen = []
+    for h, (n, mae, mse, sesgo, mae_ingenuo) in sorted(acumulado.items()):
+        resumen.append({
+            'horizonte': h,
+            'n': n,
+            'mae': mae / n,
+            'rmse': float(np.sqrt(mse / n)),
+            'sesgo': sesgo / n,
+            'mae_ingenuo': mae_ingenuo / n,
+            'mejora_vs_ingenuo': 1 - mae / mae_ingenuo if mae_ingenuo else None
+        })
+    return resumen
+
+
+def ejecutar_backtest(modelo, horizonte=HORIZONTE_BACKTEST, n_origenes=N_ORIGENES_BACKTEST, engine='lstm',
+                      n_procesos=1, guardar=True):
+    """
+    Backtesting walk-forward de todos los tipos con la versión activa del modelo.
+
+    Args:
+        engine: 'lstm' o 'fast' (el motor rápido de cada tipo)
+        n_procesos: 1 = en este proceso con las redes ya cargadas; más = pool de procesos
+        guardar: Escribir la tabla en MODEL_DIR/backtest_<engine>.json
+    Returns:
+        dict: {'version_modelo', 'engine', ..., 'denuncias': {tipo: [filas]}, 'emergencias': {...},
+               'resumen': {'denuncias': [filas], 'emergencias': [filas]}}
+    """
+    from models.modelo_PREDICCION import ENGINES_PREDICCION, _reemplazo_atomico
+
+    if engine not in ENGINES_PREDICCION:
+        raise ValueError(f"Engine no válido: {engine}. Opciones: {ENGINES_PREDICCION}")
+    if horizonte < 1 or n_origenes < 1:
+        raise ValueError("horizonte y n_origenes deben ser al menos 1")
+    if not modelo.trained:
+        raise ValueError("Modelos no entrenados.")
+
+    inicio = time.perf_counter()
+    activos = modelo._instantanea()
+    version = activos['version']
+    tareas = [
+        (tipo_modelo, int(tipo_id))
+        for tipo_modelo, model_dict in (('denuncias', activos['models_den']), ('emergencias', activos['models_eme']))
+        for tipo_id, info in model_dict.items() if info is not None
+    ]
+
+    if n_procesos <= 1:
+        tablas = {
+            (tipo_modelo, tipo_id): backtest_tipo(modelo, activos, tipo_modelo, tipo_id, horizonte, n_origenes, engine)
+            for tipo_modelo, tipo_id in tareas
+        }
+    else:
+        import multiprocessing
+        import models.modelo_PREDICCION as modulo
+        from concurrent.futures import ProcessPoolExecutor
+
+        # spawn: TensorFlow no es seguro tras fork
+        with ProcessPoolExecutor(max_workers=n_procesos,
+                                 mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_inicializar_trabajador,
+                                 initargs=(modulo.MODEL_DIR, modulo.DATA_DIR, modulo.CACHE_DIR,
+                                           modelo.motor_inferencia, modelo.arquitectura)) as pool:
+            futuros = {
+                tarea: pool.submit(_backtest_tipo_en_proceso, *tarea, horizonte, n_origenes, engine)
+                for tarea in tareas
+            }
+            tablas = {}
+            for tarea, futuro in futuros.items():
+                version_proceso, tabla = futuro.result()
+                if version_proceso != version:
+                    raise RuntimeError(f"Los procesos cargaron otra versión del modelo: {version_proceso} ≠ {version}")
+                tablas[tarea] = tabla
+
+    resultado = {
+        'version_modelo': version,
+        'engine': engine,
+        'motor_inferencia': modelo.motor_inferencia,
+        'arquitectura': modelo.arquitectura,
+        'horizonte': horizonte,
+        'n_origenes': n_origenes,
+        'n_procesos': n_procesos,
+        'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'segundos': round(time.perf_counter() - inicio, 2)
+    }
+    for tipo_modelo in ('denuncias', 'emergencias'):
+        resultado[tipo_modelo] = {tipo_id: tabla for (familia, tipo_id), tabla in tablas.items() if familia == tipo_modelo}
+    resultado['resumen'] = {
+        tipo_modelo: _resumen_familia(resultado[tipo_modelo]) for tipo_modelo in ('denuncias', 'emergencias')
+    }
+
+    if guardar:
+        def escribir(ruta):
+            with open(ruta, 'w') as f:
+                json.dump(resultado, f, indent=1)
+
+        _reemplazo_atomico(_archivo_backtest(modelo, engine), escribir)
+
+    print(f"✅ Backtest {engine}: {len(tareas)} tipos, horizonte {horizonte}, {n_origenes} orígenes "
+          f"({resultado['segundos']} s)")
+    return resultado
+
+
+def cargar_backtest(modelo, engine='lstm'):
+    """
+    Último backtest guardado para `engine` (None si no hay).
+
+    Returns:
+        dict: Igual que ejecutar_backtest, con 'vigente' = corresponde a la versión activa
+    """
+    try:
+        with open(_archivo_backtest(modelo, engine)) as f:
+            resultado = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    # JSON guarda las claves como texto
+    for tipo_modelo in ('denuncias', 'emergencias'):
+        resultado[tipo_modelo] = {int(t): tabla for t, tabla in resultado[tipo_modelo].items()}
+    resultado['vigente'] = resultado['version_modelo'] == modelo.version_modelo
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backtesting walk-forward de los modelos de pronóstico')
+    parser.add_argument('--horizonte', type=int, default=HORIZONTE_BACKTEST)
+    parser.add_argument('--origenes', type=int, default=N_ORIGENES_BACKTEST)
+    parser.add_argument('--engine', choices=('lstm', 'fast'), default='lstm')
+    parser.add_argument('--procesos', type=int, default=1)
+    parser.add_argument('--motor', default=os.environ.get('MOTOR_INFERENCIA', 'numpy'),
+                        help='Motor de inferencia de las redes (keras, numpy o plano)')
+    args = parser.parse_args()
+
+    from models.modelo_PREDICCION import ModeloPrediccionIncidencias
+    modelo = ModeloPrediccionIncidencias(motor_inferencia=args.motor, carga_diferida=True)
+    modelo.cargar_modelos()
+
+    resultado = ejecutar_backtest(modelo, args.horizonte, args.origenes, args.engine, args.procesos)
+    for tipo_modelo in ('denuncias', 'emergencias'):
+        print(f"\n{tipo_modelo.capitalize()}")
+        print(f"{'h':>3}{'n':>6}{'MAE':>10}{'RMSE':>10}{'Sesgo':>10}{'MAE ingenuo':>13}")
+        for fila in resultado['resumen'][tipo_modelo]:
+            print(f"{fila['horizonte']:>3}{fila['n']:>6}{fila['mae']:>10.2f}{fila['rmse']:>10.2f}"
+                  f"{fila['sesgo']:>10.2f}{fila['mae_ingenuo']:>13.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,400 @@
+"""
+models/busqueda_hiperparametros.py
+Búsqueda de hiperparámetros por tipo con mitades sucesivas y presupuesto de tiempo
+
+Cada tipo prueba `n_candidatos` configuraciones de la red (unidades, lookback,
+dropout y L2; la primera es siempre HIPERPARAMETROS_DEFAULT) en rondas:
+
+  ronda 0: todos los candidatos entrenan unas pocas épocas
+  ronda k: solo la mejor 1/eta de la ronda anterior (MAE de validación)
+           continúa, desde su checkpoint, hasta eta veces más épocas
+
+La última ronda llega a `epochs`. Las tareas (tipo, candidato) de una ronda se
+reparten en un ProcessPoolExecutor; una ronda no empieza si su duración
+estimada (la de la ronda anterior escalada por el trabajo) excede el
+presupuesto, y al agotarse se cancelan las tareas que no empezaron. La ronda 0
+encola primero el candidato por defecto de cada tipo, de modo que todo tipo
+tenga al menos un candidato evaluado.
+
+El ganador de cada tipo (mejor MAE en la ronda más alta que alcanzó) queda como
+su red y su configuración se guarda en metadata (den_hiperparametros /
+eme_hiperparametros): cargar_modelos la lee, y reentrenar_incremental y
+entrenar_modelos(hiperparametros=hiperparametros_guardados()) la reconstruyen.
+
+Ejecutar desde la raíz del proyecto:
+  python -m models.busqueda_hiperparametros --presupuesto 3600 --candidatos 8 --procesos 4
+"""
+
+import argparse
+import itertools
+import math
+import os
+import time
+
+import numpy as np
+
+from models.modelo_PREDICCION import (
+    BATCH_SIZE_ENTRENAMIENTO, HIPERPARAMETROS_DEFAULT, JIT_ENTRENAMIENTO, RANDOM_SEED,
+    _importar_tensorflow, _reemplazo_atomico
+)
+from models.procesos_entrenamiento import _inicializar_proceso_entrenamiento
+
+ESPACIO_BUSQUEDA = {
+    'unidades': [(32, 16, 8), (64, 32, 16), (128, 64, 32)],
+    'lookback': [3, 6, 12],
+    'dropout': [(0.1, 0.1, 0.1), (0.3, 0.3, 0.2), (0.5, 0.5, 0.3)],
+    'l2': [0.0, 0.0001, 0.001],
+}
+N_CANDIDATOS = 8
+ETA = 2
+PRESUPUESTO_S = 3600
+
+
+def muestrear_candidatos(n_candidatos, semilla):
+    """Configuraciones distintas del espacio de búsqueda; la primera es HIPERPARAMETROS_DEFAULT"""
+    claves = list(ESPACIO_BUSQUEDA)
+    combinaciones = [dict(zip(claves, valores)) for valores in itertools.product(*ESPACIO_BUSQUEDA.values())]
+    otras = [c for c in combinaciones if c != HIPERPARAMETROS_DEFAULT]
+    elegidas = np.random.default_rng(semilla).permutation(len(otras))[:n_candidatos - 1]
+    return [dict(HIPERPARAMETROS_DEFAULT)] + [otras[i] for i in elegidas]
+
+
+def programa_rondas(n_candidatos, epochs, eta=ETA):
+    """
+    Rondas de mitades sucesivas.
+
+    Returns:
+        list: [(candidatos que entrenan, épocas acumuladas al terminar la ronda)]
+    """
+    n_rondas = math.ceil(math.log(n_candidatos, eta) - 1e-9) + 1 if n_candidatos > 1 else 1
+    return [
+        (math.ceil(n_candidatos / eta ** k), max(1, round(epochs / eta ** (n_rondas - 1 - k))))
+        for k in range(n_rondas)
+    ]
+
+
+def _ajustar_candidato_en_proceso(prefijo, df_month, tipo_id, indice, hiperparametros, epochs_previas,
+                                  epochs_objetivo, ruta, batch_size=BATCH_SIZE_ENTRENAMIENTO,
+                                  jit=JIT_ENTRENAMIENTO):
+    """
+    Tarea de una ronda: entrena un candidato hasta `epochs_objetivo` épocas
+    (continuando su checkpoint si ya entrenó antes) y guarda el checkpoint.
+
+    Returns:
+        dict: {'mae', 'rmse', 'segundos'} (MAE/RMSE de validación en la escala original)
+    """
+    from models.modelo_PREDICCION import ModeloPrediccionIncidencias
+
+    tf = _importar_tensorflow()
+    inicio = time.perf_counter()
+    modelo = ModeloPrediccionIncidencias()
+
+    col_tipo = df_month.columns[2]
+    sub = df_month[df_month[col_tipo] == tipo_id]
+    X, y, scalers = modelo.make_lstm_dataset(sub, hiperparametros['lookback'])
+    split_idx = int(len(X) * 0.8)
+
+    if epochs_previas == 0:
+        # Semilla por tipo y candidato: el resultado no depende del proceso que lo entrena
+        tf.keras.utils.set_random_seed(RANDOM_SEED + (0 if prefijo == 'den' else 1000) + int(tipo_id) * 100 + indice)
+        model = modelo._construir_red(hiperparametros['lookback'], X.shape[-1], hiperparametros)
+        compilar = True
+    else:
+        from tensorflow.keras.models import load_model
+        model = load_model(ruta)
+        compilar = False
+
+    modelo._ajustar_red(model, X[:split_idx], y[:split_idx], X[split_idx:], y[split_idx:],
+                        epochs_objetivo - epochs_previas, batch_size, jit, compilar)
+    mae, rmse = modelo._evaluar_modelo(model, X[split_idx:], y[split_idx:], scalers)
+    _reemplazo_atomico(ruta, model.save)
+
+    return {'mae': float(mae), 'rmse': float(rmse), 'segundos': time.perf_counter() - inicio}
+
+
+def _mitades_sucesivas(tareas, n_candidatos, epochs, eta, limite, n_procesos, dir_temporal,
+                       batch_size, jit):
+    """
+    Ejecuta las rondas sobre todos los tipos a la vez hasta `limite` (time.monotonic()).
+
+    Returns:
+        tuple: (candidatos {(prefijo, tipo_id): [candidato]}, rondas [{...}], presupuesto agotado)
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+    candidatos = {}
+    for prefijo, df_month, tipo_id in tareas:
+        semilla = RANDOM_SEED + (0 if prefijo == 'den' else 1000) + int(tipo_id)
+        candidatos[(prefijo, tipo_id)] = [
+            {'indice': i, 'hiperparametros': hp, 'epochs': 0, 'mae_por_ronda': [], 'rmse': None,
+             'segundos': 0.0, 'ruta': os.path.join(dir_temporal, f'{prefijo}_tipo_{tipo_id}_c{i}.keras')}
+            for i, hp in enumerate(muestrear_candidatos(n_candidatos, semilla))
+        ]
+    series = {(prefijo, tipo_id): df_month for prefijo, df_month, tipo_id in tareas}
+
+    pool = None
+    if n_procesos > 1:
+        # spawn: TensorFlow no es seguro tras fork
+        pool = ProcessPoolExecutor(max_workers=n_procesos, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_inicializar_proceso_entrenamiento,
+                                   initargs=(max(1, (os.cpu_count() or 1) // n_procesos),))
+
+    rondas = []
+    agotado = False
+    vivos = dict(candidatos)
+    epochs_previas = 0
+    programa = programa_rondas(n_candidatos, epochs, eta)
+    try:
+        for k, (_, epochs_ronda) in enumerate(programa):
+            trabajo = sum(len(lista) for lista in vivos.values()) * (epochs_ronda - epochs_previas)
+            if rondas:
+                anterior = rondas[-1]
+                estimado = anterior['segundos'] * trabajo / max(1, anterior['trabajo'])
+                if time.monotonic() + estimado > limite:
+                    agotado = True
+                    break
+
+            # Ronda 0: primero el candidato por defecto de cada tipo
+            pendientes = sorted(
+                ((candidato['indice'], clave, candidato) for clave, lista in vivos.items() for candidato in lista),
+                key=lambda item: item[0]
+            )
+            argumentos = lambda clave, c: (clave[0], series[clave], clave[1], c['indice'], c['hiperparametros'],
+                                           epochs_previas, epochs_ronda, c['ruta'], batch_size, jit)
+            inicio = time.monotonic()
+            terminados = []
+
+            if pool is None:
+                for _, clave, candidato in pendientes:
+                    if time.monotonic() > limite and (k > 0 or candidato['indice'] > 0):
+                        agotado = True
+                        break
+                    terminados.append((candidato, _ajustar_candidato_en_proceso(*argumentos(clave, candidato))))
+            else:
+                futuros = {pool.submit(_ajustar_candidato_en_proceso, *argumentos(clave, candidato)): candidato
+                           for _, clave, candidato in pendientes}
+                en_curso = set(futuros)
+                while en_curso:
+                    listos, en_curso = wait(en_curso, timeout=max(0.0, limite - time.monotonic()),
+                                            return_when=FIRST_COMPLETED)
+                    terminados.extend((futuros[f], f.result()) for f in listos)
+                    if time.monotonic() > limite and en_curso:
+                        # Las que no empezaron se cancelan; las que corren terminan
+                        agotado = True
+                        cancelados = {f for f in en_curso if
+                                      (k > 0 or futuros[f]['indice'] > 0) and f.cancel()}
+                        en_curso -= cancelados
+                        listos, _ = wait(en_curso)
+                        terminados.extend((futuros[f], f.result()) for f in listos)
+                        en_curso = set()
+
+            for candidato, resultado in terminados:
+                candidato['epochs'] = epochs_ronda
+                candidato['mae_por_ronda'].append(resultado['mae'])
+                candidato['rmse'] = resultado['rmse']
+                candidato['segundos'] += resultado['segundos']
+
+            rondas.append({'ronda': k, 'epochs': epochs_ronda, 'entrenados': len(terminados),
+                           'trabajo': trabajo, 'segundos': round(time.monotonic() - inicio, 2)})
+            print(f"🔎 Ronda {k}: {len(terminados)} candidatos hasta {epochs_ronda} épocas "
+                  f"({rondas[-1]['segundos']} s)")
+            if agotado:
+                break
+
+            # Poda: continúan los mejores de cada tipo
+            epochs_previas = epochs_ronda
+            siguiente = programa[k + 1][0] if k + 1 < len(programa) else 0
+            vivos = {
+                clave: sorted(lista, key=lambda c: c['mae_por_ronda'][-1])[:siguiente]
+                for clave, lista in vivos.items()
+            }
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    return candidatos, rondas, agotado
+
+
+def _ganador(candidatos):
+    """Mejor MAE entre los candidatos que llegaron a la ronda más alta"""
+    evaluados = [c for c in candidatos if c['mae_por_ronda']]
+    ronda_maxima = max(len(c['mae_por_ronda']) for c in evaluados)
+    return min((c for c in evaluados if len(c['mae_por_ronda']) == ronda_maxima),
+               key=lambda c: c['mae_por_ronda'][-1])
+
+
+def buscar_hiperparametros(modelo, csv_path=None, presupuesto_s=PRESUPUESTO_S, n_candidatos=N_CANDIDATOS,
+                           n_procesos=1, epochs=300, eta=ETA, tipos=None, progreso=None,
+                           batch_size=BATCH_SIZE_ENTRENAMIENTO, jit=JIT_ENTRENAMIENTO):
+    """
+    Busca la configuración de la red de cada tipo, guarda los ganadores como los
+    modelos activos (igual que entrenar_modelos) y su configuración en metadata.
+    Los tipos con menos de lookback máximo + 12 meses no entran en la búsqueda y
+    se entrenan con HIPERPARAMETROS_DEFAULT (sin candidatos en el resumen).
+
+    Args:
+        csv_path: Dataset de incidencias (None = las series del modelo ya cargado)
+        presupuesto_s: Tiempo de pared máximo de la búsqueda
+        n_procesos: Procesos del pool (1 = secuencial en este proceso)
+        epochs: Épocas de la última ronda
+        tipos: [(prefijo, tipo_id)] a buscar; los demás conservan su red actual
+            (requiere el modelo cargado con el motor keras y csv_path None)
+        progreso: callable(evento, datos) opcional (ver entrenar_modelos)
+    Returns:
+        dict: {'version_modelo', 'rondas', 'presupuesto_agotado', 'segundos',
+               'denuncias': {tipo: {'hiperparametros', 'mae', 'candidatos': [...]}}, 'emergencias': {...}}
+    """
+    import shutil
+    import tempfile
+
+    if modelo.arquitectura != 'por_tipo':
+        raise ValueError("La búsqueda de hiperparámetros solo está disponible para la arquitectura por_tipo")
+    if n_candidatos < 1 or eta < 2 or presupuesto_s <= 0:
+        raise ValueError("n_candidatos debe ser al menos 1, eta al menos 2 y el presupuesto positivo")
+    if tipos is not None and (csv_path is not None or not modelo.trained):
+        raise ValueError("Para buscar solo algunos tipos se usan las series del modelo cargado (sin csv_path)")
+    if tipos is not None and modelo.motor_inferencia != 'keras':
+        raise ValueError("Para buscar solo algunos tipos el modelo debe usar el motor keras "
+                         "(guardar_modelos reescribe las redes de los demás tipos)")
+    if csv_path is None and not modelo.trained:
+        raise ValueError("Sin csv_path se requiere el modelo cargado")
+    if progreso is None:
+        progreso = lambda evento, datos: None
+
+    inicio = time.perf_counter()
+    limite = time.monotonic() + presupuesto_s
+
+    if csv_path is not None:
+        import pandas as pd
+        df = pd.read_csv(csv_path, parse_dates=['fecha'])
+        for col in ["id_numero_emergencia", "id_denuncia"]:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("Int64")
+        modelo.den_monthly = modelo.build_monthly_series(df, 'id_denuncia')
+        modelo.eme_monthly = modelo.build_monthly_series(df, 'id_numero_emergencia')
+        modelo.models_den, modelo.models_eme = {}, {}
+
+    lookback_maximo = max(ESPACIO_BUSQUEDA['lookback'] + [HIPERPARAMETROS_DEFAULT['lookback']])
+    tareas = []
+    sin_busqueda = []
+    for prefijo, df_month in (('den', modelo.den_monthly), ('eme', modelo.eme_monthly)):
+        col_tipo = df_month.columns[2]
+        for tipo_id in sorted(df_month[col_tipo].unique()):
+            if tipos is not None and (prefijo, int(tipo_id)) not in tipos:
+                continue
+            if (df_month[col_tipo] == tipo_id).sum() < lookback_maximo + 12:
+                print(f"⚠️  {prefijo}_tipo_{int(tipo_id)}: Datos insuficientes para la búsqueda, "
+                      "se entrena con la configuración por defecto")
+                sin_busqueda.append((prefijo, df_month, tipo_id))
+                continue
+            tareas.append((prefijo, df_month, tipo_id))
+    progreso('inicio', {'tipos': [(prefijo, tipo_id) for prefijo, _, tipo_id in tareas + sin_busqueda]})
+
+    print("=" * 70)
+    print(f"BÚSQUEDA DE HIPERPARÁMETROS - {len(tareas)} tipos, {n_candidatos} candidatos, "
+          f"presupuesto {presupuesto_s:.0f} s")
+    print("=" * 70)
+
+    _importar_tensorflow()
+    from tensorflow.keras.models import load_model
+
+    dir_temporal = tempfile.mkdtemp(prefix='busqueda_')
+    resumen = {'denuncias': {}, 'emergencias': {}}
+    try:
+        candidatos, rondas, agotado = _mitades_sucesivas(tareas, n_candidatos, epochs, eta, limite, n_procesos,
+                                                         dir_temporal, batch_size, jit)
+
+        for prefijo, df_month, tipo_id in tareas:
+            ganador = _ganador(candidatos[(prefijo, tipo_id)])
+            hp = ganador['hiperparametros']
+            col_tipo = df_month.columns[2]
+            sub = df_month[df_month[col_tipo] == tipo_id]
+            X, y, scalers = modelo.make_lstm_dataset(sub, hp['lookback'])
+
+            model = load_model(ganador['ruta'])
+            segundos = sum(c['segundos'] for c in candidatos[(prefijo, tipo_id)])
+            result = {
+                'model': model,
+                'predictor': modelo._construir_predictor(model, hp['lookback'], X.shape[-1]),
+                'scalers': scalers,
+                'lookback': hp['lookback'],
+                'estado': modelo._construir_estado(sub, scalers, hp['lookback']),
+                'metrics': {'mae': ganador['mae_por_ronda'][-1], 'rmse': ganador['rmse'],
+                            'segundos_entrenamiento': segundos},
+                'rapido': modelo._entrenar_rapido(X, y, scalers),
+                'hiperparametros': hp
+            }
+            (modelo.models_den if prefijo == 'den' else modelo.models_eme)[tipo_id] = result
+
+            familia = 'denuncias' if prefijo == 'den' else 'emergencias'
+            resumen[familia][int(tipo_id)] = {
+                'hiperparametros': hp,
+                'mae': result['metrics']['mae'],
+                'epochs': ganador['epochs'],
+                'candidatos': [{'hiperparametros': c['hiperparametros'], 'mae_por_ronda': c['mae_por_ronda']}
+                               for c in candidatos[(prefijo, tipo_id)]]
+            }
+            print(f"{prefijo}_tipo_{int(tipo_id):<3} →  MAE: {result['metrics']['mae']:5.1f}  |  {hp}")
+            progreso('tipo_completado', {'prefijo': prefijo, 'tipo_id': tipo_id, 'segundos': segundos,
+                                         'metrics': result['metrics']})
+
+        # Sin datos para la búsqueda: la red por defecto, para que el tipo no quede sin modelo
+        for prefijo, df_month, tipo_id in sin_busqueda:
+            inicio_tipo = time.perf_counter()
+            result = modelo.train_model_per_type(df_month, tipo_id, epochs=epochs, batch_size=batch_size, jit=jit,
+                                                 hiperparametros=dict(HIPERPARAMETROS_DEFAULT))
+            if result:
+                (modelo.models_den if prefijo == 'den' else modelo.models_eme)[tipo_id] = result
+                familia = 'denuncias' if prefijo == 'den' else 'emergencias'
+                resumen[familia][int(tipo_id)] = {
+                    'hiperparametros': result['hiperparametros'],
+                    'mae': result['metrics']['mae'],
+                    'epochs': epochs,
+                    'candidatos': []
+                }
+            progreso('tipo_completado', {'prefijo': prefijo, 'tipo_id': tipo_id,
+                                         'segundos': time.perf_counter() - inicio_tipo,
+                                         'metrics': result['metrics'] if result else None})
+    finally:
+        shutil.rmtree(dir_temporal, ignore_errors=True)
+
+    if tipos is not None and modelo.carga_diferida:
+        # guardar_modelos reescribe también las redes que no se buscaron
+        for info in list(modelo.models_den.values()) + list(modelo.models_eme.values()):
+            if info.get('predictor') is None:
+                modelo._cargar_red_tipo(info)
+
+    modelo.trained = True
+    modelo.predictores_fusionados = modelo._construir_predictores_fusionados(modelo.models_den, modelo.models_eme)
+    modelo.version_modelo = modelo.guardar_modelos()
+    modelo.cache_predicciones.purgar_otras_versiones(modelo.version_modelo)
+    modelo._notificar_version_activa()
+
+    resumen.update({
+        'version_modelo': modelo.version_modelo,
+        'rondas': rondas,
+        'presupuesto_agotado': agotado,
+        'presupuesto_s': presupuesto_s,
+        'segundos': round(time.perf_counter() - inicio, 2)
+    })
+    print(f"\n✅ Búsqueda terminada en {resumen['segundos']} s (versión {modelo.version_modelo})")
+    return resumen
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Búsqueda de hiperparámetros por tipo (mitades sucesivas)')
+    parser.add_argument('--csv', default='data_modelo/dataset_incidencias_reque_2015_2024.csv')
+    parser.add_argument('--presupuesto', type=float, default=PRESUPUESTO_S, help='Segundos de pared')
+    parser.add_argument('--candidatos', type=int, default=N_CANDIDATOS)
+    parser.add_argument('--procesos', type=int, default=1)
+    parser.add_argument('--epochs', type=int, default=300, help='Épocas de la última ronda')
+    parser.add_argument('--eta', type=int, default=ETA)
+    args = parser.parse_args()
+
+    from models.modelo_PREDICCION import ModeloPrediccionIncidencias
+    modelo = ModeloPrediccionIncidencias()
+    buscar_hiperparametros(modelo, args.csv, args.presupuesto, args.candidatos, args.procesos, args.epochs, args.eta)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,304 @@
+"""
+models/cache_predicciones.py
+Almacén de caché de predicciones en SQLite
+
+Reemplaza el re-pickle completo de predicciones_cache.pkl:
+  - clave (version_modelo, tipo_modelo, tipo_id, year, month)
+  - escritura diferida: los valores nuevos se acumulan en memoria y se escriben
+    en una sola transacción (flush)
+  - límite LRU en memoria y en disco
+  - acceso multi-proceso seguro (SQLite en modo WAL con busy timeout)
+  - contadores de aciertos/fallos
+
+VueloUnico coordina los cálculos: solicitudes idénticas concurrentes esperan
+y comparten el resultado de un solo cálculo (single-flight).
+"""
+
+import atexit
+import copy
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+MAX_ENTRADAS_DISCO = 100_000
+MAX_ENTRADAS_MEMORIA = 20_000
+LOTE_ESCRITURA = 500
+TIMEOUT_SQLITE = 30  # segundos esperando el lock de otro proceso
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS predicciones (
+    version      TEXT    NOT NULL,
+    tipo_modelo  TEXT    NOT NULL,
+    tipo_id      INTEGER NOT NULL,
+    year         INTEGER NOT NULL,
+    month        INTEGER NOT NULL,
+    valor        NUMERIC NOT NULL,
+    ultimo_acceso REAL   NOT NULL,
+    PRIMARY KEY (version, tipo_modelo, tipo_id, year, month)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_predicciones_acceso ON predicciones (ultimo_acceso);
+"""
+
+
+class CachePredicciones:
+    """
+    Caché persistente de predicciones.
+
+    Las claves son tuplas (version, tipo_modelo, tipo_id, year, month).
+    Se usa como un dict: `clave in cache`, `cache[clave]`, `cache[clave] = valor`.
+    """
+
+    def __init__(self, ruta, max_entradas=MAX_ENTRADAS_DISCO,
+                 max_memoria=MAX_ENTRADAS_MEMORIA, lote_escritura=LOTE_ESCRITURA):
+        self.ruta = ruta
+        self.max_entradas = max_entradas
+        self.max_memoria = max_memoria
+        self.lote_escritura = lote_escritura
+
+        self._memoria = OrderedDict()  # LRU en memoria
+        self._pendientes = {}          # escritura diferida
+        self._accedidos = set()        # claves leídas desde el último flush
+        self._lock = threading.RLock()
+        # Serializa las escrituras en SQLite de este proceso: un flush no puede
+        # reinsertar valores después de un limpiar() o purgar_otras_versiones()
+        self._lock_escritura = threading.RLock()
+        self._local = threading.local()
+
+        self.aciertos = 0
+        self.fallos = 0
+
+        os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+        with self._conexion() as conn:
+            conn.executescript(_ESQUEMA)
+
+        atexit.register(self.flush)
+
+    def _conexion(self):
+        """Conexión SQLite por hilo y por proceso"""
+        pid = os.getpid()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != pid:
+            conn = sqlite3.connect(self.ruta, timeout=TIMEOUT_SQLITE)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = pid
+        return conn
+
+    def _recordar(self, clave, valor):
+        """Inserta en el LRU de memoria respetando el límite"""
+        self._memoria[clave] = valor
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_memoria:
+            self._memoria.popitem(last=False)
+
+    def get(self, clave, default=None):
+        with self._lock:
+            if clave in self._memoria:
+                self._memoria.move_to_end(clave)
+                self._accedidos.add(clave)
+                self.aciertos += 1
+                return self._memoria[clave]
+
+        fila = self._conexion().execute(
+            'SELECT valor FROM predicciones '
+            'WHERE version = ? AND tipo_modelo = ? AND tipo_id = ? AND year = ? AND month = ?',
+            clave
+        ).fetchone()
+
+        with self._lock:
+            if fila is None:
+                self.fallos += 1
+                return default
+            self._recordar(clave, fila[0])
+            self._accedidos.add(clave)
+            self.aciertos += 1
+            return fila[0]
+
+    def __contains__(self, clave):
+        return self.get(clave) is not None
+
+    def contiene_sin_contar(self, clave):
+        """
+        `clave in cache` sin contar acierto/fallo ni marcar el acceso: no cambia
+        la recencia LRU en memoria ni en disco (para inspecciones como la cobertura)
+        """
+        with self._lock:
+            if clave in self._memoria or clave in self._pendientes:
+                return True
+
+        return self._conexion().execute(
+            'SELECT 1 FROM predicciones '
+            'WHERE version = ? AND tipo_modelo = ? AND tipo_id = ? AND year = ? AND month = ?',
+            clave
+        ).fetchone() is not None
+
+    def __getitem__(self, clave):
+        valor = self.get(clave)
+        if valor is None:
+            raise KeyError(clave)
+        return valor
+
+    def __setitem__(self, clave, valor):
+        with self._lock:
+            self._recordar(clave, valor)
+            self._pendientes[clave] = valor
+            lleno = len(self._pendientes) >= self.lote_escritura
+
+        if lleno:
+            self.flush()
+
+    def __len__(self):
+        with self._lock_escritura:
+            self.flush()
+            return self._conexion().execute('SELECT COUNT(*) FROM predicciones').fetchone()[0]
+
+    def flush(self):
+        """Escribe los valores pendientes en una sola transacción y aplica el límite LRU"""
+        with self._lock_escritura:
+            self._flush()
+
+    def _flush(self):
+        with self._lock:
+            pendientes, self._pendientes = self._pendientes, {}
+            accedidos, self._accedidos = self._accedidos, set()
+
+        if not pendientes and not accedidos:
+            return
+
+        ahora = time.time()
+        conn = self._conexion()
+        try:
+            with conn:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO predicciones '
+                    '(version, tipo_modelo, tipo_id, year, month, valor, ultimo_acceso) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    [(*clave, valor, ahora) for clave, valor in pendientes.items()]
+                )
+                conn.executemany(
+                    'UPDATE predicciones SET ultimo_acceso = ? '
+                    'WHERE version = ? AND tipo_modelo = ? AND tipo_id = ? AND year = ? AND month = ?',
+                    [(ahora, *clave) for clave in accedidos - pendientes.keys()]
+                )
+                self._aplicar_limite(conn)
+        except sqlite3.Error as e:
+            print(f"⚠️  Error guardando caché: {e}")
+            with self._lock:
+                # Reintentar en el próximo flush sin pisar valores más nuevos
+                for clave, valor in pendientes.items():
+                    self._pendientes.setdefault(clave, valor)
+
+    def _aplicar_limite(self, conn):
+        """Elimina las entradas usadas hace más tiempo por encima de max_entradas"""
+        total = conn.execute('SELECT COUNT(*) FROM predicciones').fetchone()[0]
+        exceso = total - self.max_entradas
+        if exceso > 0:
+            conn.execute(
+                'DELETE FROM predicciones WHERE (version, tipo_modelo, tipo_id, year, month) IN ('
+                'SELECT version, tipo_modelo, tipo_id, year, month FROM predicciones '
+                'ORDER BY ultimo_acceso LIMIT ?)',
+                (exceso,)
+            )
+
+    def purgar_otras_versiones(self, version):
+        """Elimina las predicciones de versiones de modelo distintas a `version`"""
+        with self._lock_escritura:
+            self._flush()
+            with self._lock:
+                for clave in [c for c in self._memoria if c[0] != version]:
+                    del self._memoria[clave]
+            with self._conexion() as conn:
+                conn.execute('DELETE FROM predicciones WHERE version != ?', (version,))
+
+    def limpiar(self):
+        """Elimina todas las predicciones"""
+        with self._lock_escritura:
+            with self._lock:
+                self._memoria.clear()
+                self._pendientes.clear()
+                self._accedidos.clear()
+            with self._conexion() as conn:
+                conn.execute('DELETE FROM predicciones')
+
+    def estadisticas(self):
+        """Contadores de aciertos/fallos y tamaño del caché"""
+        with self._lock:
+            total = self.aciertos + self.fallos
+            return {
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': round(self.aciertos / total, 4) if total else 0.0,
+                'en_memoria': len(self._memoria),
+                'pendientes': len(self._pendientes),
+                'max_entradas': self.max_entradas
+            }
+
+
+class _Vuelo:
+    """Un cálculo en curso y su resultado"""
+
+    __slots__ = ('terminado', 'resultado', 'error')
+
+    def __init__(self):
+        self.terminado = threading.Event()
+        self.resultado = None
+        self.error = None
+
+
+class VueloUnico:
+    """
+    Single-flight: para cada clave solo corre un cálculo a la vez; quienes
+    llegan mientras tanto esperan y reciben una copia de su resultado (o su
+    excepción).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._en_curso = {}
+        self.calculados = 0
+        self.compartidos = 0
+
+    def ejecutar(self, clave, funcion):
+        """
+        Ejecuta funcion() una sola vez por clave entre llamadas concurrentes.
+
+        Returns:
+            Resultado de funcion() (copia para quienes esperaron)
+        """
+        with self._lock:
+            vuelo = self._en_curso.get(clave)
+            lider = vuelo is None
+            if lider:
+                vuelo = self._en_curso[clave] = _Vuelo()
+            else:
+                self.compartidos += 1
+
+        if not lider:
+            vuelo.terminado.wait()
+            if vuelo.error is not None:
+                raise vuelo.error
+            return copy.deepcopy(vuelo.resultado)
+
+        try:
+            vuelo.resultado = funcion()
+            return vuelo.resultado
+        except BaseException as e:
+            vuelo.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._en_curso[clave]
+                self.calculados += 1
+            vuelo.terminado.set()
+
+    def estadisticas(self):
+        """Cálculos ejecutados, solicitudes que compartieron uno y cálculos en curso"""
+        with self._lock:
+            return {
+                'calculados': self.calculados,
+                'compartidos': self.compartidos,
+                'en_curso': len(self._en_curso)
+            }
@@ -1,8 +1,12 @@
 """
 entrenar_sistema_completo.py
 Script para entrenar ambos modelos (LSTM + Espacial) desde cero
+
+Uso: python entrenar_sistema_completo.py [--procesos N] [--batch-size B] [--jit] [--incremental]
+                                     [--arquitectura por_tipo|global]
 """
 
+import argparse
 import os
 import sys
 
@@ -15,6 +19,20 @@ from modelo_PREDICCION_ESPACIAL import entrenar_modelo_espacial
 
 def main():
     """Entrena el sistema completo de predicción"""
+    parser = argparse.ArgumentParser(description='Entrena el sistema completo de predicción')
+    parser.add_argument('--procesos', type=int, default=int(os.environ.get('PROCESOS_ENTRENAMIENTO', 1)),
+                        help='Procesos para entrenar los modelos LSTM por tipo en paralelo (1 = secuencial)')
+    parser.add_argument('--batch-size', type=int, default=int(os.environ.get('BATCH_SIZE_ENTRENAMIENTO', 16)),
+                        help='Tamaño de lote del entrenamiento LSTM')
+    parser.add_argument('--jit', action='store_true',
+                        default=os.environ.get('JIT_ENTRENAMIENTO', 'false').lower() == 'true',
+                        help='Compilar los pasos de entrenamiento con XLA')
+    parser.add_argument('--arquitectura', choices=('por_tipo', 'global'),
+                        default=os.environ.get('ARQUITECTURA_MODELO') or 'por_tipo',
+                        help='Una red LSTM por tipo o una sola red global para todos los tipos')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Ajustar los modelos LSTM guardados solo con los meses nuevos del dataset')
+    args = parser.parse_args()
     
     print("\n" + "="*80)
     print(" " * 20 + "SISTEMA DE PREDICCIÓN DE INCIDENCIAS REQUE")
@@ -41,8 +59,14 @@ def main():
     print("="*80 + "\n")
     
     try:
-        modelo_lstm = ModeloPrediccionIncidencias()
-        modelo_lstm.entrenar_modelos(csv_path)
+        modelo_lstm = ModeloPrediccionIncidencias(arquitectura=args.arquitectura)
+        if args.incremental:
+            modelo_lstm.cargar_modelos()
+            resumen = modelo_lstm.reentrenar_incremental(csv_path)
+            print(f"   - Meses nuevos: {resumen['meses_nuevos']}")
+        else:
+            modelo_lstm.entrenar_modelos(csv_path, n_procesos=args.procesos,
+                                         batch_size=args.batch_size, jit=args.jit)
         
         print("\n✅ FASE 1 COMPLETADA: Modelo LSTM entrenado exitosamente")
         print(f"   - Tipos de denuncias: {len(modelo_lstm.models_den)}")
@@ -127,6 +151,11 @@ def main():
     print(f"   • MAE promedio denuncias: {mae_prom_den:.2f}")
     print(f"   • MAE promedio emergencias: {mae_prom_eme:.2f}")
     
+    segundos = [info['metrics'].get('segundos_entrenamiento', 0)
+                for info in list(modelo_lstm.models_den.values()) + list(modelo_lstm.models_eme.values())]
+    print(f"   • Tiempo de entrenamiento por tipo: {sum(segundos) / max(1, len(segundos)):.1f} s promedio, "
+          f"{max(segundos, default=0):.1f} s máximo")
+    
     print(f"\n🗺️  Modelo Espacial:")
     print(f"   • Cuadrantes creados: {len(modelo_espacial.cuadrantes)}")
     print(f"   • Configuración: {n_filas}x{n_cols}")
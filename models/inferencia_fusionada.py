@@ -0,0 +1,123 @@
+"""
+models/inferencia_fusionada.py
+Inferencia fusionada: todos los modelos por tipo de una familia en una sola invocación
+
+En lugar de llamar 12 (denuncias) + 6 (emergencias) predictores por cada mes del
+pronóstico recursivo, se construye un único grafo por familia:
+  - motor numpy: pesos apilados (RedLSTMNumpyApilada)
+  - motor keras: tf.function multi-entrada/multi-salida con firma fija
+
+Con la arquitectura global la familia ya es una sola red: las ventanas de todos
+los tipos, cada una con el one-hot de su tipo, van en un único lote.
+"""
+
+import numpy as np
+
+from models.inferencia_numpy import RedLSTMNumpy, RedLSTMNumpyApilada
+
+
+class PredictorFusionado:
+    """
+    Ejecuta un paso de pronóstico para todos los tipos a la vez.
+
+    Args de __call__:
+        X: (n_tipos, batch, lookback, n_features) en el orden de self.tipos
+    Returns:
+        np.ndarray (n_tipos, batch) en escala normalizada
+    """
+
+    def __init__(self, tipos, lookback, n_features, funcion):
+        self.tipos = tipos
+        self.indices = {tipo_id: idx for idx, tipo_id in enumerate(tipos)}
+        self.lookback = lookback
+        self.n_features = n_features
+        self._funcion = funcion
+
+    def __call__(self, X):
+        return np.asarray(self._funcion(X)).reshape(len(self.tipos), -1)
+
+
+def construir_predictor_fusionado(model_dict, n_features):
+    """
+    Construye el predictor fusionado de una familia (denuncias o emergencias).
+
+    Lanza ValueError si los tipos no comparten lookback o arquitectura; en ese
+    caso el modelo sigue usando los predictores por tipo.
+    """
+    tipos = sorted(t for t, info in model_dict.items() if info is not None)
+    if not tipos:
+        raise ValueError("No hay modelos para fusionar")
+
+    lookbacks = {model_dict[t]['lookback'] for t in tipos}
+    if len(lookbacks) != 1:
+        raise ValueError(f"Los tipos no comparten lookback: {sorted(lookbacks)}")
+    lookback = lookbacks.pop()
+
+    modelos = [model_dict[t]['model'] for t in tipos]
+
+    if all(isinstance(m, RedLSTMNumpy) for m in modelos):
+        return PredictorFusionado(tipos, lookback, n_features, RedLSTMNumpyApilada(modelos))
+
+    import tensorflow as tf
+
+    @tf.function(input_signature=[
+        tf.TensorSpec(shape=(len(modelos), None, lookback, n_features), dtype=tf.float32)
+    ])
+    def _inferencia(X):
+        return tf.stack([m(X[k], training=False) for k, m in enumerate(modelos)])
+
+    def funcion(X):
+        return _inferencia(tf.convert_to_tensor(X, dtype=tf.float32)).numpy()
+
+    # Trazar el grafo al construirlo
+    funcion(np.zeros((len(modelos), 1, lookback, n_features), dtype=np.float32))
+
+    return PredictorFusionado(tipos, lookback, n_features, funcion)
+
+
+def agregar_tipo(X, indice, n_tipos):
+    """Concatena el one-hot del tipo a cada paso de las ventanas (entrada de la red global)"""
+    X = np.asarray(X, dtype=np.float32)
+    one_hot = np.zeros(X.shape[:-1] + (n_tipos,), dtype=np.float32)
+    one_hot[..., indice] = 1.0
+    return np.concatenate([X, one_hot], axis=-1)
+
+
+class PredictorTipoGlobal:
+    """
+    Predictor de un tipo sobre la red global compartida.
+    Misma firma que los predictores por tipo: (batch, lookback, n_features) → (batch, 1)
+    """
+
+    def __init__(self, red, indice, n_tipos):
+        self.red = red  # predictor de la red global (batch, lookback, n_features + n_tipos)
+        self.indice = indice
+        self.n_tipos = n_tipos
+
+    def __call__(self, X):
+        return self.red(agregar_tipo(X, self.indice, self.n_tipos))
+
+
+def construir_predictor_fusionado_global(model_dict, n_features):
+    """
+    Predictor fusionado de una familia con la red global: todas las ventanas
+    van en un solo lote a la misma red, cada una con el one-hot de su tipo.
+    """
+    tipos = sorted(t for t, info in model_dict.items() if info is not None)
+    if not tipos:
+        raise ValueError("No hay modelos para fusionar")
+
+    predictores = [model_dict[t]['predictor'] for t in tipos]
+    red = predictores[0].red
+    n_tipos = predictores[0].n_tipos
+    lookback = model_dict[tipos[0]]['lookback']
+    indices = np.array([p.indice for p in predictores])
+
+    def funcion(X):
+        X = np.asarray(X, dtype=np.float32)
+        one_hot = np.zeros(X.shape[:-1] + (n_tipos,), dtype=np.float32)
+        one_hot[np.arange(len(tipos)), ..., indices] = 1.0
+        entrada = np.concatenate([X, one_hot], axis=-1)
+        return red(entrada.reshape((-1,) + entrada.shape[2:]))
+
+    return PredictorFusionado(tipos, lookback, n_features, funcion)
@@ -0,0 +1,269 @@
+"""
+models/inferencia_numpy.py
+Motor de inferencia en NumPy puro para los modelos LSTM por tipo
+
+Lee los pesos de los archivos .keras (zip con config.json + model.weights.h5)
+y ejecuta el forward pass BiLSTM → BiLSTM → Dense → Dense sin importar
+TensorFlow.
+
+Las tasas de Dropout se guardan en la capa anterior: predict_estocastico las
+aplica (Monte Carlo dropout); predict las ignora como Keras en inferencia.
+"""
+
+import io
+import json
+import re
+import zipfile
+
+import numpy as np
+
+# Diferencia máxima aceptada frente a la salida de Keras (escala normalizada)
+TOLERANCIA_KERAS = 1e-4
+
+# Capas sin pesos que se ignoran en inferencia
+CAPAS_SIN_PESOS = {'InputLayer', 'Dropout'}
+
+ACTIVACIONES = {
+    'tanh': np.tanh,
+    'sigmoid': lambda x: 1.0 / (1.0 + np.exp(-x)),
+    'relu': lambda x: np.maximum(x, 0.0),
+    'linear': lambda x: x,
+}
+
+
+def _nombre_guardado(class_name, contador):
+    """Reproduce el nombre que Keras usa dentro de model.weights.h5"""
+    base = re.sub(r'(?<!^)(?=[A-Z])', '_', class_name).lower()
+    n = contador.get(base, 0)
+    contador[base] = n + 1
+    return base if n == 0 else f"{base}_{n}"
+
+
+def _leer_lstm(grupo, config):
+    """Extrae kernel, recurrent_kernel y bias de una celda LSTM"""
+    vars_ = grupo['cell']['vars']
+    return {
+        'kernel': np.asarray(vars_['0'], dtype=np.float32),
+        'recurrent_kernel': np.asarray(vars_['1'], dtype=np.float32),
+        'bias': np.asarray(vars_['2'], dtype=np.float32),
+        'units': config['units'],
+        'activation': config.get('activation', 'tanh'),
+        'recurrent_activation': config.get('recurrent_activation', 'sigmoid'),
+        'return_sequences': config.get('return_sequences', False),
+    }
+
+
+def _lstm_forward(X, capa, reverso=False):
+    """
+    LSTM vectorizado sobre el batch.
+    X: (..., pasos, features) → (..., pasos, units) o (..., units)
+
+    Las dimensiones iniciales permiten ejecutar varias redes apiladas a la vez
+    (ver RedLSTMNumpyApilada).
+    """
+    pasos = X.shape[-2]
+    units = capa['units']
+    act = ACTIVACIONES[capa['activation']]
+    rec_act = ACTIVACIONES[capa['recurrent_activation']]
+
+    if reverso:
+        X = X[..., ::-1, :]
+
+    # Proyección de entrada para todos los pasos a la vez
+    kernel = capa['kernel']
+    if kernel.ndim == 2:
+        # Un solo GEMM 2D: np.matmul sobre un lote 3D es varias veces más lento
+        Xw = (X.reshape(-1, X.shape[-1]) @ kernel).reshape(X.shape[:-1] + (kernel.shape[-1],)) + capa['bias']
+    else:
+        Xw = np.matmul(X, kernel) + capa['bias']
+    U = capa['recurrent_kernel']
+
+    h = np.zeros(Xw.shape[:-2] + (units,), dtype=np.float32)
+    c = np.zeros_like(h)
+    salidas = []
+
+    for t in range(pasos):
+        z = Xw[..., t, :] + np.matmul(h, U)
+        i = rec_act(z[..., :units])
+        f = rec_act(z[..., units:2 * units])
+        g = act(z[..., 2 * units:3 * units])
+        o = rec_act(z[..., 3 * units:])
+        c = f * c + i * g
+        h = o * act(c)
+        salidas.append(h)
+
+    if not capa['return_sequences']:
+        return h
+
+    secuencia = np.stack(salidas, axis=-2)
+    # Keras reordena la salida del LSTM inverso para alinearla en el tiempo
+    return secuencia[..., ::-1, :] if reverso else secuencia
+
+
+def _forward(capas, X, rng=None):
+    """
+    Forward pass completo sobre una lista de capas.
+    Con `rng` (np.random.Generator) se aplica el dropout de cada capa.
+    """
+    salida = np.asarray(X, dtype=np.float32)
+
+    for capa in capas:
+        if capa['tipo'] == 'bidirectional':
+            adelante = _lstm_forward(salida, capa['forward'])
+            atras = _lstm_forward(salida, capa['backward'], reverso=True)
+            salida = np.concatenate([adelante, atras], axis=-1)
+        else:
+            salida = ACTIVACIONES[capa['activation']](np.matmul(salida, capa['kernel']) + capa['bias'])
+
+        tasa = capa.get('dropout', 0.0)
+        if rng is not None and tasa > 0:
+            # Dropout invertido, igual que Keras con training=True
+            salida = salida * (rng.random(salida.shape, dtype=np.float32) >= tasa) / np.float32(1 - tasa)
+
+    return salida
+
+
+class RedLSTMNumpy:
+    """
+    Red por tipo ejecutada en NumPy.
+    Expone predict(X, verbose=0) con la misma firma que un modelo Keras.
+    """
+
+    def __init__(self, capas, input_shape):
+        self.capas = capas
+        self.input_shape = input_shape
+
+    @classmethod
+    def desde_archivo(cls, ruta):
+        """Construye la red a partir de un archivo .keras"""
+        import h5py  # solo para leer .keras (el artefacto plano no lo necesita)
+
+        with zipfile.ZipFile(ruta) as zf:
+            config = json.loads(zf.read('config.json'))
+            pesos_h5 = zf.read('model.weights.h5')
+
+        capas = []
+        contador = {}
+        input_shape = None
+
+        with h5py.File(io.BytesIO(pesos_h5), 'r') as h5:
+            for capa_cfg in config['config']['layers']:
+                clase = capa_cfg['class_name']
+                cfg = capa_cfg['config']
+
+                if clase == 'InputLayer':
+                    input_shape = tuple(cfg['batch_shape'][1:])
+                    continue
+                if clase == 'Dropout' and capas:
+                    capas[-1]['dropout'] = float(cfg.get('rate', 0.0))
+                if clase in CAPAS_SIN_PESOS:
+                    continue
+
+                grupo = h5['layers'][_nombre_guardado(clase, contador)]
+
+                if clase == 'Bidirectional':
+                    if cfg.get('merge_mode', 'concat') != 'concat':
+                        raise ValueError(f"merge_mode no soportado: {cfg.get('merge_mode')}")
+                    capas.append({
+                        'tipo': 'bidirectional',
+                        'forward': _leer_lstm(grupo['forward_layer'], cfg['layer']['config']),
+                        'backward': _leer_lstm(grupo['backward_layer'], cfg['backward_layer']['config']),
+                    })
+                elif clase == 'Dense':
+                    vars_ = grupo['vars']
+                    capas.append({
+                        'tipo': 'dense',
+                        'kernel': np.asarray(vars_['0'], dtype=np.float32),
+                        'bias': np.asarray(vars_['1'], dtype=np.float32),
+                        'activation': cfg.get('activation', 'linear'),
+                    })
+                else:
+                    raise ValueError(f"Capa no soportada por el motor NumPy: {clase}")
+
+        return cls(capas, input_shape)
+
+    def __call__(self, X):
+        return _forward(self.capas, X)
+
+    def predict(self, X, verbose=0):
+        """Compatible con model.predict de Keras"""
+        return self(X)
+
+    def predict_estocastico(self, X, rng):
+        """Forward con dropout activo (equivale a model(X, training=True) en Keras)"""
+        return _forward(self.capas, X, rng)
+
+
+def _apilar_lstm(celdas):
+    """Apila los pesos de una celda LSTM de varias redes: (n_redes, ...)"""
+    base = celdas[0]
+    for celda in celdas[1:]:
+        for clave in ('units', 'activation', 'recurrent_activation', 'return_sequences'):
+            if celda[clave] != base[clave]:
+                raise ValueError(f"Las redes no comparten arquitectura ({clave})")
+    return {
+        **base,
+        # (n, 1, in, 4u) para proyectar X de forma (n, batch, pasos, in)
+        'kernel': np.stack([c['kernel'] for c in celdas])[:, None],
+        'recurrent_kernel': np.stack([c['recurrent_kernel'] for c in celdas]),
+        'bias': np.stack([c['bias'] for c in celdas])[:, None, None, :],
+    }
+
+
+class RedLSTMNumpyApilada:
+    """
+    Varias redes por tipo con la misma arquitectura ejecutadas en una sola pasada.
+    X: (n_redes, batch, pasos, features) → (n_redes, batch, 1)
+    """
+
+    def __init__(self, redes):
+        if not redes:
+            raise ValueError("Se requiere al menos una red")
+
+        estructura = [(c['tipo'], c.get('activation')) for c in redes[0].capas]
+        for red in redes[1:]:
+            if [(c['tipo'], c.get('activation')) for c in red.capas] != estructura:
+                raise ValueError("Las redes no comparten arquitectura")
+            if red.input_shape != redes[0].input_shape:
+                raise ValueError("Las redes no comparten input_shape")
+
+        self.n_redes = len(redes)
+        self.input_shape = redes[0].input_shape
+        self.capas = []
+
+        for idx, capa in enumerate(redes[0].capas):
+            grupo = [red.capas[idx] for red in redes]
+            if capa['tipo'] == 'bidirectional':
+                self.capas.append({
+                    'tipo': 'bidirectional',
+                    'forward': _apilar_lstm([c['forward'] for c in grupo]),
+                    'backward': _apilar_lstm([c['backward'] for c in grupo]),
+                })
+            else:
+                self.capas.append({
+                    'tipo': 'dense',
+                    'kernel': np.stack([c['kernel'] for c in grupo]),
+                    'bias': np.stack([c['bias'] for c in grupo])[:, None, :],
+                    'activation': capa['activation'],
+                })
+
+    def __call__(self, X):
+        return _forward(self.capas, X)
+
+
+def cargar_red_numpy(ruta):
+    """Atajo para cargar un .keras en el motor NumPy"""
+    return RedLSTMNumpy.desde_archivo(ruta)
+
+
+def verificar_contra_keras(red_numpy, modelo_keras, X, tolerancia=TOLERANCIA_KERAS):
+    """
+    Compara la salida NumPy con model.predict de Keras.
+
+    Returns:
+        tuple: (ok, diferencia_maxima)
+    """
+    esperado = modelo_keras.predict(X, verbose=0)
+    obtenido = red_numpy.predict(X)
+    diferencia = float(np.max(np.abs(esperado - obtenido)))
+    return diferencia <= tolerancia, diferencia
@@ -9,68 +9,280 @@ import pickle
 import os
 from sklearn.preprocessing import RobustScaler
 from sklearn.metrics import mean_absolute_error, mean_squared_error
-import tensorflow as tf
-from tensorflow.keras.models import Sequential, load_model
-from tensorflow.keras.layers import LSTM, Dense, Dropout, Bidirectional
-from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
-from tensorflow.keras.regularizers import l2
 from functools import lru_cache
 import hashlib
 import json
+import threading
+import time
+from contextlib import nullcontext
 
 # Configuración de reproducibilidad
 RANDOM_SEED = 42
 np.random.seed(RANDOM_SEED)
-tf.random.set_seed(RANDOM_SEED)
 
 # Rutas de archivos
 MODEL_DIR = 'modelos_entrenados'
 DATA_DIR = 'datos_procesados'
 CACHE_DIR = 'cache_predicciones'
 
+# Versión de los artefactos: la escribe guardar_modelos() al final, cuando todos
+# los archivos ya fueron reemplazados. Los demás procesos la consultan para recargar.
+ARCHIVO_VERSION = 'version.json'
+INTERVALO_VERIFICACION_VERSION = 5  # segundos entre consultas al disco
+
+# Motores de inferencia disponibles
+# - keras: TensorFlow con predictor compilado (tf.function de firma fija)
+# - numpy: forward pass en NumPy (no importa TensorFlow)
+# - plano: motor NumPy sobre el artefacto plano cuantizado y mapeado en memoria
+#   (ver models/artefacto_plano.py); sin artefacto de la versión actual lee los .keras
+MOTORES_INFERENCIA = ('keras', 'numpy', 'plano')
+MOTOR_INFERENCIA_DEFAULT = 'keras'
+
+# Motor de predicción por solicitud (predecir_mes(..., engine=...))
+# - lstm: redes LSTM con el motor de inferencia configurado
+# - fast: Ridge sobre la misma ventana escalada, entrenado junto a cada LSTM y
+#   guardado en metadata.pkl; también es el respaldo automático cuando las
+#   redes LSTM no se pueden usar (p. ej. TensorFlow no está instalado)
+ENGINES_PREDICCION = ('lstm', 'fast')
+ALPHA_RAPIDO = 1.0
+
+# Intervalos por Monte Carlo dropout: N pasadas con dropout activo, todas en un
+# solo lote (N, lookback, n_features) por tipo y mes; cada muestra avanza su
+# propia ventana con su propio conteo.
+N_MUESTRAS_MC = 30
+MAX_MUESTRAS_MC = 30
+CUANTILES_MC = (0.05, 0.5, 0.95)
+# Presupuesto de latencia: predecir_intervalos con hasta MAX_MUESTRAS_MC muestras
+# tarda a lo sumo PRESUPUESTO_INTERVALOS_MC veces el pronóstico puntual por tipo
+# con keras del mismo horizonte (caché frío, un núcleo; se verifica con
+# scripts/benchmark_intervalos.py). Medido en 24 meses x 18 tipos: puntual
+# 0.7-0.9 s; intervalos 1.1-1.2 s con 30 muestras (1.2-1.8x), 1.2-1.5 s con 50
+# (1.7-2.1x), por eso los pedidos de más muestras se recortan a MAX_MUESTRAS_MC.
+# NumPy tarda 3x con 30 muestras y 7x con 100 (su GEMM es varias veces más lento
+# que el de TensorFlow): con motor numpy o plano los intervalos se calculan con
+# las redes Keras del mismo artefacto, y sin TensorFlow no se ofrecen.
+PRESUPUESTO_INTERVALOS_MC = 2.0
+MOTOR_INTERVALOS = 'keras'
+
+# Arquitecturas de modelo
+# - por_tipo: una red BiLSTM por tipo (den_tipo_*.keras / eme_tipo_*.keras)
+# - global: una sola red para los 18 tipos, entrenada una vez sobre todas las
+#   series; el tipo entra como one-hot concatenado a cada paso de la ventana
+#   (un embedding aprendido por la proyección de entrada de la primera LSTM).
+#   Sus artefactos van en MODEL_DIR/global y DATA_DIR/global.
+ARQUITECTURAS = ('por_tipo', 'global')
+ARQUITECTURA_DEFAULT = 'por_tipo'
+SUBDIR_GLOBAL = 'global'
+ARCHIVO_RED_GLOBAL = 'red_global.keras'
+
+# Entrenamiento: pipeline tf.data (cache + shuffle + batch + prefetch)
+BATCH_SIZE_ENTRENAMIENTO = 16
+JIT_ENTRENAMIENTO = False  # compilar los pasos de entrenamiento con XLA
+
+# Reentrenamiento incremental (warm start)
+EPOCHS_AJUSTE = 20
+TASA_AJUSTE = 1e-4  # learning rate del ajuste fino
+# MAE de validación tolerado sobre el del último entrenamiento; margen amplio porque
+# la ventana de validación se desplaza con los meses nuevos
+TOLERANCIA_DEGRADACION = 0.50
+
+# Features de entrada de la red (en este orden)
+# Red por tipo: la arquitectura original. La búsqueda de hiperparámetros guarda
+# el ganador de cada tipo en metadata (den_hiperparametros / eme_hiperparametros)
+HIPERPARAMETROS_DEFAULT = {'unidades': (64, 32, 16), 'lookback': 6, 'dropout': (0.3, 0.3, 0.2), 'l2': 0.001}
+
+FEATURES = ['sin_m', 'cos_m', 'sin_q', 'cos_q', 'trend', 'month_idx', 'count']
+IDX_COUNT = FEATURES.index('count')
+
+_tf = None
+
+
+def _scalers_por_columna(scaler, columnas):
+    """
+    Divide un RobustScaler ajustado sobre varias columnas en uno por columna,
+    idéntico al que se obtiene ajustando cada columna por separado.
+    """
+    import copy
+    
+    scalers = {}
+    for i, c in enumerate(columnas):
+        parcial = copy.copy(scaler)
+        parcial.center_ = scaler.center_[i:i + 1].copy()
+        parcial.scale_ = scaler.scale_[i:i + 1].copy()
+        parcial.n_features_in_ = 1
+        parcial.feature_names_in_ = np.array([c], dtype=object)
+        scalers[c] = parcial
+    return scalers
+
+
+def _rango_meses(df_month):
+    """
+    Primer y último (year, month) de una serie mensual.
+    
+    Se compara year*12+month: con un año parcial (p. ej. 2025-01..03) el
+    máximo de 'month' por separado sería el de un año anterior.
+    """
+    claves = df_month['year'].astype(int) * 12 + df_month['month'].astype(int) - 1
+    primero, ultimo = int(claves.min()), int(claves.max())
+    return (primero // 12, primero % 12 + 1), (ultimo // 12, ultimo % 12 + 1)
+
+
+class VersionModeloCambiada(RuntimeError):
+    """Se publicó otra versión en disco antes de cargar una red diferida de la versión activa"""
+
+
+def _reemplazo_atomico(ruta, escribir):
+    """
+    Escribe un archivo en una ruta temporal y lo reemplaza con os.replace, de modo
+    que otro proceso nunca lea un artefacto a medio escribir.
+    """
+    base, extension = os.path.splitext(ruta)
+    ruta_tmp = f'{base}.tmp{os.getpid()}{extension}'  # Keras exige la extensión .keras
+    try:
+        escribir(ruta_tmp)
+        os.replace(ruta_tmp, ruta)
+    finally:
+        if os.path.exists(ruta_tmp):
+            os.remove(ruta_tmp)
+
+
+def _importar_tensorflow():
+    """Importa TensorFlow solo cuando se necesita (entrenamiento o motor keras)"""
+    global _tf
+    if _tf is None:
+        import tensorflow as tf
+        tf.random.set_seed(RANDOM_SEED)
+        _tf = tf
+    return _tf
+
 
 class ModeloPrediccionIncidencias:
     """Clase optimizada para predicción de incidencias"""
     
-    def __init__(self):
+    def __init__(self, motor_inferencia=MOTOR_INFERENCIA_DEFAULT, fusionado=False,
+                 carga_diferida=False, precalentar=False, arquitectura=ARQUITECTURA_DEFAULT,
+                 microbatch=False, microbatch_espera_ms=None, microbatch_max_lote=None):
+        if motor_inferencia not in MOTORES_INFERENCIA:
+            raise ValueError(f"Motor de inferencia no válido: {motor_inferencia}. Opciones: {MOTORES_INFERENCIA}")
+        if arquitectura not in ARQUITECTURAS:
+            raise ValueError(f"Arquitectura no válida: {arquitectura}. Opciones: {ARQUITECTURAS}")
+        
+        self.motor_inferencia = motor_inferencia
+        self.arquitectura = arquitectura
+        self.fusionado = fusionado  # Un solo grafo por familia en cada paso
+        self.carga_diferida = carga_diferida  # Cada red se carga en su primer uso
+        self.precalentar = precalentar  # Con carga diferida: cargar las redes en un hilo aparte
+        self.estado_precalentamiento = 'desactivado'
+        self.predictores_fusionados = {}
         self.models_den = {}
         self.models_eme = {}
         self.den_monthly = None
         self.eme_monthly = None
         self.trained = False
-        self.cache_predicciones = {}  # Caché en memoria
+        self.version_modelo = None
+        self.cache_predicciones = None  # CachePredicciones (SQLite)
+        self._artefacto_plano = None  # ArtefactoPlano de la versión cargada (motor 'plano')
+        
+        # Recarga en caliente: los modelos activos se reemplazan juntos bajo este lock
+        self._lock_modelos = threading.RLock()
+        self._recarga_en_curso = False
+        self._recarga_terminada = threading.Event()
+        self._recarga_terminada.set()
+        self._ultima_verificacion = 0.0
+        self._lock_carga = threading.RLock()  # Carga diferida de redes
+        
+        # Solicitudes idénticas concurrentes comparten un solo cálculo
+        from models.cache_predicciones import VueloUnico
+        self.vuelo_unico = VueloUnico()
+        
+        # callable(modelo) a ejecutar cada vez que se activa una versión (carga, recarga o entrenamiento)
+        self.al_activar_version = []
+        
+        # Micro-batching: pasos LSTM de solicitudes concurrentes en un solo lote
+        self.planificador = None
+        if microbatch:
+            from models.planificador_inferencia import PlanificadorInferencia, MAX_ESPERA_MS, MAX_LOTE
+            self.planificador = PlanificadorInferencia(
+                MAX_ESPERA_MS if microbatch_espera_ms is None else microbatch_espera_ms,
+                MAX_LOTE if microbatch_max_lote is None else microbatch_max_lote
+            )
         
         # Crear directorios
-        os.makedirs(MODEL_DIR, exist_ok=True)
-        os.makedirs(DATA_DIR, exist_ok=True)
+        os.makedirs(self._dir_modelos(), exist_ok=True)
+        os.makedirs(self._dir_datos(), exist_ok=True)
         os.makedirs(CACHE_DIR, exist_ok=True)
         
         # Cargar caché de disco si existe
         self._cargar_cache_disco()
     
+    def _dir_modelos(self):
+        """Directorio de redes y metadata de la arquitectura activa"""
+        return MODEL_DIR if self.arquitectura == 'por_tipo' else os.path.join(MODEL_DIR, SUBDIR_GLOBAL)
+    
+    def _dir_datos(self):
+        """Directorio de las series mensuales de la arquitectura activa"""
+        return DATA_DIR if self.arquitectura == 'por_tipo' else os.path.join(DATA_DIR, SUBDIR_GLOBAL)
+    
     def _cargar_cache_disco(self):
-        """Carga caché de predicciones previas"""
-        cache_path = f'{CACHE_DIR}/predicciones_cache.pkl'
-        if os.path.exists(cache_path):
-            try:
-                with open(cache_path, 'rb') as f:
-                    self.cache_predicciones = pickle.load(f)
-                print(f"✅ Caché cargado: {len(self.cache_predicciones)} predicciones")
-            except:
-                self.cache_predicciones = {}
+        """Abre el almacén de caché (no carga su contenido completo en memoria)"""
+        from models.cache_predicciones import CachePredicciones
+        # Un almacén por arquitectura: al purgar versiones una no borra las de la otra
+        nombre = 'predicciones_cache' if self.arquitectura == 'por_tipo' else f'predicciones_cache_{self.arquitectura}'
+        self.cache_predicciones = CachePredicciones(f'{CACHE_DIR}/{nombre}.sqlite3')
     
     def _guardar_cache_disco(self):
-        """Guarda caché en disco"""
-        cache_path = f'{CACHE_DIR}/predicciones_cache.pkl'
+        """Escribe en disco las predicciones pendientes (escritura diferida)"""
+        self.cache_predicciones.flush()
+    
+    def _archivos_modelo(self):
+        """Artefactos que definen una versión del modelo (redes, metadata y series mensuales)"""
+        archivos = sorted(
+            os.path.join(self._dir_modelos(), nombre) for nombre in os.listdir(self._dir_modelos())
+            if nombre.endswith('.keras') and '.tmp' not in nombre
+        )
+        archivos.append(f'{self._dir_modelos()}/metadata.pkl')
+        archivos.append(f'{self._dir_datos()}/den_monthly.pkl')
+        archivos.append(f'{self._dir_datos()}/eme_monthly.pkl')
+        return [a for a in archivos if os.path.exists(a)]
+    
+    def _calcular_version_modelo(self):
+        """Versión de los modelos en disco: hash de todos los artefactos"""
+        if not os.path.exists(f'{self._dir_modelos()}/metadata.pkl'):
+            return 'sin_modelo'
+        
+        sha = hashlib.sha1()
+        for ruta in self._archivos_modelo():
+            sha.update(os.path.basename(ruta).encode())
+            with open(ruta, 'rb') as f:
+                for bloque in iter(lambda: f.read(1 << 20), b''):
+                    sha.update(bloque)
+        return sha.hexdigest()[:12]
+    
+    def _leer_version_disco(self):
+        """Versión publicada en version.json (None si los artefactos no la tienen)"""
         try:
-            with open(cache_path, 'wb') as f:
-                pickle.dump(self.cache_predicciones, f)
-        except Exception as e:
-            print(f"⚠️  Error guardando caché: {e}")
+            with open(f'{self._dir_modelos()}/{ARCHIVO_VERSION}') as f:
+                return json.load(f)['version']
+        except (OSError, ValueError, KeyError):
+            return None
     
-    def _get_cache_key(self, year, month, tipo_id, tipo_modelo):
+    def _publicar_version(self):
+        """Calcula la versión de los artefactos recién guardados y la publica en version.json"""
+        version = self._calcular_version_modelo()
+        contenido = {'version': version, 'fecha': time.strftime('%Y-%m-%dT%H:%M:%S')}
+        
+        def escribir(ruta):
+            with open(ruta, 'w') as f:
+                json.dump(contenido, f)
+        
+        _reemplazo_atomico(f'{self._dir_modelos()}/{ARCHIVO_VERSION}', escribir)
+        return version
+    
+    def _get_cache_key(self, year, month, tipo_id, tipo_modelo, version=None):
         """Genera clave única para caché"""
-        return f"{tipo_modelo}_{tipo_id}_{year}_{month:02d}"
+        if version is None:
+            version = self.version_modelo
+        return (version, tipo_modelo, int(tipo_id), int(year), int(month))
     
     def build_monthly_series(self, df_in, col_id):
         """Construye serie temporal mensual con features temporales"""
@@ -93,34 +305,74 @@ class ModeloPrediccionIncidencias:
                     names=['year', 'month', col_id]), fill_value=0)
                 .reset_index())
         
-        # Features temporales
+        full = self._agregar_features(full)
+        
+        return full.sort_values(['year', 'month', col_id]).reset_index(drop=True)
+    
+    def _agregar_features(self, full, trend_inicial=0):
+        """Features temporales de una serie mensual; trend numera sus filas desde trend_inicial"""
         full['sin_m'] = np.sin(2 * np.pi * full.month / 12)
         full['cos_m'] = np.cos(2 * np.pi * full.month / 12)
         full['sin_q'] = np.sin(2 * np.pi * full.month / 3)
         full['cos_q'] = np.cos(2 * np.pi * full.month / 3)
-        full['trend'] = np.arange(len(full))
+        full['trend'] = trend_inicial + np.arange(len(full))
         full['month_idx'] = full['month']
-        
-        return full.sort_values(['year', 'month', col_id]).reset_index(drop=True)
+        return full
     
-    def make_lstm_dataset(self, df_in, lookback=6):
-        """Prepara dataset para LSTM"""
-        feat = ['sin_m', 'cos_m', 'sin_q', 'cos_q', 'trend', 'month_idx', 'count']
-        df = df_in[feat].copy()
+    def make_lstm_dataset(self, df_in, lookback=6, scalers=None, dtype=np.float64):
+        """
+        Prepara dataset para LSTM
+        
+        Un solo RobustScaler ajustado sobre la matriz de features (es por columna,
+        así que equivale a uno por feature) y ventanas por strides sobre un array
+        contiguo, sin recorrer el DataFrame fila por fila. Se retorna el dict
+        {feature: RobustScaler} que usan metadata.pkl y el pronóstico.
+        
+        Con `scalers` se reutilizan los ya ajustados (solo transform), como en el
+        reentrenamiento incremental.
+        
+        Args:
+            dtype: Tipo de X e y (float64 por defecto; float32 evita la conversión en Keras)
+        """
+        feat = FEATURES
+        valores = df_in[feat].to_numpy(dtype=np.float64)
+        
+        if scalers is None:
+            scaler = RobustScaler().fit(df_in[feat])
+            scalers = _scalers_por_columna(scaler, feat)
+            centros, escalas = scaler.center_, scaler.scale_
+        else:
+            centros = np.array([scalers[c].center_[0] for c in feat])
+            escalas = np.array([scalers[c].scale_[0] for c in feat])
+        
+        # Mismas operaciones que RobustScaler.transform
+        valores -= centros
+        valores /= escalas
         
-        scalers = {c: RobustScaler() for c in feat}
-        for c in feat:
-            df[c] = scalers[c].fit_transform(df[[c]])
+        n_ventanas = len(valores) - lookback
+        if n_ventanas <= 0:
+            return np.array([]), np.array([]), scalers
         
-        X, y = [], []
-        for i in range(lookback, len(df)):
-            X.append(df.iloc[i-lookback:i].values)
-            y.append(df.iloc[i]['count'])
+        ventanas = np.lib.stride_tricks.sliding_window_view(valores, lookback, axis=0)[:n_ventanas]
+        X = np.ascontiguousarray(ventanas.transpose(0, 2, 1), dtype=dtype)
+        y = valores[lookback:, feat.index('count')].astype(dtype)
         
-        return np.array(X), np.array(y), scalers
+        return X, y, scalers
     
-    def train_model_per_type(self, df_month, tipo_id, lookback=6, epochs=300):
-        """Entrena modelo LSTM para un tipo específico"""
+    def train_model_per_type(self, df_month, tipo_id, lookback=6, epochs=300,
+                             batch_size=BATCH_SIZE_ENTRENAMIENTO, jit=JIT_ENTRENAMIENTO, hiperparametros=None):
+        """
+        Entrena modelo LSTM para un tipo específico
+        
+        Args:
+            batch_size: Tamaño de lote del pipeline de entrenamiento
+            jit: Compilar los pasos de entrenamiento con XLA
+            hiperparametros: Configuración de la red (ver HIPERPARAMETROS_DEFAULT);
+                su 'lookback' reemplaza al argumento lookback
+        """
+        inicio = time.perf_counter()
+        if hiperparametros is not None:
+            lookback = hiperparametros['lookback']
         col_tipo = df_month.columns[2]
         sub = df_month[df_month[col_tipo] == tipo_id].copy()
         
@@ -134,22 +386,65 @@ class ModeloPrediccionIncidencias:
         X_train, X_test = X[:split_idx], X[split_idx:]
         y_train, y_test = y[:split_idx], y[split_idx:]
         
-        # Arquitectura del modelo
-        model = Sequential([
-            Bidirectional(LSTM(64, return_sequences=True, 
-                              kernel_regularizer=l2(0.001)), 
-                         input_shape=(lookback, X.shape[-1])),
-            Dropout(0.3),
-            Bidirectional(LSTM(32, return_sequences=False,
-                              kernel_regularizer=l2(0.001))),
-            Dropout(0.3),
-            Dense(16, activation='relu', kernel_regularizer=l2(0.001)),
-            Dropout(0.2),
+        model = self._construir_red(lookback, X.shape[-1], hiperparametros)
+        self._ajustar_red(model, X_train, y_train, X_test, y_test, epochs, batch_size, jit)
+        
+        # Evaluación
+        mae, rmse = self._evaluar_modelo(model, X_test, y_test, scalers)
+        segundos = time.perf_counter() - inicio
+
+        print(f"Tipo {int(tipo_id):2d}  →  MAE: {mae:5.1f}  |  RMSE: {rmse:5.1f}  ({segundos:.1f} s)")
+
+        return {
+            'model': model,
+            'predictor': self._construir_predictor(model, lookback, X.shape[-1]),
+            'scalers': scalers,
+            'lookback': lookback,
+            'estado': self._construir_estado(sub, scalers, lookback),
+            'metrics': {'mae': mae, 'rmse': rmse, 'segundos_entrenamiento': segundos},
+            'rapido': self._entrenar_rapido(X, y, scalers),
+            'hiperparametros': hiperparametros
+        }
+    
+    def _construir_red(self, lookback, n_features, hiperparametros=None):
+        """
+        Arquitectura BiLSTM-BiLSTM-Dense-1, la misma por tipo y para la red global.
+        Sin hiperparametros es la original (64-32-16, dropout 0.3/0.3/0.2, L2 0.001).
+        """
+        _importar_tensorflow()
+        from tensorflow.keras.models import Sequential
+        from tensorflow.keras.layers import LSTM, Dense, Dropout, Bidirectional
+        from tensorflow.keras.regularizers import l2
+        
+        hp = hiperparametros or HIPERPARAMETROS_DEFAULT
+        unidades_1, unidades_2, unidades_densa = hp['unidades']
+        dropout_1, dropout_2, dropout_densa = hp['dropout']
+        
+        return Sequential([
+            Bidirectional(LSTM(unidades_1, return_sequences=True, 
+                              kernel_regularizer=l2(hp['l2'])), 
+                         input_shape=(lookback, n_features)),
+            Dropout(dropout_1),
+            Bidirectional(LSTM(unidades_2, return_sequences=False,
+                              kernel_regularizer=l2(hp['l2']))),
+            Dropout(dropout_2),
+            Dense(unidades_densa, activation='relu', kernel_regularizer=l2(hp['l2'])),
+            Dropout(dropout_densa),
             Dense(1, activation='linear')
         ])
+    
+    def _ajustar_red(self, model, X_train, y_train, X_test, y_test, epochs, batch_size, jit, compilar=True):
+        """
+        Compila y entrena una red nueva con early stopping sobre la validación.
+        Con compilar=False continúa el entrenamiento de una red ya compilada
+        (p. ej. leída de un .keras con el estado de su optimizador).
+        """
+        tf = _importar_tensorflow()
+        from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
         
-        optimizer = tf.keras.optimizers.Adam(learning_rate=0.001)
-        model.compile(optimizer=optimizer, loss='huber', metrics=['mae'])
+        if compilar:
+            optimizer = tf.keras.optimizers.Adam(learning_rate=0.001)
+            model.compile(optimizer=optimizer, loss='huber', metrics=['mae'], jit_compile=jit)
         
         callbacks = [
             EarlyStopping(monitor='val_loss', patience=30, 
@@ -158,35 +453,262 @@ class ModeloPrediccionIncidencias:
                              factor=0.5, min_lr=1e-6, verbose=0)
         ]
         
-        history = model.fit(
-            X_train, y_train,
-            validation_data=(X_test, y_test),
+        datos_train, datos_val = self._datos_entrenamiento(X_train, y_train, X_test, y_test, batch_size)
+        return model.fit(
+            datos_train,
+            validation_data=datos_val,
             epochs=epochs,
-            batch_size=4,
+            shuffle=False,  # lo baraja el pipeline
             callbacks=callbacks,
             verbose=0
         )
+    
+    def _entrenar_global(self, tareas, lookback=6, epochs=300, batch_size=BATCH_SIZE_ENTRENAMIENTO,
+                         jit=JIT_ENTRENAMIENTO, progreso=None):
+        """
+        Entrena la red global (arquitectura 'global') sobre todas las series a la vez.
         
-        # Evaluación
+        Cada tipo conserva sus propios scalers y su división 80/20 cronológica; las
+        ventanas de todos los tipos, con el one-hot del tipo, se entrenan juntas en
+        una sola red. El tiempo de entrenamiento se reparte entre los tipos.
+        
+        Args:
+            tareas: [(prefijo, df_month, tipo_id)] con prefijo 'den' o 'eme'
+        Returns:
+            dict: {(prefijo, tipo_id): resultado como train_model_per_type o None}
+        """
+        from models.inferencia_fusionada import agregar_tipo, PredictorTipoGlobal
+        
+        inicio = time.perf_counter()
+        resultados = {}
+        series = []
+        for prefijo, df_month, tipo_id in tareas:
+            col_tipo = df_month.columns[2]
+            sub = df_month[df_month[col_tipo] == tipo_id].copy()
+            if len(sub) < lookback + 12:
+                print(f"⚠️  {prefijo}_tipo_{int(tipo_id)}: Datos insuficientes ({len(sub)} meses)")
+                resultados[(prefijo, tipo_id)] = None
+                continue
+            X, y, scalers = self.make_lstm_dataset(sub, lookback)
+            series.append((prefijo, tipo_id, sub, X, y, scalers))
+        
+        n_tipos = len(series)
+        if not n_tipos:
+            return resultados
+        
+        divisiones = []
+        for indice, (prefijo, tipo_id, sub, X, y, scalers) in enumerate(series):
+            X = agregar_tipo(X, indice, n_tipos)
+            split_idx = int(len(X) * 0.8)
+            divisiones.append((X[:split_idx], y[:split_idx], X[split_idx:], y[split_idx:]))
+        
+        X_train, y_train, X_test, y_test = (np.concatenate(partes) for partes in zip(*divisiones))
+        
+        model = self._construir_red(lookback, len(FEATURES) + n_tipos)
+        self._ajustar_red(model, X_train, y_train, X_test, y_test, epochs, batch_size, jit)
+        predictor_red = self._construir_predictor(model, lookback, len(FEATURES) + n_tipos)
+        segundos = (time.perf_counter() - inicio) / max(1, n_tipos)
+        
+        for indice, ((prefijo, tipo_id, sub, X, y, scalers), (_, _, X_test, y_test)) in enumerate(zip(series, divisiones)):
+            mae, rmse = self._evaluar_modelo(model, X_test, y_test, scalers)
+            print(f"{prefijo}_tipo_{int(tipo_id):<3} →  MAE: {mae:5.1f}  |  RMSE: {rmse:5.1f}")
+            resultados[(prefijo, tipo_id)] = {
+                'model': model,
+                'predictor': PredictorTipoGlobal(predictor_red, indice, n_tipos),
+                'scalers': scalers,
+                'lookback': lookback,
+                'estado': self._construir_estado(sub, scalers, lookback),
+                'metrics': {'mae': mae, 'rmse': rmse, 'segundos_entrenamiento': segundos},
+                'rapido': self._entrenar_rapido(X, y, scalers),
+                'hiperparametros': None,
+                'indice_global': indice
+            }
+        
+        if progreso is not None:
+            for prefijo, _, tipo_id in tareas:
+                result = resultados[(prefijo, tipo_id)]
+                progreso('tipo_completado', {'prefijo': prefijo, 'tipo_id': tipo_id,
+                                             'segundos': segundos if result else 0.0,
+                                             'metrics': result['metrics'] if result else None})
+        
+        print(f"\n⏱️  Red global: {segundos * n_tipos:.1f} s para {n_tipos} tipos")
+        return {(prefijo, tipo_id): resultados[(prefijo, tipo_id)] for prefijo, _, tipo_id in tareas}
+    
+    def _datos_entrenamiento(self, X_train, y_train, X_test, y_test, batch_size):
+        """
+        Pipelines tf.data de entrenamiento y validación
+        
+        Las ventanas se convierten una sola vez a float32 y quedan en caché; el
+        entrenamiento se baraja en cada época con semilla fija (reproducible con
+        la semilla global) y el lote siguiente se prepara mientras corre el actual.
+        """
+        tf = _importar_tensorflow()
+        
+        datos_train = (
+            tf.data.Dataset.from_tensor_slices((X_train.astype(np.float32), y_train.astype(np.float32)))
+            .cache()
+            .shuffle(len(X_train), seed=RANDOM_SEED, reshuffle_each_iteration=True)
+            .batch(batch_size)
+            .prefetch(tf.data.AUTOTUNE)
+        )
+        datos_val = (
+            tf.data.Dataset.from_tensor_slices((X_test.astype(np.float32), y_test.astype(np.float32)))
+            .batch(max(batch_size, len(X_test)))
+            .cache()
+        )
+        return datos_train, datos_val
+    
+    def _evaluar_modelo(self, model, X_test, y_test, scalers):
+        """MAE y RMSE en la escala original sobre el conjunto de validación"""
         y_pred = model.predict(X_test, verbose=0)
-        y_pred_res = scalers['count'].inverse_transform(y_pred).ravel()
+        return self._errores(y_pred, y_test, scalers)
+    
+    def _errores(self, y_pred, y_test, scalers):
+        """MAE y RMSE de predicciones en escala normalizada, medidos en la escala original"""
+        y_pred_res = scalers['count'].inverse_transform(y_pred.reshape(-1, 1)).ravel()
         y_test_res = scalers['count'].inverse_transform(y_test.reshape(-1, 1)).ravel()
         y_pred_res = np.maximum(0, y_pred_res)
         
         mae = mean_absolute_error(y_test_res, y_pred_res)
         rmse = np.sqrt(mean_squared_error(y_test_res, y_pred_res))
-
-        print(f"Tipo {int(tipo_id):2d}  →  MAE: {mae:5.1f}  |  RMSE: {rmse:5.1f}")
-
+        return mae, rmse
+    
+    def _entrenar_rapido(self, X, y, scalers):
+        """
+        Pronosticador rápido (engine 'fast') de un tipo: Ridge sobre la ventana
+        escalada aplanada, con la misma división 80/20 que la LSTM.
+        
+        Se guarda solo coeficientes e intercepto: cada paso es un producto punto.
+        
+        Returns:
+            dict: {'coef', 'intercepto', 'mae', 'rmse'} (métricas en escala original)
+        """
+        from sklearn.linear_model import Ridge
+        
+        split_idx = int(len(X) * 0.8)
+        X_plano = X.reshape(len(X), -1)
+        ridge = Ridge(alpha=ALPHA_RAPIDO).fit(X_plano[:split_idx], y[:split_idx])
+        mae, rmse = self._errores(ridge.predict(X_plano[split_idx:]), y[split_idx:], scalers)
+        
         return {
-            'model': model,
-            'scalers': scalers,
-            'lookback': lookback,
-            'metrics': {'mae': mae, 'rmse': rmse}
+            'coef': ridge.coef_.astype(np.float64),
+            'intercepto': float(ridge.intercept_),
+            'mae': mae,
+            'rmse': rmse
+        }
+    
+    def _entrenar_en_paralelo(self, tareas, n_procesos, epochs=300, hilos_tf=None, progreso=None,
+                              batch_size=BATCH_SIZE_ENTRENAMIENTO, jit=JIT_ENTRENAMIENTO, hiperparametros=None):
+        """
+        Entrena un tipo por proceso con un ProcessPoolExecutor.
+        
+        Cada proceso limita los hilos de TensorFlow (hilos_tf, por defecto
+        núcleos / n_procesos) y usa una semilla propia por tipo derivada de
+        RANDOM_SEED, así el resultado no depende del orden ni del proceso que
+        entrena cada tipo. Las redes vuelven como archivos .keras temporales.
+        
+        Args:
+            tareas: [(prefijo, df_month, tipo_id)] con prefijo 'den' o 'eme'
+            progreso: callable(evento, datos) opcional (ver entrenar_modelos)
+            hiperparametros: {(prefijo, tipo_id): configuración de la red} (ver entrenar_modelos)
+        Returns:
+            dict: {(prefijo, tipo_id): resultado de train_model_per_type o None}
+        """
+        import multiprocessing
+        import shutil
+        import tempfile
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        from models.procesos_entrenamiento import _entrenar_tipo_en_proceso, _inicializar_proceso_entrenamiento
+        
+        if hilos_tf is None:
+            hilos_tf = max(1, (os.cpu_count() or 1) // n_procesos)
+        hiperparametros = hiperparametros or {}
+        
+        _importar_tensorflow()
+        from tensorflow.keras.models import load_model
+        
+        dir_temporal = tempfile.mkdtemp(prefix='entrenamiento_')
+        resultados = {}
+        try:
+            # spawn: TensorFlow no es seguro tras fork
+            with ProcessPoolExecutor(max_workers=n_procesos,
+                                     mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=_inicializar_proceso_entrenamiento,
+                                     initargs=(hilos_tf,)) as pool:
+                futuros = {
+                    pool.submit(
+                        _entrenar_tipo_en_proceso, prefijo, df_month, tipo_id, epochs, dir_temporal,
+                        batch_size, jit, hiperparametros.get((prefijo, tipo_id))
+                    ): (prefijo, tipo_id)
+                    for prefijo, df_month, tipo_id in tareas
+                }
+                for futuro in as_completed(futuros):
+                    prefijo, tipo_id = futuros[futuro]
+                    result = futuro.result()
+                    segundos = result.pop('segundos') if result else 0.0
+                    if result:
+                        model = load_model(result.pop('ruta'))
+                        result['model'] = model
+                        result['predictor'] = self._construir_predictor(model, result['lookback'], len(result['scalers']))
+                        print(f"{prefijo}_tipo_{int(tipo_id):<3} →  MAE: {result['metrics']['mae']:5.1f}  |  "
+                              f"RMSE: {result['metrics']['rmse']:5.1f}")
+                    resultados[(prefijo, tipo_id)] = result
+                    if progreso is not None:
+                        progreso('tipo_completado', {'prefijo': prefijo, 'tipo_id': tipo_id,
+                                                     'segundos': segundos,
+                                                     'metrics': result['metrics'] if result else None})
+        finally:
+            shutil.rmtree(dir_temporal, ignore_errors=True)
+        
+        # En el orden de las tareas, no en el de finalización
+        return {(prefijo, tipo_id): resultados[(prefijo, tipo_id)] for prefijo, _, tipo_id in tareas}
+    
+    def _construir_estado(self, sub, scalers, lookback):
+        """
+        Estado compacto de pronóstico de un tipo.
+        
+        Guarda las últimas `lookback` filas ya escaladas y los centros/escalas de
+        los RobustScaler como arrays, de modo que cada paso del pronóstico es un
+        desplazamiento O(lookback) de la ventana sin recorrer el histórico.
+        """
+        centros = np.array([scalers[c].center_[0] for c in FEATURES], dtype=np.float64)
+        escalas = np.array([scalers[c].scale_[0] for c in FEATURES], dtype=np.float64)
+        ultimas = sub[FEATURES].to_numpy(dtype=np.float64)[-lookback:]
+        _, (ultimo_year, ultimo_month) = _rango_meses(sub)
+        
+        return {
+            'ventana': (ultimas - centros) / escalas,
+            'centros': centros,
+            'escalas': escalas,
+            'n_filas': len(sub),
+            'ultimo_year': ultimo_year,
+            'ultimo_month': ultimo_month,
+            'ultimo_count': int(sub['count'].iloc[-1])
         }
     
-    def entrenar_modelos(self, csv_path='data_modelo/dataset_incidencias_reque_2015_2024.csv'):
-        """Entrena todos los modelos y guarda en disco"""
+    def entrenar_modelos(self, csv_path='data_modelo/dataset_incidencias_reque_2015_2024.csv',
+                         n_procesos=1, epochs=300, progreso=None,
+                         batch_size=BATCH_SIZE_ENTRENAMIENTO, jit=JIT_ENTRENAMIENTO, hiperparametros=None):
+        """
+        Entrena todos los modelos y guarda en disco
+        
+        Args:
+            csv_path: Dataset de incidencias
+            n_procesos: Procesos de entrenamiento (1 = secuencial en este proceso;
+                no aplica a la arquitectura global, que es una sola red)
+            epochs: Máximo de épocas por tipo
+            batch_size: Tamaño de lote del pipeline de entrenamiento
+            jit: Compilar los pasos de entrenamiento con XLA
+            progreso: callable(evento, datos) opcional; eventos 'inicio' con
+                {'tipos': [(prefijo, tipo_id)]} y 'tipo_completado' con
+                {'prefijo', 'tipo_id', 'metrics' (None si no se entrenó), 'segundos'}
+            hiperparametros: {(prefijo, tipo_id): configuración de la red} para los tipos
+                que no usan HIPERPARAMETROS_DEFAULT (p. ej. hiperparametros_guardados())
+        """
+        if progreso is None:
+            progreso = lambda evento, datos: None
+        hiperparametros = hiperparametros or {}
+        
         print("="*70)
         print("INICIANDO ENTRENAMIENTO DE MODELOS")
         print("="*70)
@@ -204,45 +726,340 @@ class ModeloPrediccionIncidencias:
         print(f"\nDenuncias: {len(self.den_monthly)} registros, {self.den_monthly['id_denuncia'].nunique()} tipos")
         print(f"Emergencias: {len(self.eme_monthly)} registros, {self.eme_monthly['id_numero_emergencia'].nunique()} tipos")
         
-        # Entrenar denuncias
-        print("\n" + "="*70)
-        print("ENTRENANDO MODELOS - DENUNCIAS")
-        print("="*70)
         tipos_den = sorted(self.den_monthly['id_denuncia'].unique())
-        for t in tipos_den:
-            result = self.train_model_per_type(self.den_monthly, t)
-            if result:
-                self.models_den[t] = result
-        
-        # Entrenar emergencias
-        print("\n" + "="*70)
-        print("ENTRENANDO MODELOS - EMERGENCIAS")
-        print("="*70)
         tipos_eme = sorted(self.eme_monthly['id_numero_emergencia'].unique())
-        for t in tipos_eme:
-            result = self.train_model_per_type(self.eme_monthly, t)
-            if result:
-                self.models_eme[t] = result
+        progreso('inicio', {'tipos': [('den', t) for t in tipos_den] + [('eme', t) for t in tipos_eme]})
+        
+        if self.arquitectura == 'global':
+            print("\n" + "="*70)
+            print("ENTRENANDO RED GLOBAL - DENUNCIAS Y EMERGENCIAS")
+            print("="*70)
+            tareas = ([('den', self.den_monthly, t) for t in tipos_den] +
+                      [('eme', self.eme_monthly, t) for t in tipos_eme])
+            resultados = self._entrenar_global(tareas, epochs=epochs, batch_size=batch_size,
+                                               jit=jit, progreso=progreso)
+            for (prefijo, t), result in resultados.items():
+                if result:
+                    (self.models_den if prefijo == 'den' else self.models_eme)[t] = result
+        elif n_procesos > 1:
+            print("\n" + "="*70)
+            print(f"ENTRENANDO MODELOS EN PARALELO - {n_procesos} PROCESOS")
+            print("="*70)
+            tareas = ([('den', self.den_monthly, t) for t in tipos_den] +
+                      [('eme', self.eme_monthly, t) for t in tipos_eme])
+            resultados = self._entrenar_en_paralelo(tareas, n_procesos, epochs, progreso=progreso,
+                                                    batch_size=batch_size, jit=jit, hiperparametros=hiperparametros)
+            for (prefijo, t), result in resultados.items():
+                if result:
+                    (self.models_den if prefijo == 'den' else self.models_eme)[t] = result
+        else:
+            # Entrenar denuncias
+            print("\n" + "="*70)
+            print("ENTRENANDO MODELOS - DENUNCIAS")
+            print("="*70)
+            for t in tipos_den:
+                inicio = time.perf_counter()
+                result = self.train_model_per_type(self.den_monthly, t, epochs=epochs,
+                                                   batch_size=batch_size, jit=jit,
+                                                   hiperparametros=hiperparametros.get(('den', t)))
+                if result:
+                    self.models_den[t] = result
+                progreso('tipo_completado', {'prefijo': 'den', 'tipo_id': t, 'segundos': time.perf_counter() - inicio,
+                                             'metrics': result['metrics'] if result else None})
+            
+            # Entrenar emergencias
+            print("\n" + "="*70)
+            print("ENTRENANDO MODELOS - EMERGENCIAS")
+            print("="*70)
+            for t in tipos_eme:
+                inicio = time.perf_counter()
+                result = self.train_model_per_type(self.eme_monthly, t, epochs=epochs,
+                                                   batch_size=batch_size, jit=jit,
+                                                   hiperparametros=hiperparametros.get(('eme', t)))
+                if result:
+                    self.models_eme[t] = result
+                progreso('tipo_completado', {'prefijo': 'eme', 'tipo_id': t, 'segundos': time.perf_counter() - inicio,
+                                             'metrics': result['metrics'] if result else None})
         
         self.trained = True
+        self.predictores_fusionados = self._construir_predictores_fusionados(self.models_den, self.models_eme)
         
         # Guardar modelos
-        self.guardar_modelos()
+        self.version_modelo = self.guardar_modelos()
         
-        # Limpiar caché al reentrenar
-        self.cache_predicciones = {}
-        self._guardar_cache_disco()
+        # Las predicciones de modelos anteriores ya no sirven
+        self.cache_predicciones.purgar_otras_versiones(self.version_modelo)
         
         print("\n✅ Modelos entrenados y guardados exitosamente")
+        self._notificar_version_activa()
+    
+    def reentrenar_incremental(self, csv_path, epochs=EPOCHS_AJUSTE, tolerancia=TOLERANCIA_DEGRADACION,
+                               progreso=None):
+        """
+        Reentrenamiento incremental (warm start) con los meses nuevos del dataset.
+        
+        Parte de los modelos cargados con cargar_modelos(), agrega a den_monthly y
+        eme_monthly solo los meses posteriores al último conocido y ajusta cada red
+        unas pocas épocas con learning rate bajo. Los scalers no se reajustan: la
+        red aprendió sobre esa escala y RobustScaler extrapola linealmente los
+        valores nuevos (p. ej. trend). Un tipo se reentrena desde cero, con scalers
+        nuevos, solo si el error de validación se degrada: el MAE (el mejor entre
+        la red ajustada y la red sin ajustar) supera en más de `tolerancia` al
+        guardado en el último entrenamiento. También se entrenan desde cero los
+        tipos que no existían.
+        
+        Como entrenar_modelos(), modifica esta instancia: usar una que no esté
+        sirviendo predicciones (los demás procesos recargan la versión publicada).
+        
+        Args:
+            csv_path: Dataset de incidencias desde el mes siguiente al último conocido
+                (ver _series_extendidas)
+            epochs: Máximo de épocas del ajuste fino
+            tolerancia: Degradación relativa del MAE tolerada antes de reentrenar desde cero
+            progreso: callable(evento, datos) opcional (ver entrenar_modelos)
+        
+        Returns:
+            dict: {'meses_nuevos': int, 'denuncias': {tipo: {'modo', 'mae_anterior', 'mae_sin_ajuste', 'mae'}}, 'emergencias': {...}}
+        """
+        if not self.trained:
+            raise Exception("Modelos no cargados. Ejecuta cargar_modelos() primero.")
+        if self.arquitectura != 'por_tipo':
+            raise ValueError("El reentrenamiento incremental solo está disponible para la arquitectura por_tipo")
+        if progreso is None:
+            progreso = lambda evento, datos: None
+        
+        print("="*70)
+        print("REENTRENAMIENTO INCREMENTAL")
+        print("="*70)
+        
+        den_monthly, meses_den, eme_monthly, meses_eme = self._series_extendidas(csv_path)
+        
+        resumen = {'meses_nuevos': max(meses_den, meses_eme), 'denuncias': {}, 'emergencias': {}}
+        if resumen['meses_nuevos'] == 0:
+            print("ℹ️  No hay meses nuevos; los modelos no cambian")
+            return resumen
+        
+        print(f"\nMeses nuevos: {meses_den} denuncias, {meses_eme} emergencias")
+        self.den_monthly = den_monthly
+        self.eme_monthly = eme_monthly
+        
+        familias = (('den', 'denuncias', self.models_den, self.den_monthly),
+                    ('eme', 'emergencias', self.models_eme, self.eme_monthly))
+        tipos = {prefijo: sorted(df_month[df_month.columns[2]].unique()) for prefijo, _, _, df_month in familias}
+        progreso('inicio', {'tipos': [(prefijo, t) for prefijo, _, _, _ in familias for t in tipos[prefijo]]})
+        
+        for prefijo, familia, model_dict, df_month in familias:
+            for tipo_id in tipos[prefijo]:
+                inicio = time.perf_counter()
+                anterior = model_dict.get(tipo_id)
+                mae_anterior = anterior['metrics']['mae'] if anterior else None
+                mae_sin_ajuste = None
+                result = None
+                modo = 'completo'
+                
+                if anterior is not None:
+                    result, mae_sin_ajuste = self._ajustar_tipo(prefijo, df_month, tipo_id, anterior, epochs)
+                    modo = 'incremental'
+                    mae = result['metrics']['mae']
+                    if mae > mae_anterior * (1 + tolerancia):
+                        print(f"⚠️  {prefijo}_tipo_{int(tipo_id)}: MAE {mae:.2f} > {mae_anterior:.2f} "
+                              f"(+{tolerancia:.0%}), reentrenando desde cero")
+                        result = None
+                        modo = 'completo'
+                
+                if result is None:
+                    result = self.train_model_per_type(
+                        df_month, tipo_id, hiperparametros=anterior.get('hiperparametros') if anterior else None
+                    )
+                
+                if result:
+                    model_dict[tipo_id] = result
+                    resumen[familia][int(tipo_id)] = {
+                        'modo': modo,
+                        'mae_anterior': mae_anterior,
+                        'mae_sin_ajuste': mae_sin_ajuste,
+                        'mae': result['metrics']['mae']
+                    }
+                
+                progreso('tipo_completado', {'prefijo': prefijo, 'tipo_id': tipo_id,
+                                             'segundos': time.perf_counter() - inicio,
+                                             'metrics': result['metrics'] if result else None})
+        
+        self.predictores_fusionados = self._construir_predictores_fusionados(self.models_den, self.models_eme)
+        self.version_modelo = self.guardar_modelos()
+        self.cache_predicciones.purgar_otras_versiones(self.version_modelo)
+        
+        n_completos = sum(r['modo'] == 'completo' for f in ('denuncias', 'emergencias') for r in resumen[f].values())
+        print(f"\n✅ Reentrenamiento incremental guardado ({n_completos} tipos reentrenados desde cero)")
+        self._notificar_version_activa()
+        
+        return resumen
+    
+    def _series_extendidas(self, csv_path):
+        """
+        den_monthly y eme_monthly extendidas con los meses nuevos del dataset.
+        
+        El dataset cubre todos los meses entre su primera y su última fecha: un
+        mes sin incidencias de un tipo cuenta como 0, y una fila con fecha y sin
+        id_denuncia ni id_numero_emergencia marca un mes sin ninguna incidencia.
+        
+        Returns:
+            tuple: (den_monthly, meses nuevos den, eme_monthly, meses nuevos eme)
+        """
+        df = pd.read_csv(csv_path, parse_dates=['fecha'])
+        
+        for col in ["id_numero_emergencia", "id_denuncia"]:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("Int64")
+        
+        fechas = df['fecha'].dropna()
+        if fechas.empty:
+            raise ValueError("El dataset no tiene fechas")
+        desde = (fechas.min().year, fechas.min().month)
+        hasta = (fechas.max().year, fechas.max().month)
+        
+        den_monthly, meses_den = self._extender_serie(
+            self.den_monthly, self.build_monthly_series(df, 'id_denuncia'), desde, hasta)
+        eme_monthly, meses_eme = self._extender_serie(
+            self.eme_monthly, self.build_monthly_series(df, 'id_numero_emergencia'), desde, hasta)
+        return den_monthly, meses_den, eme_monthly, meses_eme
+    
+    def _extender_serie(self, df_anterior, df_nuevo, desde=None, hasta=None):
+        """
+        Agrega a la serie mensual guardada los meses posteriores a su último mes.
+        
+        `df_nuevo` cubre los meses de `desde` a `hasta` (year, month); sin ellos,
+        su primer y su último mes, y entonces no puede tener meses faltantes.
+        Los meses nuevos deben empezar justo después del último conocido: un
+        hueco no se completa con ceros, se rechaza.
+        
+        Cada mes nuevo lleva una fila por tipo conocido (count 0 si el tipo no
+        tuvo incidencias), como build_monthly_series: así ninguna serie queda
+        con huecos. trend continúa el arange global de la serie anterior en el
+        mismo orden (year, month, tipo).
+        
+        Returns:
+            tuple: (serie extendida, cantidad de meses nuevos)
+        
+        Raises:
+            ValueError: Si los meses nuevos no son contiguos a la serie anterior
+        """
+        if df_nuevo.empty and desde is None:
+            return df_anterior, 0
+        
+        col_tipo = df_anterior.columns[2]
+        claves = df_nuevo['year'].astype(int) * 12 + df_nuevo['month'].astype(int) - 1
+        if desde is None:
+            desde, hasta = _rango_meses(df_nuevo)
+            faltantes = set(range(desde[0] * 12 + desde[1] - 1, hasta[0] * 12 + hasta[1])) - set(claves)
+            if faltantes:
+                primero = min(faltantes)
+                raise ValueError(f"Faltan {len(faltantes)} meses en los datos nuevos "
+                                 f"(el primero {primero // 12}-{primero % 12 + 1:02d})")
+        
+        _, (ultimo_year, ultimo_month) = _rango_meses(df_anterior)
+        primero = ultimo_year * 12 + ultimo_month
+        ultimo = hasta[0] * 12 + hasta[1] - 1
+        if ultimo < primero:
+            return df_anterior, 0
+        if desde[0] * 12 + desde[1] - 1 > primero:
+            raise ValueError(f"Los datos nuevos empiezan en {desde[0]}-{desde[1]:02d}; "
+                             f"faltan los meses desde {primero // 12}-{primero % 12 + 1:02d}")
+        
+        meses = [(clave // 12, clave % 12 + 1) for clave in range(primero, ultimo + 1)]
+        nuevos = df_nuevo[(claves >= primero) & (claves <= ultimo)]
+        tipos = sorted(set(df_anterior[col_tipo].unique()) | set(nuevos[col_tipo].unique()))
+        indice = pd.MultiIndex.from_tuples(
+            [(year, month, tipo) for year, month in meses for tipo in tipos],
+            names=['year', 'month', col_tipo]
+        )
+        nuevos = (nuevos
+                  .set_index(['year', 'month', col_tipo])['count']
+                  .reindex(indice, fill_value=0)
+                  .reset_index())
+        nuevos = self._agregar_features(nuevos, df_anterior['trend'].max() + 1)
+        nuevos = nuevos[df_anterior.columns].astype(df_anterior.dtypes.to_dict())
+        
+        return pd.concat([df_anterior, nuevos], ignore_index=True), len(meses)
+    
+    def _ajustar_tipo(self, prefijo, df_month, tipo_id, info, epochs=EPOCHS_AJUSTE):
+        """
+        Ajuste fino (warm start) de la red de un tipo sobre la serie extendida, con sus scalers
+        
+        Si el ajuste no mejora el MAE de validación se conservan los pesos originales.
+        
+        Returns:
+            tuple: (resultado como train_model_per_type, MAE de validación antes del ajuste)
+        """
+        inicio = time.perf_counter()
+        col_tipo = df_month.columns[2]
+        sub = df_month[df_month[col_tipo] == tipo_id]
+        lookback = info['lookback']
+        scalers = info['scalers']
+        
+        X, y, _ = self.make_lstm_dataset(sub, lookback, scalers=scalers)
+        
+        split_idx = int(len(X) * 0.8)
+        X_train, X_test = X[:split_idx], X[split_idx:]
+        y_train, y_test = y[:split_idx], y[split_idx:]
+        
+        tf = _importar_tensorflow()
+        from tensorflow.keras.models import load_model
+        from tensorflow.keras.callbacks import EarlyStopping
+        
+        # Siempre la red Keras guardada (el motor de inferencia puede ser numpy)
+        model = load_model(info.get('ruta') or f'{self._dir_modelos()}/{prefijo}_tipo_{tipo_id}.keras')
+        mae_sin_ajuste, rmse_sin_ajuste = self._evaluar_modelo(model, X_test, y_test, scalers)
+        pesos_originales = model.get_weights()
+        model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=TASA_AJUSTE), loss='huber', metrics=['mae'])
+        
+        datos_train, datos_val = self._datos_entrenamiento(X_train, y_train, X_test, y_test,
+                                                           BATCH_SIZE_ENTRENAMIENTO)
+        model.fit(
+            datos_train,
+            validation_data=datos_val,
+            epochs=epochs,
+            shuffle=False,  # lo baraja el pipeline
+            callbacks=[EarlyStopping(monitor='val_loss', patience=5,
+                                     restore_best_weights=True, min_delta=0.001)],
+            verbose=0
+        )
+        
+        mae, rmse = self._evaluar_modelo(model, X_test, y_test, scalers)
+        if mae > mae_sin_ajuste:
+            model.set_weights(pesos_originales)
+            mae, rmse = mae_sin_ajuste, rmse_sin_ajuste
+        segundos = time.perf_counter() - inicio
+        print(f"Tipo {int(tipo_id):2d}  →  MAE: {mae:5.1f}  |  RMSE: {rmse:5.1f}  ({segundos:.1f} s, incremental)")
+        
+        return {
+            'model': model,
+            'predictor': self._construir_predictor(model, lookback, X.shape[-1]),
+            'scalers': scalers,
+            'lookback': lookback,
+            'estado': self._construir_estado(sub, scalers, lookback),
+            'metrics': {'mae': mae, 'rmse': rmse, 'segundos_entrenamiento': segundos},
+            'rapido': self._entrenar_rapido(X, y, scalers),
+            'hiperparametros': info.get('hiperparametros')
+        }, mae_sin_ajuste
     
     def guardar_modelos(self):
-        """Guarda modelos y datos en disco"""
-        # Guardar modelos de keras
-        for tipo_id, info in self.models_den.items():
-            info['model'].save(f'{MODEL_DIR}/den_tipo_{tipo_id}.keras')
+        """
+        Guarda modelos y datos en disco
+        
+        Cada archivo se reemplaza de forma atómica y version.json se publica al
+        final, así los procesos que recargan en caliente no ven un estado a medias.
         
-        for tipo_id, info in self.models_eme.items():
-            info['model'].save(f'{MODEL_DIR}/eme_tipo_{tipo_id}.keras')
+        Returns:
+            str: Versión publicada
+        """
+        # Guardar modelos de keras (la red global es una sola para todos los tipos)
+        if self.arquitectura == 'global':
+            red = next(info['model'] for info in list(self.models_den.values()) + list(self.models_eme.values()))
+            _reemplazo_atomico(f'{self._dir_modelos()}/{ARCHIVO_RED_GLOBAL}', red.save)
+        else:
+            for prefijo, model_dict in (('den', self.models_den), ('eme', self.models_eme)):
+                for tipo_id, info in model_dict.items():
+                    _reemplazo_atomico(f'{self._dir_modelos()}/{prefijo}_tipo_{tipo_id}.keras', info['model'].save)
         
         # Guardar scalers y metadata
         metadata = {
@@ -252,83 +1069,477 @@ class ModeloPrediccionIncidencias:
             'eme_lookback': {t: info['lookback'] for t, info in self.models_eme.items()},
             'den_metrics': {t: info['metrics'] for t, info in self.models_den.items()},
             'eme_metrics': {t: info['metrics'] for t, info in self.models_eme.items()},
+            'den_estado': {t: info['estado'] for t, info in self.models_den.items()},
+            'eme_estado': {t: info['estado'] for t, info in self.models_eme.items()},
+            'den_rapido': {t: info['rapido'] for t, info in self.models_den.items()},
+            'eme_rapido': {t: info['rapido'] for t, info in self.models_eme.items()},
+            'den_hiperparametros': {t: info.get('hiperparametros') for t, info in self.models_den.items()},
+            'eme_hiperparametros': {t: info.get('hiperparametros') for t, info in self.models_eme.items()},
+            'arquitectura': self.arquitectura,
         }
+        if self.arquitectura == 'global':
+            metadata['den_indice_global'] = {t: info['indice_global'] for t, info in self.models_den.items()}
+            metadata['eme_indice_global'] = {t: info['indice_global'] for t, info in self.models_eme.items()}
+            metadata['n_tipos_global'] = len(self.models_den) + len(self.models_eme)
         
-        with open(f'{MODEL_DIR}/metadata.pkl', 'wb') as f:
-            pickle.dump(metadata, f)
+        def escribir_metadata(ruta):
+            with open(ruta, 'wb') as f:
+                pickle.dump(metadata, f)
+        
+        _reemplazo_atomico(f'{self._dir_modelos()}/metadata.pkl', escribir_metadata)
         
         # Guardar datos mensuales
-        self.den_monthly.to_pickle(f'{DATA_DIR}/den_monthly.pkl')
-        self.eme_monthly.to_pickle(f'{DATA_DIR}/eme_monthly.pkl')
+        _reemplazo_atomico(f'{self._dir_datos()}/den_monthly.pkl', self.den_monthly.to_pickle)
+        _reemplazo_atomico(f'{self._dir_datos()}/eme_monthly.pkl', self.eme_monthly.to_pickle)
+        
+        return self._publicar_version()
     
     def cargar_modelos(self):
         """Carga modelos desde disco"""
-        if not os.path.exists(f'{MODEL_DIR}/metadata.pkl'):
+        if not os.path.exists(f'{self._dir_modelos()}/metadata.pkl'):
             raise FileNotFoundError("No se encontraron modelos entrenados. Ejecuta entrenar_modelos() primero.")
         
         print("Cargando modelos desde disco...")
         
+        # Si se publica otra versión mientras se lee, volver a leer
+        for _ in range(3):
+            version_inicial = self._leer_version_disco()
+            componentes = self._leer_artefactos()
+            version_final = self._leer_version_disco()
+            if version_inicial == version_final:
+                break
+        
+        componentes['version'] = version_final or self._calcular_version_modelo()
+        self._activar_modelos(componentes)
+        
+        modo = 'diferida' if self.carga_diferida else 'completa'
+        print(f"✅ Modelos cargados ({self.motor_inferencia}, carga {modo}, versión {self.version_modelo}): "
+              f"{len(self.models_den)} denuncias, {len(self.models_eme)} emergencias")
+        
+        if self.carga_diferida and self.precalentar:
+            self.estado_precalentamiento = 'pendiente'
+            threading.Thread(target=self._precalentar_modelos, args=(self._instantanea(),), daemon=True).start()
+        
+        self._notificar_version_activa()
+    
+    def hiperparametros_guardados(self):
+        """
+        Configuración de red de cada tipo guardada en metadata (la elegida por la
+        búsqueda de hiperparámetros), para volver a entrenar con ella.
+        
+        Returns:
+            dict: {(prefijo, tipo_id): hiperparametros}; vacío si todos usan los de por defecto
+        """
+        try:
+            with open(f'{self._dir_modelos()}/metadata.pkl', 'rb') as f:
+                metadata = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return {}
+        
+        return {
+            (prefijo, tipo_id): hp
+            for prefijo in ('den', 'eme')
+            for tipo_id, hp in metadata.get(f'{prefijo}_hiperparametros', {}).items() if hp is not None
+        }
+    
+    def _notificar_version_activa(self):
+        """Ejecuta los callbacks de al_activar_version (sus errores no interrumpen la carga)"""
+        for callback in list(self.al_activar_version):
+            try:
+                callback(self)
+            except Exception as e:
+                print(f"⚠️  Error en callback de nueva versión: {e}")
+    
+    def _leer_artefactos(self):
+        """
+        Lee redes, scalers y series mensuales sin tocar los modelos activos.
+        
+        Con carga diferida solo se leen metadata, scalers y series; las redes
+        quedan con 'model' y 'predictor' en None hasta _asegurar_redes().
+        
+        Returns:
+            dict: models_den, models_eme, den_monthly, eme_monthly, predictores_fusionados
+        """
         # Cargar metadata
-        with open(f'{MODEL_DIR}/metadata.pkl', 'rb') as f:
+        with open(f'{self._dir_modelos()}/metadata.pkl', 'rb') as f:
             metadata = pickle.load(f)
         
-        # Cargar modelos de denuncias
-        for tipo_id in metadata['den_scalers'].keys():
-            model_path = f'{MODEL_DIR}/den_tipo_{tipo_id}.keras'
-            if os.path.exists(model_path):
-                self.models_den[tipo_id] = {
-                    'model': load_model(model_path),
-                    'scalers': metadata['den_scalers'][tipo_id],
-                    'lookback': metadata['den_lookback'][tipo_id],
-                    'metrics': metadata['den_metrics'][tipo_id]
-                }
+        models_den = {}
+        models_eme = {}
         
-        # Cargar modelos de emergencias
-        for tipo_id in metadata['eme_scalers'].keys():
-            model_path = f'{MODEL_DIR}/eme_tipo_{tipo_id}.keras'
-            if os.path.exists(model_path):
-                self.models_eme[tipo_id] = {
-                    'model': load_model(model_path),
-                    'scalers': metadata['eme_scalers'][tipo_id],
-                    'lookback': metadata['eme_lookback'][tipo_id],
-                    'metrics': metadata['eme_metrics'][tipo_id]
-                }
+        # Sin redes LSTM (p. ej. sin TensorFlow) se sigue sirviendo con el motor rápido
+        lstm_disponible = True
+        
+        if self.motor_inferencia == 'plano':
+            self._artefacto_plano = self._abrir_artefacto_plano()
+        
+        # La red global se carga una sola vez (también con carga diferida) y se comparte
+        red_global = None
+        if self.arquitectura == 'global':
+            try:
+                red_global = self._cargar_red_global(metadata)
+            except ImportError as e:
+                lstm_disponible = False
+                print(f"⚠️  Red LSTM no disponible ({e}): se usará el motor rápido")
+        
+        for prefijo, model_dict in (('den', models_den), ('eme', models_eme)):
+            for tipo_id in metadata[f'{prefijo}_scalers'].keys():
+                if self.arquitectura == 'global':
+                    model_path = f'{self._dir_modelos()}/{ARCHIVO_RED_GLOBAL}'
+                else:
+                    model_path = f'{self._dir_modelos()}/{prefijo}_tipo_{tipo_id}.keras'
+                if os.path.exists(model_path):
+                    model_dict[tipo_id] = {
+                        'model': None,
+                        'predictor': None,
+                        'ruta': model_path,
+                        'scalers': metadata[f'{prefijo}_scalers'][tipo_id],
+                        'lookback': metadata[f'{prefijo}_lookback'][tipo_id],
+                        'estado': metadata.get(f'{prefijo}_estado', {}).get(tipo_id),
+                        'metrics': metadata[f'{prefijo}_metrics'][tipo_id],
+                        'rapido': metadata.get(f'{prefijo}_rapido', {}).get(tipo_id),
+                        'hiperparametros': metadata.get(f'{prefijo}_hiperparametros', {}).get(tipo_id)
+                    }
+                    if red_global is not None:
+                        from models.inferencia_fusionada import PredictorTipoGlobal
+                        indice = metadata[f'{prefijo}_indice_global'][tipo_id]
+                        model_dict[tipo_id].update({
+                            'model': red_global[0],
+                            'predictor': PredictorTipoGlobal(red_global[1], indice, metadata['n_tipos_global']),
+                            'indice_global': indice
+                        })
+                    elif self.arquitectura == 'por_tipo' and not self.carga_diferida and lstm_disponible:
+                        try:
+                            self._cargar_red_tipo(model_dict[tipo_id])
+                        except ImportError as e:
+                            lstm_disponible = False
+                            print(f"⚠️  Redes LSTM no disponibles ({e}): se usará el motor rápido")
         
         # Cargar datos mensuales
-        self.den_monthly = pd.read_pickle(f'{DATA_DIR}/den_monthly.pkl')
-        self.eme_monthly = pd.read_pickle(f'{DATA_DIR}/eme_monthly.pkl')
+        den_monthly = pd.read_pickle(f'{self._dir_datos()}/den_monthly.pkl')
+        eme_monthly = pd.read_pickle(f'{self._dir_datos()}/eme_monthly.pkl')
         
-        self.trained = True
-        print(f"✅ Modelos cargados: {len(self.models_den)} denuncias, {len(self.models_eme)} emergencias")
+        # Metadata anterior sin estado de pronóstico o sin motor rápido: se construyen una vez aquí
+        for model_dict, df_month in ((models_den, den_monthly), (models_eme, eme_monthly)):
+            col_tipo = df_month.columns[2]
+            for tipo_id, info in model_dict.items():
+                sub = df_month[df_month[col_tipo] == tipo_id]
+                if info['estado'] is None:
+                    info['estado'] = self._construir_estado(sub, info['scalers'], info['lookback'])
+                if info['rapido'] is None:
+                    X, y, _ = self.make_lstm_dataset(sub, info['lookback'], scalers=info['scalers'])
+                    info['rapido'] = self._entrenar_rapido(X, y, info['scalers'])
+        
+        return {
+            'models_den': models_den,
+            'models_eme': models_eme,
+            'den_monthly': den_monthly,
+            'eme_monthly': eme_monthly,
+            'predictores_fusionados': ({} if self.carga_diferida or not lstm_disponible
+                                       else self._construir_predictores_fusionados(models_den, models_eme))
+        }
+    
+    def _cargar_red_global(self, metadata):
+        """Carga la red compartida de la arquitectura global: (red, predictor de la red)"""
+        red = self._cargar_red(f'{self._dir_modelos()}/{ARCHIVO_RED_GLOBAL}')
+        lookback = next(iter(metadata['den_lookback'].values()))
+        return red, self._construir_predictor(red, lookback, len(FEATURES) + metadata['n_tipos_global'])
+    
+    def _cargar_red_tipo(self, info):
+        """Carga la red de un tipo y construye su predictor (una sola vez)"""
+        with self._lock_carga:
+            if info['predictor'] is None:
+                info['model'] = self._cargar_red(info['ruta'])
+                info['predictor'] = self._construir_predictor(info['model'], info['lookback'], len(info['scalers']))
+    
+    def _asegurar_redes(self, model_dict, tipos, tipo_modelo, activos):
+        """
+        Carga diferida: garantiza que las redes de `tipos` (y el grafo fusionado de
+        la familia, si está activo) estén listas antes de predecir.
+        
+        Lanza VersionModeloCambiada si en disco ya hay otra versión, para no mezclar
+        redes nuevas con los scalers de la versión activa.
+        """
+        if self.fusionado and tipo_modelo not in activos['predictores_fusionados']:
+            tipos = list(model_dict)
+        
+        pendientes = [t for t in tipos if model_dict[t]['predictor'] is None]
+        if pendientes:
+            with self._lock_carga:
+                for tipo_id in pendientes:
+                    if model_dict[tipo_id]['predictor'] is not None:
+                        continue
+                    version_disco = self._leer_version_disco()
+                    if version_disco is not None and version_disco != activos['version']:
+                        raise VersionModeloCambiada(f"{activos['version']} → {version_disco}")
+                    self._cargar_red_tipo(model_dict[tipo_id])
+        
+        if self.fusionado and tipo_modelo not in activos['predictores_fusionados']:
+            with self._lock_carga:
+                if tipo_modelo not in activos['predictores_fusionados']:
+                    models_den = model_dict if tipo_modelo == 'denuncias' else {}
+                    models_eme = model_dict if tipo_modelo == 'emergencias' else {}
+                    fusionados = self._construir_predictores_fusionados(models_den, models_eme)
+                    # None: no se pudo fusionar, se usan los predictores por tipo
+                    activos['predictores_fusionados'][tipo_modelo] = fusionados.get(tipo_modelo)
+    
+    def _precalentar_modelos(self, activos):
+        """Hilo de precalentamiento: carga todas las redes de la versión activa"""
+        self.estado_precalentamiento = 'en_curso'
+        try:
+            for tipo_modelo, model_dict in (('denuncias', activos['models_den']), ('emergencias', activos['models_eme'])):
+                self._asegurar_redes(model_dict, list(model_dict), tipo_modelo, activos)
+            self.estado_precalentamiento = 'completo'
+            print(f"✅ Precalentamiento completo (versión {activos['version']})")
+        except VersionModeloCambiada:
+            self.estado_precalentamiento = 'pendiente'
+        except Exception as e:
+            self.estado_precalentamiento = 'error'
+            print(f"⚠️  Error en precalentamiento: {e}")
+    
+    def estado_carga(self):
+        """Redes cargadas por familia y estado del precalentamiento"""
+        activos = self._instantanea()
+        return {
+            'modo': 'diferida' if self.carga_diferida else 'completa',
+            'precalentamiento': self.estado_precalentamiento,
+            'denuncias': {
+                'cargados': sum(info['predictor'] is not None for info in activos['models_den'].values()),
+                'total': len(activos['models_den'])
+            },
+            'emergencias': {
+                'cargados': sum(info['predictor'] is not None for info in activos['models_eme'].values()),
+                'total': len(activos['models_eme'])
+            }
+        }
+    
+    def _activar_modelos(self, componentes):
+        """Reemplaza de una vez todos los modelos activos por los ya cargados"""
+        with self._lock_modelos:
+            self.models_den = componentes['models_den']
+            self.models_eme = componentes['models_eme']
+            self.den_monthly = componentes['den_monthly']
+            self.eme_monthly = componentes['eme_monthly']
+            self.predictores_fusionados = componentes['predictores_fusionados']
+            self.version_modelo = componentes['version']
+            self.trained = True
+    
+    def _instantanea(self):
+        """Modelos activos de una misma versión, para usar durante toda una predicción"""
+        with self._lock_modelos:
+            return {
+                'models_den': self.models_den,
+                'models_eme': self.models_eme,
+                'den_monthly': self.den_monthly,
+                'eme_monthly': self.eme_monthly,
+                'predictores_fusionados': self.predictores_fusionados,
+                'version': self.version_modelo
+            }
+    
+    def verificar_version_disco(self, forzar=False, esperar=False):
+        """
+        Recarga en caliente si otro proceso publicó una versión nueva de los modelos.
+        
+        La consulta al disco se hace como máximo cada INTERVALO_VERIFICACION_VERSION
+        segundos. La recarga corre en un hilo aparte y mientras tanto se sigue
+        respondiendo con la versión anterior; al terminar se reemplazan todos los
+        modelos de una vez.
+        
+        Args:
+            forzar: Ignorar el intervalo entre consultas
+            esperar: Recargar en el hilo actual en lugar de en segundo plano
+        
+        Returns:
+            bool: True si se detectó una versión distinta a la activa
+        """
+        ahora = time.monotonic()
+        if not forzar and ahora - self._ultima_verificacion < INTERVALO_VERIFICACION_VERSION:
+            return False
+        self._ultima_verificacion = ahora
+        
+        version_disco = self._leer_version_disco()
+        if version_disco is None or version_disco == self.version_modelo:
+            return False
+        
+        with self._lock_modelos:
+            if self._recarga_en_curso:
+                if esperar:
+                    self._recarga_terminada.wait()
+                return True
+            self._recarga_en_curso = True
+            self._recarga_terminada.clear()
+        
+        print(f"🔄 Nueva versión de modelos en disco: {self.version_modelo} → {version_disco}")
+        
+        if esperar:
+            self._recargar_modelos()
+        else:
+            threading.Thread(target=self._recargar_modelos, daemon=True).start()
+        return True
+    
+    def _recargar_por_version_cambiada(self, activos):
+        """Carga diferida: otra versión reemplazó las redes en disco; recargar antes de reintentar"""
+        self.verificar_version_disco(forzar=True, esperar=True)
+        if self.version_modelo == activos['version']:
+            raise RuntimeError(f"No se pudo recargar la versión publicada en disco (activa: {activos['version']})")
+    
+    def _recargar_modelos(self):
+        try:
+            self.cargar_modelos()
+        except Exception as e:
+            print(f"⚠️  Error recargando modelos, se mantiene la versión {self.version_modelo}: {e}")
+        finally:
+            self._recarga_en_curso = False
+            self._recarga_terminada.set()
+    
+    def _cargar_red(self, model_path):
+        """Carga la red de un tipo según el motor de inferencia configurado"""
+        if self.motor_inferencia == 'plano' and self._artefacto_plano is not None:
+            from models.artefacto_plano import _nombre_red
+            return self._artefacto_plano.red(_nombre_red(model_path))
+        
+        if self.motor_inferencia in ('numpy', 'plano'):
+            from models.inferencia_numpy import cargar_red_numpy
+            return cargar_red_numpy(model_path)
+        
+        _importar_tensorflow()
+        from tensorflow.keras.models import load_model
+        return load_model(model_path)
+    
+    def _abrir_artefacto_plano(self):
+        """Artefacto plano de la versión en disco (None si falta o es de otra versión)"""
+        from models.artefacto_plano import ARCHIVO_PLANO, abrir_artefacto_plano
+        
+        ruta = f'{self._dir_modelos()}/{ARCHIVO_PLANO}'
+        if not os.path.exists(ruta):
+            print(f"⚠️  No hay artefacto plano ({ruta}): se leen los archivos .keras")
+            return None
+        
+        artefacto = abrir_artefacto_plano(ruta)
+        version = self._leer_version_disco() or self._calcular_version_modelo()
+        if artefacto.version_modelo != version:
+            print(f"⚠️  El artefacto plano es de la versión {artefacto.version_modelo} (actual {version}): "
+                  f"se leen los archivos .keras")
+            return None
+        return artefacto
+    
+    def _construir_predictor(self, model, lookback, n_features):
+        """
+        Construye una sola vez la función de inferencia de un tipo.
+        
+        Para Keras se compila un tf.function con firma fija (None, lookback, n_features)
+        y se traza al construirlo, evitando el data adapter y el step function que
+        model.predict reconstruye en cada llamada.
+        """
+        from models.inferencia_numpy import RedLSTMNumpy
+        
+        if isinstance(model, RedLSTMNumpy):
+            return model.predict
+        
+        tf = _importar_tensorflow()
+        
+        @tf.function(input_signature=[tf.TensorSpec(shape=(None, lookback, n_features), dtype=tf.float32)])
+        def _inferencia(X):
+            return model(X, training=False)
+        
+        def predictor(X):
+            return _inferencia(tf.convert_to_tensor(X, dtype=tf.float32)).numpy()
+        
+        # Trazar ahora para que la primera predicción no pague la compilación
+        predictor(np.zeros((1, lookback, n_features), dtype=np.float32))
+        
+        return predictor
+    
+    def verificar_motor_numpy(self, tolerancia=None):
+        """
+        Compara el motor NumPy contra Keras sobre las ventanas históricas de cada tipo.
+        
+        Returns:
+            dict: {'ok': bool, 'tolerancia': float, 'denuncias': {tipo: dif}, 'emergencias': {tipo: dif}}
+        """
+        from models.inferencia_numpy import cargar_red_numpy, verificar_contra_keras, TOLERANCIA_KERAS
+        from models.inferencia_fusionada import agregar_tipo
+        _importar_tensorflow()
+        from tensorflow.keras.models import load_model
+        
+        if tolerancia is None:
+            tolerancia = TOLERANCIA_KERAS
+        
+        resultado = {'ok': True, 'tolerancia': tolerancia, 'denuncias': {}, 'emergencias': {}}
+        
+        for prefijo, nombre, model_dict, df_month in (
+            ('den', 'denuncias', self.models_den, self.den_monthly),
+            ('eme', 'emergencias', self.models_eme, self.eme_monthly)
+        ):
+            col_tipo = df_month.columns[2]
+            for tipo_id, info in model_dict.items():
+                model_path = info.get('ruta') or f'{self._dir_modelos()}/{prefijo}_tipo_{tipo_id}.keras'
+                sub = df_month[df_month[col_tipo] == tipo_id]
+                X, _, _ = self.make_lstm_dataset(sub, info['lookback'])
+                if 'indice_global' in info:
+                    X = agregar_tipo(X, info['indice_global'], info['predictor'].n_tipos)
+                
+                ok, diferencia = verificar_contra_keras(
+                    cargar_red_numpy(model_path), load_model(model_path), X.astype(np.float32), tolerancia
+                )
+                resultado[nombre][int(tipo_id)] = diferencia
+                resultado['ok'] = resultado['ok'] and ok
+        
+        return resultado
     
-    def predecir_mes(self, year, month, tipo=None):
+    def predecir_mes(self, year, month, tipo=None, engine=None):
         """
         Predice incidencias para un mes específico (CON CACHÉ)
+        
+        Args:
+            engine: 'lstm' o 'fast' (default: lstm, o fast si las redes LSTM no
+                están disponibles). Las predicciones del motor rápido incluyen
+                'engine': 'fast' en el resultado.
         """
         if not self.trained:
             raise Exception("Modelos no entrenados. Ejecuta entrenar_modelos() o cargar_modelos() primero.")
+        if engine is not None and engine not in ENGINES_PREDICCION:
+            raise ValueError(f"engine no válido: {engine}. Opciones: {ENGINES_PREDICCION}")
+        
+        self.verificar_version_disco()
+        activos = self._instantanea()
+        if engine is None:
+            engine = 'lstm' if self._lstm_disponible(activos) else 'fast'
         
         # Calcular steps
-        last_year_den = self.den_monthly['year'].max()
-        last_month_den = self.den_monthly['month'].max()
+        _, (last_year_den, last_month_den) = _rango_meses(activos['den_monthly'])
         
         steps = (year - last_year_den) * 12 + (month - last_month_den)
         
         if steps <= 0:
             raise ValueError(f"El mes {year}-{month:02d} ya está en los datos históricos o es anterior.")
         
-        # Predecir denuncias (CON CACHÉ)
-        pred_den = self._forecast_single_month_cached(
-            self.models_den, self.den_monthly, year, month, 'denuncias'
-        )
-        
-        # Predecir emergencias (CON CACHÉ)
-        pred_eme = self._forecast_single_month_cached(
-            self.models_eme, self.eme_monthly, year, month, 'emergencias'
-        )
+        def calcular():
+            # Predecir denuncias (CON CACHÉ)
+            pred_den = self._forecast_single_month_cached(
+                activos['models_den'], activos['den_monthly'], year, month, 'denuncias', activos, engine
+            )
+            
+            # Predecir emergencias (CON CACHÉ)
+            pred_eme = self._forecast_single_month_cached(
+                activos['models_eme'], activos['eme_monthly'], year, month, 'emergencias', activos, engine
+            )
+            
+            # GUARDAR CACHÉ DESPUÉS DE CADA PREDICCIÓN
+            self._guardar_cache_disco()
+            return pred_den, pred_eme
         
-        # GUARDAR CACHÉ DESPUÉS DE CADA PREDICCIÓN
-        self._guardar_cache_disco()
+        try:
+            # Un solo cálculo por (mes, versión, motor) aunque lleguen varias solicitudes a la vez
+            pred_den, pred_eme = self.vuelo_unico.ejecutar(('mes', activos['version'], year, month, engine), calcular)
+        except VersionModeloCambiada:
+            self._recargar_por_version_cambiada(activos)
+            return self.predecir_mes(year, month, tipo, engine)
+        except ImportError as e:
+            if engine != 'lstm':
+                raise
+            print(f"⚠️  Inferencia LSTM no disponible ({e}): se usa el motor rápido")
+            return self.predecir_mes(year, month, tipo, 'fast')
         
         resultado = {
             'year': year,
@@ -337,144 +1548,644 @@ class ModeloPrediccionIncidencias:
             'emergencias': pred_eme,
             'fecha_prediccion': f"{year}-{month:02d}"
         }
+        if engine != 'lstm':
+            resultado['engine'] = engine
         
         return resultado
     
-    def _forecast_single_month_cached(self, model_dict, df_month, target_year, target_month, tipo_modelo):
+    def predecir_trayectoria(self, start, n_months, tipos=None, engine=None):
+        """
+        Predice n_months meses consecutivos en una sola pasada (CON CACHÉ)
+        
+        Recorre el pronóstico recursivo una vez por tipo hasta el último mes,
+        emitiendo cada mes intermedio, y guarda el caché una sola vez al final.
+        
+        Args:
+            start: (year, month) del primer mes
+            n_months: Cantidad de meses
+            tipos: {'denuncias': [ids], 'emergencias': [ids]} para limitar los tipos (default: todos)
+            engine: 'lstm' o 'fast' (ver predecir_mes)
+        
+        Returns:
+            list: Un dict por mes con el mismo formato que predecir_mes()
+        """
+        if not self.trained:
+            raise Exception("Modelos no entrenados. Ejecuta entrenar_modelos() o cargar_modelos() primero.")
+        
+        year, month = start
+        
+        if n_months < 1:
+            raise ValueError("n_months debe ser al menos 1")
+        if engine is not None and engine not in ENGINES_PREDICCION:
+            raise ValueError(f"engine no válido: {engine}. Opciones: {ENGINES_PREDICCION}")
+        
+        self.verificar_version_disco()
+        activos = self._instantanea()
+        if engine is None:
+            engine = 'lstm' if self._lstm_disponible(activos) else 'fast'
+        
+        _, (last_year_den, last_month_den) = _rango_meses(activos['den_monthly'])
+        
+        if (year - last_year_den) * 12 + (month - last_month_den) <= 0:
+            raise ValueError(f"El mes {year}-{month:02d} ya está en los datos históricos o es anterior.")
+        
+        meses = []
+        for _ in range(n_months):
+            meses.append((year, month))
+            month += 1
+            if month > 12:
+                month = 1
+                year += 1
+        
+        filtro = tipos or {}
+        
+        def calcular():
+            pred_den = self._forecast_trayectoria_cached(
+                activos['models_den'], meses, 'denuncias', filtro.get('denuncias'), activos, engine
+            )
+            pred_eme = self._forecast_trayectoria_cached(
+                activos['models_eme'], meses, 'emergencias', filtro.get('emergencias'), activos, engine
+            )
+            
+            # Un solo guardado para toda la trayectoria
+            self._guardar_cache_disco()
+            return pred_den, pred_eme
+        
+        clave = ('trayectoria', activos['version'], meses[0], n_months, engine,
+                 tuple(sorted((familia, tuple(sorted(ids))) for familia, ids in filtro.items() if ids is not None)))
+        try:
+            pred_den, pred_eme = self.vuelo_unico.ejecutar(clave, calcular)
+        except VersionModeloCambiada:
+            self._recargar_por_version_cambiada(activos)
+            return self.predecir_trayectoria(start, n_months, tipos, engine)
+        except ImportError as e:
+            if engine != 'lstm':
+                raise
+            print(f"⚠️  Inferencia LSTM no disponible ({e}): se usa el motor rápido")
+            return self.predecir_trayectoria(start, n_months, tipos, 'fast')
+        
+        trayectoria = [
+            {
+                'year': y,
+                'month': m,
+                'denuncias': pred_den[(y, m)],
+                'emergencias': pred_eme[(y, m)],
+                'fecha_prediccion': f"{y}-{m:02d}"
+            }
+            for y, m in meses
+        ]
+        if engine != 'lstm':
+            for prediccion in trayectoria:
+                prediccion['engine'] = engine
+        
+        return trayectoria
+    
+    def predecir_intervalos(self, start, n_months, n_muestras=N_MUESTRAS_MC, cuantiles=CUANTILES_MC, tipos=None):
+        """
+        Media y bandas de percentiles por tipo y mes con Monte Carlo dropout (CON CACHÉ)
+        
+        Cada mes corre las `n_muestras` pasadas estocásticas de un tipo como un
+        solo lote. El caché se separa por n_muestras y cuantiles. Siempre se
+        calcula con las redes Keras (MOTOR_INTERVALOS) y se recorta a
+        MAX_MUESTRAS_MC para cumplir PRESUPUESTO_INTERVALOS_MC.
+        
+        Args:
+            start: (year, month) del primer mes
+            n_months: Cantidad de meses
+            n_muestras: Pasadas con dropout activo (al menos 2; más de MAX_MUESTRAS_MC se recortan)
+            cuantiles: Cuantiles en (0, 1), p. ej. (0.05, 0.5, 0.95) → p5, p50, p95
+            tipos: {'denuncias': [ids], 'emergencias': [ids]} (default: todos)
+        
+        Returns:
+            list: Un dict por mes: {year, month, denuncias: {tipo: {media, p5, ...}},
+                  emergencias, fecha_prediccion, n_muestras (usadas), n_muestras_solicitadas,
+                  motor_intervalos, cuantiles}
+        """
+        if not self.trained:
+            raise Exception("Modelos no entrenados. Ejecuta entrenar_modelos() o cargar_modelos() primero.")
+        if n_months < 1:
+            raise ValueError("n_months debe ser al menos 1")
+        if n_muestras < 2:
+            raise ValueError("n_muestras debe ser al menos 2")
+        n_solicitadas, n_muestras = n_muestras, min(n_muestras, MAX_MUESTRAS_MC)
+        cuantiles = tuple(sorted(set(float(q) for q in cuantiles)))
+        if not cuantiles or not all(0 < q < 1 for q in cuantiles):
+            raise ValueError("cuantiles debe contener valores entre 0 y 1")
+        
+        self.verificar_version_disco()
+        activos = self._instantanea()
+        if not self._lstm_disponible(activos):
+            raise ValueError("Los intervalos requieren las redes LSTM, no disponibles en este servidor")
+        try:
+            _importar_tensorflow()
+        except ImportError:
+            raise ValueError("Los intervalos requieren TensorFlow: el motor NumPy no cumple "
+                             "PRESUPUESTO_INTERVALOS_MC")
+        
+        year, month = start
+        _, (last_year_den, last_month_den) = _rango_meses(activos['den_monthly'])
+        
+        if (year - last_year_den) * 12 + (month - last_month_den) <= 0:
+            raise ValueError(f"El mes {year}-{month:02d} ya está en los datos históricos o es anterior.")
+        
+        meses = []
+        for _ in range(n_months):
+            meses.append((year, month))
+            month += 1
+            if month > 12:
+                month = 1
+                year += 1
+        
+        filtro = tipos or {}
+        
+        def calcular():
+            pred_den = self._forecast_intervalos_cached(
+                activos['models_den'], meses, 'denuncias', n_muestras, cuantiles, filtro.get('denuncias'), activos
+            )
+            pred_eme = self._forecast_intervalos_cached(
+                activos['models_eme'], meses, 'emergencias', n_muestras, cuantiles, filtro.get('emergencias'), activos
+            )
+            self._guardar_cache_disco()
+            return pred_den, pred_eme
+        
+        clave = ('intervalos', activos['version'], meses[0], n_months, n_muestras, cuantiles,
+                 tuple(sorted((familia, tuple(sorted(ids))) for familia, ids in filtro.items() if ids is not None)))
+        try:
+            pred_den, pred_eme = self.vuelo_unico.ejecutar(clave, calcular)
+        except VersionModeloCambiada:
+            self._recargar_por_version_cambiada(activos)
+            return self.predecir_intervalos(start, n_months, n_solicitadas, cuantiles, tipos)
+        
+        return [
+            {
+                'year': y,
+                'month': m,
+                'denuncias': pred_den[(y, m)],
+                'emergencias': pred_eme[(y, m)],
+                'fecha_prediccion': f"{y}-{m:02d}",
+                'n_muestras': n_muestras,
+                'n_muestras_solicitadas': n_solicitadas,
+                'motor_intervalos': MOTOR_INTERVALOS,
+                'cuantiles': list(cuantiles)
+            }
+            for y, m in meses
+        ]
+    
+    def _forecast_single_month_cached(self, model_dict, df_month, target_year, target_month, tipo_modelo,
+                                      activos=None, engine='lstm'):
         """
         VERSIÓN OPTIMIZADA CON CACHÉ - RETORNA ENTEROS
         """
-        col_tipo = df_month.columns[2]
-        predictions = {}
+        return self._forecast_trayectoria_cached(
+            model_dict, [(target_year, target_month)], tipo_modelo, activos=activos, engine=engine
+        )[(target_year, target_month)]
+    
+    def _forecast_trayectoria_cached(self, model_dict, meses_objetivo, tipo_modelo, tipos=None, activos=None,
+                                     engine='lstm'):
+        """
+        Pronóstico recursivo con caché para uno o varios meses objetivo.
+        
+        Avanza todos los tipos mes a mes a la vez desde su estado precalculado,
+        de modo que cada paso se resuelve con una sola llamada a _predecir_paso.
+        `activos` es la instantánea de modelos (ver _instantanea) con la que se
+        calcula toda la predicción, aunque entre tanto se recarguen los modelos.
+        Con engine='fast' los pasos los resuelve el motor rápido, con sus
+        propias entradas de caché.
+        
+        Returns:
+            dict: {(year, month): {tipo_id: cantidad}}
+        """
+        if activos is None:
+            activos = self._instantanea()
+        version = activos['version']
+        
+        # El motor rápido guarda sus predicciones aparte de las de la LSTM
+        cache_modelo = tipo_modelo if engine == 'lstm' else f'{tipo_modelo}:{engine}'
+        
+        resultados = {mes: {} for mes in meses_objetivo}
+        target_year, target_month = max(meses_objetivo)
         
         # Procesar TODOS los tipos en paralelo (batch)
         tipos_a_predecir = []
         for tipo_id, model_info in model_dict.items():
             if model_info is None:
                 continue
+            if tipos is not None and int(tipo_id) not in tipos:
+                continue
             
             # Verificar caché
-            cache_key = self._get_cache_key(target_year, target_month, tipo_id, tipo_modelo)
-            if cache_key in self.cache_predicciones:
-                predictions[int(tipo_id)] = int(round(self.cache_predicciones[cache_key]))
+            cacheados = {}
+            for mes in meses_objetivo:
+                valor = self.cache_predicciones.get(self._get_cache_key(mes[0], mes[1], tipo_id, cache_modelo, version))
+                if valor is None:
+                    break
+                cacheados[mes] = valor
+            else:
+                for mes, valor in cacheados.items():
+                    resultados[mes][int(tipo_id)] = int(round(valor))
                 continue
             
             tipos_a_predecir.append(tipo_id)
         
         # Si todos están en caché, retornar inmediatamente
         if not tipos_a_predecir:
-            return predictions
+            return resultados
         
         # Predecir solo los tipos que no están en caché
-        print(f"🔮 Calculando {len(tipos_a_predecir)} tipos para {target_year}-{target_month:02d}...")
+        print(f"🔮 Calculando {len(tipos_a_predecir)} tipos hasta {target_year}-{target_month:02d}...")
         
-        for tipo_id in tipos_a_predecir:
-            model_info = model_dict[tipo_id]
-            model = model_info['model']
-            scalers = model_info['scalers']
-            lookback = model_info['lookback']
-            
-            # Obtener datos históricos
-            tipo_df = df_month[df_month[col_tipo] == tipo_id].copy()
-            last_year = tipo_df['year'].max()
-            last_month = tipo_df['month'].max()
-            
-            # Calcular meses intermedios necesarios
-            months_needed = []
-            current_month = last_month
-            current_year = last_year
-            
-            while (current_year < target_year) or (current_year == target_year and current_month < target_month):
-                current_month += 1
-                if current_month > 12:
-                    current_month = 1
-                    current_year += 1
-                months_needed.append((current_year, current_month))
-            
-            # Construir buffer de datos históricos
-            temp_data = []
-            for _, row in tipo_df.iterrows():
-                temp_data.append({
-                    'year': row['year'],
-                    'month': row['month'],
-                    'sin_m': row['sin_m'],
-                    'cos_m': row['cos_m'],
-                    'sin_q': row['sin_q'],
-                    'cos_q': row['cos_q'],
-                    'trend': row['trend'],
-                    'month_idx': row['month_idx'],
-                    'count': row['count']
-                })
+        sesion = nullcontext()
+        if engine == 'fast':
+            predecir_paso = self._predecir_paso_rapido
+        else:
+            if self.carga_diferida:
+                self._asegurar_redes(model_dict, tipos_a_predecir, tipo_modelo, activos)
+            fusionado = activos['predictores_fusionados'].get(tipo_modelo) if self.fusionado else None
+            predecir_paso = lambda model_dict, ventanas: self._predecir_paso(model_dict, ventanas, fusionado)
             
-            # Predecir iterativamente (PERO guardando en caché cada paso)
-            for pred_year, pred_month in months_needed:
-                # Verificar si este mes intermedio ya está cacheado
-                inter_cache_key = self._get_cache_key(pred_year, pred_month, tipo_id, tipo_modelo)
+            if self.planificador is not None:
+                # Solo comparten lote los pasos de la misma familia y versión de modelos
+                grupo = (id(model_dict), id(fusionado))
+                ejecutar_lote = lambda lista: self._predecir_pasos_lote(model_dict, lista, fusionado)
+                predecir_paso = lambda model_dict, ventanas: self.planificador.ejecutar(grupo, ventanas, ejecutar_lote)
+                sesion = self.planificador.sesion()
+        
+        # Copia de trabajo del estado y meses pendientes por tipo
+        estados = {}
+        meses_por_tipo = {}
+        for tipo_id in tipos_a_predecir:
+            estados[tipo_id] = dict(model_dict[tipo_id]['estado'])
+            meses_por_tipo[tipo_id] = set(self._meses_pendientes(estados[tipo_id], target_year, target_month))
+        
+        calendario = sorted(set().union(*meses_por_tipo.values()))
+        
+        # Predecir iterativamente (PERO guardando en caché cada paso)
+        with sesion:
+            for pred_year, pred_month in calendario:
+                tipos_del_paso = [t for t in tipos_a_predecir if (pred_year, pred_month) in meses_por_tipo[t]]
+                ventanas = {}
                 
-                if inter_cache_key in self.cache_predicciones:
-                    # Usar predicción cacheada
-                    pred_count_raw = self.cache_predicciones[inter_cache_key]
-                else:
-                    # Calcular predicción
-                    sin_m_raw = np.sin(2 * np.pi * pred_month / 12)
-                    cos_m_raw = np.cos(2 * np.pi * pred_month / 12)
-                    sin_q_raw = np.sin(2 * np.pi * pred_month / 3)
-                    cos_q_raw = np.cos(2 * np.pi * pred_month / 3)
-                    trend_raw = len(temp_data)
-                    month_idx_raw = pred_month
-                    
-                    # Ventana de lookback
-                    recent_data = temp_data[-lookback:]
-                    
-                    # Escalar datos
-                    window_data = []
-                    for entry in recent_data:
-                        row_scaled = [
-                            scalers['sin_m'].transform([[entry['sin_m']]])[0, 0],
-                            scalers['cos_m'].transform([[entry['cos_m']]])[0, 0],
-                            scalers['sin_q'].transform([[entry['sin_q']]])[0, 0],
-                            scalers['cos_q'].transform([[entry['cos_q']]])[0, 0],
-                            scalers['trend'].transform([[entry['trend']]])[0, 0],
-                            scalers['month_idx'].transform([[entry['month_idx']]])[0, 0],
-                            scalers['count'].transform([[entry['count']]])[0, 0]
-                        ]
-                        window_data.append(row_scaled)
-                    
-                    X = np.array(window_data).reshape(1, lookback, -1)
+                for tipo_id in tipos_del_paso:
+                    # Verificar si este mes intermedio ya está cacheado
+                    cacheado = self.cache_predicciones.get(
+                        self._get_cache_key(pred_year, pred_month, tipo_id, cache_modelo, version)
+                    )
                     
-                    # Predicción
-                    pred_scaled = model.predict(X, verbose=0)[0, 0]
-                    pred_count_raw = scalers['count'].inverse_transform([[pred_scaled]])[0, 0]
+                    if cacheado is not None:
+                        # Usar predicción cacheada
+                        self._avanzar_estado(estados[tipo_id], pred_month, cacheado)
+                    else:
+                        ventanas[tipo_id] = estados[tipo_id]['ventana'].astype(np.float32)
+                
+                # Una sola invocación para todos los tipos pendientes de este mes
+                for tipo_id, pred_scaled in predecir_paso(model_dict, ventanas).items():
+                    estado = estados[tipo_id]
+                    pred_count_raw = pred_scaled * estado['escalas'][IDX_COUNT] + estado['centros'][IDX_COUNT]
                     pred_count_raw = int(max(0, round(pred_count_raw)))
                     
                     # Guardar en caché (YA COMO ENTERO)
+                    inter_cache_key = self._get_cache_key(pred_year, pred_month, tipo_id, cache_modelo, version)
                     self.cache_predicciones[inter_cache_key] = pred_count_raw
+                    
+                    self._avanzar_estado(estado, pred_month, pred_count_raw)
                 
-                # Agregar a temp_data
-                temp_data.append({
-                    'year': pred_year,
-                    'month': pred_month,
-                    'sin_m': sin_m_raw if pred_year == target_year and pred_month == target_month else np.sin(2 * np.pi * pred_month / 12),
-                    'cos_m': cos_m_raw if pred_year == target_year and pred_month == target_month else np.cos(2 * np.pi * pred_month / 12),
-                    'sin_q': sin_q_raw if pred_year == target_year and pred_month == target_month else np.sin(2 * np.pi * pred_month / 3),
-                    'cos_q': cos_q_raw if pred_year == target_year and pred_month == target_month else np.cos(2 * np.pi * pred_month / 3),
-                    'trend': trend_raw if pred_year == target_year and pred_month == target_month else len(temp_data),
-                    'month_idx': month_idx_raw if pred_year == target_year and pred_month == target_month else pred_month,
-                    'count': pred_count_raw
-                })
+                # Emitir los meses solicitados
+                if (pred_year, pred_month) in resultados:
+                    for tipo_id in tipos_del_paso:
+                        resultados[(pred_year, pred_month)][int(tipo_id)] = int(max(0, round(estados[tipo_id]['ultimo_count'])))
+        
+        # NO guardar aquí, se guarda en predecir_mes() / predecir_trayectoria()
+        
+        return resultados
+    
+    def _forecast_intervalos_cached(self, model_dict, meses_objetivo, tipo_modelo, n_muestras, cuantiles,
+                                    tipos=None, activos=None):
+        """
+        Pronóstico recursivo Monte Carlo con caché.
+        
+        Por tipo se llevan `n_muestras` ventanas a la vez: cada mes es una sola
+        invocación con dropout activo sobre el lote (n_muestras, lookback, n_features)
+        y cada muestra realimenta su propio conteo. Se guardan en caché la media y
+        cada cuantil de todos los meses recorridos.
+        
+        Returns:
+            dict: {(year, month): {tipo_id: {'media': x, 'p5': x, ...}}}
+        """
+        if activos is None:
+            activos = self._instantanea()
+        version = activos['version']
+        
+        etiquetas = ['media'] + [self._etiqueta_cuantil(q) for q in cuantiles]
+        prefijo_cache = f"{tipo_modelo}:mc{n_muestras}:{','.join(f'{q:g}' for q in cuantiles)}"
+        
+        resultados = {mes: {} for mes in meses_objetivo}
+        target_year, target_month = max(meses_objetivo)
+        
+        tipos_a_predecir = []
+        for tipo_id, model_info in model_dict.items():
+            if model_info is None:
+                continue
+            if tipos is not None and int(tipo_id) not in tipos:
+                continue
+            
+            cacheados = {}
+            for mes in meses_objetivo:
+                valores = {
+                    etiqueta: self.cache_predicciones.get(
+                        self._get_cache_key(mes[0], mes[1], tipo_id, f'{prefijo_cache}:{etiqueta}', version)
+                    )
+                    for etiqueta in etiquetas
+                }
+                if None in valores.values():
+                    break
+                cacheados[mes] = valores
+            else:
+                for mes, valores in cacheados.items():
+                    resultados[mes][int(tipo_id)] = valores
+                continue
+            
+            tipos_a_predecir.append(tipo_id)
+        
+        if not tipos_a_predecir:
+            return resultados
+        
+        print(f"🎲 Calculando intervalos ({n_muestras} muestras) de {len(tipos_a_predecir)} tipos "
+              f"hasta {target_year}-{target_month:02d}...")
+        
+        if self.carga_diferida and self.motor_inferencia == MOTOR_INTERVALOS:
+            self._asegurar_redes(model_dict, tipos_a_predecir, tipo_modelo, activos)
+        self._asegurar_predictores_mc(model_dict, tipos_a_predecir, activos)
+        
+        for tipo_id in tipos_a_predecir:
+            info = model_dict[tipo_id]
+            estado = info['estado']
+            centros = estado['centros']
+            escalas = estado['escalas']
+            # Semilla por tipo: el resultado no depende de qué otros tipos estaban en caché
+            rng = np.random.default_rng([RANDOM_SEED, int(tipo_id)])
+            
+            ventanas = np.repeat(estado['ventana'][np.newaxis], n_muestras, axis=0)
+            n_filas = estado['n_filas']
+            
+            pendientes = self._meses_pendientes(estado, target_year, target_month)
+            trayectorias = []
+            for pred_year, pred_month in pendientes:
+                salida = info['predictor_mc'](ventanas, rng)
+                conteos = np.maximum(0, np.round(np.asarray(salida).reshape(-1) * escalas[IDX_COUNT]
+                                                 + centros[IDX_COUNT]))
+                trayectorias.append(conteos)
+                
+                filas = (self._fila_mes(pred_month, n_filas, conteos) - centros) / escalas
+                ventanas = np.concatenate([ventanas[:, 1:], filas[:, np.newaxis]], axis=1)
+                n_filas += 1
+            
+            # Estadísticas de todos los meses de una vez: (meses, n_muestras)
+            trayectorias = np.array(trayectorias)
+            valores = np.vstack([trayectorias.mean(axis=1), np.quantile(trayectorias, cuantiles, axis=1)])
+            for (pred_year, pred_month), columna in zip(pendientes, valores.T):
+                estadisticas = {etiqueta: round(float(valor), 2) for etiqueta, valor in zip(etiquetas, columna)}
+                for etiqueta, valor in estadisticas.items():
+                    clave = self._get_cache_key(pred_year, pred_month, tipo_id, f'{prefijo_cache}:{etiqueta}', version)
+                    self.cache_predicciones[clave] = valor
                 
-                # Si llegamos al mes objetivo, guardar resultado
-                if pred_year == target_year and pred_month == target_month:
-                    predictions[int(tipo_id)] = int(max(0, round(pred_count_raw)))
+                if (pred_year, pred_month) in resultados:
+                    resultados[(pred_year, pred_month)][int(tipo_id)] = estadisticas
         
-        # NO guardar aquí, se guarda en predecir_mes()
+        return resultados
+    
+    def _etiqueta_cuantil(self, q):
+        """0.05 → 'p5', 0.975 → 'p97.5'"""
+        return f'p{round(q * 100, 4):g}'
+    
+    def _asegurar_predictores_mc(self, model_dict, tipos, activos):
+        """Construye (una sola vez) el predictor con dropout activo de cada tipo"""
+        with self._lock_carga:
+            # Por archivo de red: la red global se comparte entre tipos (un solo predictor base)
+            redes = activos.setdefault('predictores_mc', {})
+            for tipo_id in tipos:
+                info = model_dict[tipo_id]
+                if info.get('predictor_mc') is not None:
+                    continue
+                
+                clave = info.get('ruta') or id(info['model'])
+                if clave not in redes:
+                    n_features = len(info['scalers'])
+                    if 'indice_global' in info:
+                        n_features += info['predictor'].n_tipos
+                    red = self._red_intervalos(info, activos)
+                    redes[clave] = self._construir_predictor_estocastico(red, info['lookback'], n_features)
+                base = redes[clave]
+                
+                if 'indice_global' in info:
+                    from models.inferencia_fusionada import agregar_tipo
+                    indice, n_tipos = info['indice_global'], info['predictor'].n_tipos
+                    info['predictor_mc'] = lambda X, rng, base=base, indice=indice, n_tipos=n_tipos: \
+                        base(agregar_tipo(X, indice, n_tipos), rng)
+                else:
+                    info['predictor_mc'] = base
+    
+    def _red_intervalos(self, info, activos):
+        """
+        Red Keras de un tipo para los intervalos (MOTOR_INTERVALOS): la ya cargada
+        con el motor keras, o la del mismo archivo .keras con los motores numpy y plano.
+        """
+        from models.inferencia_numpy import RedLSTMNumpy
+        
+        if info['model'] is not None and not isinstance(info['model'], RedLSTMNumpy):
+            return info['model']
+        
+        version_disco = self._leer_version_disco()
+        if version_disco is not None and version_disco != activos['version']:
+            raise VersionModeloCambiada(f"{activos['version']} → {version_disco}")
+        
+        _importar_tensorflow()
+        from tensorflow.keras.models import load_model
+        return load_model(info['ruta'])
+    
+    def _construir_predictor_estocastico(self, model, lookback, n_features):
+        """
+        Como _construir_predictor pero con dropout activo: callable(X, rng).
+        Las máscaras salen de los generadores de semilla de las capas Dropout,
+        que se fijan desde `rng` en cada llamada (resultado reproducible).
+        """
+        import threading
+        
+        tf = _importar_tensorflow()
+        
+        generadores = [capa.seed_generator for capa in model.layers
+                       if getattr(capa, 'seed_generator', None) is not None]
+        dtype_semilla = generadores[0].state.dtype if generadores else 'int64'
+        
+        @tf.function(input_signature=[tf.TensorSpec(shape=(None, lookback, n_features), dtype=tf.float32),
+                                      tf.TensorSpec(shape=(len(generadores), 2), dtype=dtype_semilla)])
+        def _inferencia(X, semillas):
+            for i, generador in enumerate(generadores):
+                generador.state.assign(semillas[i])
+            return model(X, training=True)
+        
+        # Llamar a la función concreta con arrays NumPy evita el despacho de
+        # tf.function (~0.8 ms por llamada, una por tipo y mes)
+        concreta = _inferencia.get_concrete_function()
+        # Los generadores son estado compartido: una llamada a la vez
+        lock = threading.Lock()
+        
+        def predictor(X, rng):
+            semillas = rng.integers(0, 2 ** 31, size=(len(generadores), 2)).astype(dtype_semilla)
+            with lock:
+                return concreta(np.asarray(X, dtype=np.float32), semillas).numpy()
+        
+        predictor(np.zeros((1, lookback, n_features), dtype=np.float32), np.random.default_rng(RANDOM_SEED))
+        
+        return predictor
+    
+    def _meses_pendientes(self, estado, target_year, target_month):
+        """Meses entre el último dato del estado y el mes objetivo (inclusive)"""
+        months_needed = []
+        current_year = estado['ultimo_year']
+        current_month = estado['ultimo_month']
+        
+        while (current_year < target_year) or (current_year == target_year and current_month < target_month):
+            current_month += 1
+            if current_month > 12:
+                current_month = 1
+                current_year += 1
+            months_needed.append((current_year, current_month))
+        
+        return months_needed
+    
+    def _avanzar_estado(self, estado, pred_month, count):
+        """Desplaza la ventana escalada de un tipo agregando un mes pronosticado"""
+        fila_escalada = (self._fila_mes(pred_month, estado['n_filas'], count) - estado['centros']) / estado['escalas']
+        estado['ventana'] = np.concatenate([estado['ventana'][1:], fila_escalada[np.newaxis]])
+        estado['n_filas'] += 1
+        estado['ultimo_count'] = count
+    
+    def _fila_mes(self, pred_month, n_filas, count):
+        """
+        Features sin escalar de un mes pronosticado (orden de FEATURES).
+        `count` puede ser un arreglo (una fila por muestra).
+        """
+        count = np.asarray(count, dtype=np.float64)
+        fila = np.empty(count.shape + (len(FEATURES),), dtype=np.float64)
+        fila[..., 0] = np.sin(2 * np.pi * pred_month / 12)
+        fila[..., 1] = np.cos(2 * np.pi * pred_month / 12)
+        fila[..., 2] = np.sin(2 * np.pi * pred_month / 3)
+        fila[..., 3] = np.cos(2 * np.pi * pred_month / 3)
+        fila[..., 4] = n_filas
+        fila[..., 5] = pred_month
+        fila[..., IDX_COUNT] = count
+        return fila
+    
+    def _predecir_paso(self, model_dict, ventanas, fusionado=None):
+        """
+        Predice un paso del pronóstico para varios tipos.
+        
+        Args:
+            ventanas: {tipo_id: ventana escalada (lookback, n_features)}
+            fusionado: PredictorFusionado de la familia (None = un predictor por tipo)
+        Returns:
+            dict: {tipo_id: predicción en escala normalizada}
+        """
+        if not ventanas:
+            return {}
+        
+        if fusionado is None:
+            return {
+                tipo_id: float(model_dict[tipo_id]['predictor'](X[np.newaxis])[0, 0])
+                for tipo_id, X in ventanas.items()
+            }
+        
+        # Los tipos sin ventana (cacheados) se rellenan con ceros y se descartan
+        X = np.zeros((len(fusionado.tipos), 1, fusionado.lookback, fusionado.n_features), dtype=np.float32)
+        for tipo_id, ventana in ventanas.items():
+            X[fusionado.indices[tipo_id], 0] = ventana
         
-        return predictions
+        salida = fusionado(X)
+        return {tipo_id: float(salida[fusionado.indices[tipo_id], 0]) for tipo_id in ventanas}
+    
+    def _predecir_pasos_lote(self, model_dict, lista_ventanas, fusionado=None):
+        """
+        Varios pasos (de distintas solicitudes) en una sola invocación por tipo
+        o, con el grafo fusionado, en una sola invocación por familia.
+        
+        Args:
+            lista_ventanas: [{tipo_id: ventana escalada}, ...] un dict por paso
+        Returns:
+            list: [{tipo_id: predicción en escala normalizada}, ...] en el mismo orden
+        """
+        if len(lista_ventanas) == 1:
+            return [self._predecir_paso(model_dict, lista_ventanas[0], fusionado)]
+        
+        resultados = [{} for _ in lista_ventanas]
+        
+        if fusionado is None:
+            por_tipo = {}
+            for idx, ventanas in enumerate(lista_ventanas):
+                for tipo_id, ventana in ventanas.items():
+                    por_tipo.setdefault(tipo_id, []).append((idx, ventana))
+            
+            for tipo_id, pasos in por_tipo.items():
+                salida = model_dict[tipo_id]['predictor'](np.stack([ventana for _, ventana in pasos]))
+                for fila, (idx, _) in enumerate(pasos):
+                    resultados[idx][tipo_id] = float(salida[fila, 0])
+            return resultados
+        
+        # (n_tipos, pasos, lookback, n_features): cada paso es una columna del lote
+        X = np.zeros((len(fusionado.tipos), len(lista_ventanas), fusionado.lookback, fusionado.n_features),
+                     dtype=np.float32)
+        for idx, ventanas in enumerate(lista_ventanas):
+            for tipo_id, ventana in ventanas.items():
+                X[fusionado.indices[tipo_id], idx] = ventana
+        
+        salida = fusionado(X)
+        for idx, ventanas in enumerate(lista_ventanas):
+            for tipo_id in ventanas:
+                resultados[idx][tipo_id] = float(salida[fusionado.indices[tipo_id], idx])
+        return resultados
+    
+    def _predecir_paso_rapido(self, model_dict, ventanas):
+        """Un paso del pronóstico con el motor rápido (Ridge): un producto punto por tipo"""
+        return {
+            tipo_id: float(ventana.astype(np.float64).ravel() @ model_dict[tipo_id]['rapido']['coef']
+                           + model_dict[tipo_id]['rapido']['intercepto'])
+            for tipo_id, ventana in ventanas.items()
+        }
+    
+    def _lstm_disponible(self, activos):
+        """False si las redes LSTM no se pudieron cargar (sin carga diferida)"""
+        if self.carga_diferida:
+            return True
+        return all(
+            info['predictor'] is not None
+            for model_dict in (activos['models_den'], activos['models_eme'])
+            for info in model_dict.values()
+        )
+    
+    def _construir_predictores_fusionados(self, models_den, models_eme):
+        """Construye el grafo fusionado de cada familia si la opción está activa"""
+        predictores = {}
+        if not self.fusionado:
+            return predictores
+        
+        from models.inferencia_fusionada import construir_predictor_fusionado, construir_predictor_fusionado_global
+        
+        construir = construir_predictor_fusionado_global if self.arquitectura == 'global' else construir_predictor_fusionado
+        
+        for tipo_modelo, model_dict in (('denuncias', models_den), ('emergencias', models_eme)):
+            if not model_dict:
+                continue
+            n_features = len(next(iter(model_dict.values()))['scalers'])
+            try:
+                predictores[tipo_modelo] = construir(model_dict, n_features)
+                print(f"✅ Inferencia fusionada {tipo_modelo}: {len(model_dict)} tipos en un solo grafo")
+            except ValueError as e:
+                print(f"⚠️  Inferencia fusionada no disponible para {tipo_modelo}: {e}")
+        
+        return predictores
     
     def limpiar_cache(self):
         """Limpia caché de predicciones"""
-        self.cache_predicciones = {}
-        self._guardar_cache_disco()
+        self.cache_predicciones.limpiar()
         print("✅ Caché limpiado")
     
     def obtener_metricas(self):
@@ -491,17 +2202,65 @@ class ModeloPrediccionIncidencias:
             }
         }
         
+        # Motor rápido: su error y la brecha frente a la LSTM (positiva = peor que la LSTM)
+        metricas['motor_rapido'] = {
+            nombre: {
+                int(t): {
+                    'mae': info['rapido']['mae'],
+                    'rmse': info['rapido']['rmse'],
+                    'brecha_mae': info['rapido']['mae'] - info['metrics']['mae'],
+                    'brecha_rmse': info['rapido']['rmse'] - info['metrics']['rmse']
+                }
+                for t, info in model_dict.items() if info is not None and info.get('rapido')
+            }
+            for nombre, model_dict in (('denuncias', self.models_den), ('emergencias', self.models_eme))
+        }
+        
         return metricas
 
 
 # Singleton global
 _modelo_global = None
 
-def get_modelo():
-    """Obtiene instancia singleton del modelo"""
+def get_modelo(motor_inferencia=None, fusionado=None, carga_diferida=None, precalentar=None, arquitectura=None,
+               microbatch=None, microbatch_espera_ms=None, microbatch_max_lote=None):
+    """
+    Obtiene instancia singleton del modelo
+    
+    Args:
+        motor_inferencia: 'keras', 'numpy' o 'plano' (default: variable de entorno MOTOR_INFERENCIA)
+        fusionado: Un solo grafo por familia en cada paso (default: variable de entorno INFERENCIA_FUSIONADA)
+        carga_diferida: Cargar cada red en su primer uso (default: variable de entorno CARGA_DIFERIDA_MODELOS)
+        precalentar: Con carga diferida, cargar las redes en segundo plano (default: variable de entorno PRECALENTAR_MODELOS)
+        arquitectura: 'por_tipo' o 'global' (default: variable de entorno ARQUITECTURA_MODELO)
+        microbatch: Agrupar pasos de solicitudes concurrentes (default: variable de entorno MICROBATCH_INFERENCIA)
+        microbatch_espera_ms / microbatch_max_lote: Espera y tamaño máximos del lote
+            (default: MICROBATCH_ESPERA_MS / MICROBATCH_MAX_LOTE)
+    """
     global _modelo_global
     if _modelo_global is None:
-        _modelo_global = ModeloPrediccionIncidencias()
+        if motor_inferencia is None:
+            motor_inferencia = os.environ.get('MOTOR_INFERENCIA', MOTOR_INFERENCIA_DEFAULT)
+        if fusionado is None:
+            fusionado = os.environ.get('INFERENCIA_FUSIONADA', 'false').lower() == 'true'
+        if carga_diferida is None:
+            carga_diferida = os.environ.get('CARGA_DIFERIDA_MODELOS', 'false').lower() == 'true'
+        if precalentar is None:
+            precalentar = os.environ.get('PRECALENTAR_MODELOS', 'false').lower() == 'true'
+        if arquitectura is None:
+            arquitectura = os.environ.get('ARQUITECTURA_MODELO', ARQUITECTURA_DEFAULT)
+        if microbatch is None:
+            microbatch = os.environ.get('MICROBATCH_INFERENCIA', 'false').lower() == 'true'
+        if microbatch_espera_ms is None and 'MICROBATCH_ESPERA_MS' in os.environ:
+            microbatch_espera_ms = float(os.environ['MICROBATCH_ESPERA_MS'])
+        if microbatch_max_lote is None and 'MICROBATCH_MAX_LOTE' in os.environ:
+            microbatch_max_lote = int(os.environ['MICROBATCH_MAX_LOTE'])
+        _modelo_global = ModeloPrediccionIncidencias(
+            motor_inferencia=motor_inferencia, fusionado=fusionado,
+            carga_diferida=carga_diferida, precalentar=precalentar, arquitectura=arquitectura,
+            microbatch=microbatch, microbatch_espera_ms=microbatch_espera_ms,
+            microbatch_max_lote=microbatch_max_lote
+        )
         try:
             _modelo_global.cargar_modelos()
         except FileNotFoundError:
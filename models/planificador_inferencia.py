@@ -0,0 +1,189 @@
+"""
+models/planificador_inferencia.py
+Micro-batching de pasos del pronóstico entre solicitudes concurrentes
+
+Cuando varias solicitudes (p. ej. las pestañas del panel) pronostican a la vez,
+cada una avanza su propio bucle mes a mes. El planificador junta durante unos
+milisegundos los pasos que llegan de distintos hilos y los ejecuta en una sola
+invocación por modelo de tipo (o del grafo fusionado), devolviendo a cada
+solicitud solo sus resultados.
+
+  - sin cola en segundo plano: el primer hilo que encuentra pasos pendientes
+    actúa de líder, arma el lote y lo ejecuta; los demás esperan su resultado
+  - el líder deja de esperar en cuanto todas las sesiones activas enviaron su
+    paso, se llena el lote o vence la espera máxima (una sola solicitud no
+    espera nada)
+  - contadores de lotes, tamaño promedio, espera y ventanas por segundo
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+MAX_ESPERA_MS = 5
+MAX_LOTE = 32  # pasos (solicitudes) por lote
+
+
+class _Solicitud:
+    """Un paso pendiente de una solicitud: {tipo_id: ventana} de una familia"""
+
+    __slots__ = ('grupo', 'ventanas', 'funcion', 'creada', 'resultado', 'error', 'lista')
+
+    def __init__(self, grupo, ventanas, funcion):
+        self.grupo = grupo
+        self.ventanas = ventanas
+        self.funcion = funcion
+        self.creada = time.perf_counter()
+        self.resultado = None
+        self.error = None
+        self.lista = False
+
+
+class PlanificadorInferencia:
+    """
+    Agrupa pasos de pronóstico concurrentes en lotes.
+
+    Uso:
+        with planificador.sesion():
+            for mes in meses:
+                salida = planificador.ejecutar(grupo, ventanas, funcion_lote)
+
+    `funcion_lote(lista_de_ventanas)` recibe los pasos de un mismo `grupo`
+    (misma familia y versión de modelos) y retorna un dict de resultados por paso.
+    """
+
+    def __init__(self, max_espera_ms=MAX_ESPERA_MS, max_lote=MAX_LOTE):
+        if max_lote < 1:
+            raise ValueError("max_lote debe ser al menos 1")
+        if max_espera_ms < 0:
+            raise ValueError("max_espera_ms no puede ser negativo")
+
+        self.max_espera = max_espera_ms / 1000
+        self.max_lote = max_lote
+        self._cond = threading.Condition()
+        self._pendientes = []
+        self._lider_activo = False
+        self._sesiones = 0
+
+        # Métricas
+        self._lotes = 0
+        self._llamadas = 0
+        self._pasos = 0
+        self._ventanas = 0
+        self._max_pasos_lote = 0
+        self._espera_total = 0.0
+        self._inferencia_total = 0.0
+
+    @contextmanager
+    def sesion(self):
+        """Marca una solicitud que enviará pasos; el líder la espera antes de cerrar el lote"""
+        with self._cond:
+            self._sesiones += 1
+        try:
+            yield self
+        finally:
+            with self._cond:
+                self._sesiones -= 1
+                self._cond.notify_all()
+
+    def ejecutar(self, grupo, ventanas, funcion):
+        """
+        Envía un paso y espera su resultado.
+
+        Args:
+            grupo: Clave de los pasos que pueden ir en el mismo lote
+            ventanas: {tipo_id: ventana escalada}
+            funcion: callable(lista de ventanas) -> lista de {tipo_id: predicción}
+        Returns:
+            dict: {tipo_id: predicción} de este paso
+        """
+        if not ventanas:
+            return {}
+
+        solicitud = _Solicitud(grupo, ventanas, funcion)
+        with self._cond:
+            self._pendientes.append(solicitud)
+            self._cond.notify_all()
+
+        while True:
+            with self._cond:
+                while not solicitud.lista and self._lider_activo:
+                    self._cond.wait()
+                if solicitud.lista:
+                    break
+                self._lider_activo = True
+                lote = self._recolectar()
+
+            try:
+                self._ejecutar_lote(lote)
+            finally:
+                with self._cond:
+                    self._lider_activo = False
+                    self._cond.notify_all()
+
+        if solicitud.error is not None:
+            raise solicitud.error
+        return solicitud.resultado
+
+    def _recolectar(self):
+        """Espera (con el lock tomado) a que se complete el lote y lo saca de la cola"""
+        limite = self._pendientes[0].creada + self.max_espera
+        while len(self._pendientes) < min(self.max_lote, self._sesiones):
+            restante = limite - time.perf_counter()
+            if restante <= 0:
+                break
+            self._cond.wait(restante)
+
+        lote = self._pendientes[:self.max_lote]
+        del self._pendientes[:self.max_lote]
+
+        ahora = time.perf_counter()
+        self._espera_total += sum(ahora - s.creada for s in lote)
+        return lote
+
+    def _ejecutar_lote(self, lote):
+        """Una invocación de funcion_lote por grupo; reparte resultados y errores"""
+        grupos = {}
+        for solicitud in lote:
+            grupos.setdefault(solicitud.grupo, []).append(solicitud)
+
+        inicio = time.perf_counter()
+        llamadas = 0
+        for solicitudes in grupos.values():
+            try:
+                resultados = solicitudes[0].funcion([s.ventanas for s in solicitudes])
+                for solicitud, resultado in zip(solicitudes, resultados):
+                    solicitud.resultado = resultado
+            except Exception as e:
+                for solicitud in solicitudes:
+                    solicitud.error = e
+            llamadas += 1
+
+        with self._cond:
+            self._inferencia_total += time.perf_counter() - inicio
+            self._lotes += 1
+            self._llamadas += llamadas
+            self._pasos += len(lote)
+            self._ventanas += sum(len(s.ventanas) for s in lote)
+            self._max_pasos_lote = max(self._max_pasos_lote, len(lote))
+            for solicitud in lote:
+                solicitud.lista = True
+
+    def estadisticas(self):
+        """Throughput del planificador desde su creación"""
+        with self._cond:
+            return {
+                'max_espera_ms': self.max_espera * 1000,
+                'max_lote': self.max_lote,
+                'lotes': self._lotes,
+                'llamadas_inferencia': self._llamadas,
+                'pasos': self._pasos,
+                'ventanas': self._ventanas,
+                'pasos_por_lote': round(self._pasos / self._lotes, 2) if self._lotes else 0.0,
+                'max_pasos_lote': self._max_pasos_lote,
+                'espera_promedio_ms': round(self._espera_total / self._pasos * 1000, 3) if self._pasos else 0.0,
+                'ventanas_por_segundo': (round(self._ventanas / self._inferencia_total, 1)
+                                         if self._inferencia_total else 0.0),
+                'sesiones_activas': self._sesiones,
+                'pendientes': len(self._pendientes)
+            }
@@ -0,0 +1,65 @@
+"""
+models/procesos_entrenamiento.py
+Funciones de los procesos del pool de entrenamiento en paralelo
+
+Los pools usan el contexto spawn (TensorFlow no es seguro tras fork): cada
+proceso nuevo importa solo este módulo y modelo_PREDICCION, nunca app.py.
+Además spawn re-ejecuta el script principal del padre si tiene __file__; el
+servidor de desarrollo (python app.py) lo desvincula con sin_reimportar_main()
+para que los procesos no levanten otra aplicación.
+"""
+
+import os
+import sys
+import time
+
+from models.modelo_PREDICCION import (
+    BATCH_SIZE_ENTRENAMIENTO, JIT_ENTRENAMIENTO, RANDOM_SEED, ModeloPrediccionIncidencias, _importar_tensorflow
+)
+
+
+def sin_reimportar_main():
+    """
+    Quita __file__ del módulo __main__: los procesos spawn dejan de re-ejecutar
+    el script principal (como con el intérprete interactivo). Llamar desde el
+    bloque `if __name__ == '__main__'` del script.
+    """
+    sys.modules['__main__'].__dict__.pop('__file__', None)
+
+
+def _inicializar_proceso_entrenamiento(hilos_tf):
+    """Inicializa cada proceso del pool: TensorFlow con hilos limitados y ops deterministas"""
+    tf = _importar_tensorflow()
+    tf.config.threading.set_intra_op_parallelism_threads(hilos_tf)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+    tf.config.experimental.enable_op_determinism()
+
+
+def _entrenar_tipo_en_proceso(prefijo, df_month, tipo_id, epochs, dir_temporal,
+                              batch_size=BATCH_SIZE_ENTRENAMIENTO, jit=JIT_ENTRENAMIENTO, hiperparametros=None):
+    """Proceso del pool de entrenamiento: entrena un tipo y guarda su red en dir_temporal"""
+    tf = _importar_tensorflow()
+
+    # Semilla por tipo (después de _importar_tensorflow, que fija RANDOM_SEED)
+    tf.keras.utils.set_random_seed(RANDOM_SEED + (0 if prefijo == 'den' else 1000) + int(tipo_id))
+
+    inicio = time.perf_counter()
+    modelo = ModeloPrediccionIncidencias()
+    result = modelo.train_model_per_type(df_month, tipo_id, epochs=epochs, batch_size=batch_size, jit=jit,
+                                         hiperparametros=hiperparametros)
+    if result is None:
+        return None
+
+    ruta = os.path.join(dir_temporal, f'{prefijo}_tipo_{tipo_id}.keras')
+    result['model'].save(ruta)
+
+    return {
+        'ruta': ruta,
+        'scalers': result['scalers'],
+        'lookback': result['lookback'],
+        'estado': result['estado'],
+        'metrics': result['metrics'],
+        'rapido': result['rapido'],
+        'hiperparametros': result['hiperparametros'],
+        'segundos': time.perf_counter() - inicio
+    }
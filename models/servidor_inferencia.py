@@ -0,0 +1,456 @@
+"""
+models/servidor_inferencia.py
+Servidor de inferencia local compartido por todos los workers web
+
+Con varios workers WSGI cada proceso importaría TensorFlow y tendría su propia
+copia de las 18 redes. En su lugar un solo proceso dueño de
+ModeloPrediccionIncidencias atiende por un socket Unix y los workers usan
+ClienteInferencia, con la misma interfaz predecir_mes / predecir_trayectoria /
+predecir_intervalos.
+
+Protocolo binario (big-endian), cada mensaje precedido por su largo ('!I'):
+  solicitud:  op (B), year (H), month (B), n_months (H), engine (B),
+              por familia: n_tipos (H, 0xFFFF = todos) + n_tipos × id (H),
+              OP_INTERVALOS: + JSON {n_muestras, cuantiles}
+  respuesta:  estado (B) + cuerpo
+              OK: n_meses (H) y por mes year (H), month (B), engine (B),
+                  por familia: n (H) + n × (id (H), cantidad (I))
+                  (OP_INTERVALOS y OP_ESTADO: JSON)
+              error: mensaje UTF-8 (ValueError → ESTADO_VALOR)
+
+Ejecutar el servidor desde la raíz del proyecto:
+  python -m models.servidor_inferencia --socket /tmp/inferencia.sock
+"""
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+import traceback
+
+TIMEOUT_S = 30.0  # conexión y respuesta de cada solicitud
+REINTENTO_S = 5.0  # tras una falla, segundos usando el modelo local antes de reintentar
+MAX_CONEXIONES = 8  # conexiones abiertas reutilizables por cliente
+MAX_MENSAJE = 16 * 1024 * 1024
+
+OP_MES = 1
+OP_TRAYECTORIA = 2
+OP_ESTADO = 3
+OP_INTERVALOS = 4
+
+ESTADO_OK = 0
+ESTADO_VALOR = 1  # ValueError (solicitud inválida)
+ESTADO_ERROR = 2
+
+ENGINES = (None, 'lstm', 'fast')  # código = índice
+SIN_FILTRO = 0xFFFF
+
+_LARGO = struct.Struct('!I')
+_SOLICITUD = struct.Struct('!BHBHB')
+_MES = struct.Struct('!HBB')
+_CONTEO = struct.Struct('!H')
+
+
+class ServicioNoDisponible(Exception):
+    """El servidor de inferencia no respondió (caído, sin socket o timeout)"""
+
+
+# ============================================
+# PROTOCOLO
+# ============================================
+
+def _recibir_exacto(sock, n):
+    partes = []
+    while n:
+        parte = sock.recv(n)
+        if not parte:
+            raise ConnectionError("Conexión cerrada por el otro extremo")
+        partes.append(parte)
+        n -= len(parte)
+    return b''.join(partes)
+
+
+def enviar_mensaje(sock, datos):
+    sock.sendall(_LARGO.pack(len(datos)) + datos)
+
+
+def recibir_mensaje(sock):
+    largo, = _LARGO.unpack(_recibir_exacto(sock, _LARGO.size))
+    if largo > MAX_MENSAJE:
+        raise ConnectionError(f"Mensaje demasiado grande: {largo} bytes")
+    return _recibir_exacto(sock, largo)
+
+
+def codificar_solicitud(op, year=0, month=0, n_months=0, engine=None, tipos=None, opciones=None):
+    partes = [_SOLICITUD.pack(op, year, month, n_months, ENGINES.index(engine))]
+    for familia in ('denuncias', 'emergencias'):
+        ids = (tipos or {}).get(familia)
+        if ids is None:
+            partes.append(_CONTEO.pack(SIN_FILTRO))
+        else:
+            ids = [int(t) for t in ids]
+            partes.append(struct.pack(f'!H{len(ids)}H', len(ids), *ids))
+    if opciones is not None:
+        partes.append(json.dumps(opciones).encode())
+    return b''.join(partes)
+
+
+def decodificar_solicitud(datos):
+    op, year, month, n_months, engine = _SOLICITUD.unpack_from(datos)
+    desplazamiento = _SOLICITUD.size
+    tipos = {}
+    for familia in ('denuncias', 'emergencias'):
+        n, = _CONTEO.unpack_from(datos, desplazamiento)
+        desplazamiento += _CONTEO.size
+        if n != SIN_FILTRO:
+            tipos[familia] = list(struct.unpack_from(f'!{n}H', datos, desplazamiento))
+            desplazamiento += 2 * n
+    opciones = json.loads(datos[desplazamiento:].decode()) if len(datos) > desplazamiento else None
+    return op, year, month, n_months, ENGINES[engine], tipos or None, opciones
+
+
+def codificar_predicciones(predicciones):
+    """Lista de dicts con el formato de predecir_mes → bytes"""
+    partes = [_CONTEO.pack(len(predicciones))]
+    for prediccion in predicciones:
+        partes.append(_MES.pack(prediccion['year'], prediccion['month'], ENGINES.index(prediccion.get('engine'))))
+        for familia in ('denuncias', 'emergencias'):
+            valores = prediccion[familia]
+            plano = [x for tipo_id, cantidad in valores.items() for x in (int(tipo_id), int(cantidad))]
+            partes.append(struct.pack('!H' + 'HI' * len(valores), len(valores), *plano))
+    return b''.join(partes)
+
+
+def decodificar_predicciones(datos):
+    n_meses, = _CONTEO.unpack_from(datos)
+    desplazamiento = _CONTEO.size
+    predicciones = []
+    for _ in range(n_meses):
+        year, month, engine = _MES.unpack_from(datos, desplazamiento)
+        desplazamiento += _MES.size
+        prediccion = {'year': year, 'month': month}
+        for familia in ('denuncias', 'emergencias'):
+            n, = _CONTEO.unpack_from(datos, desplazamiento)
+            desplazamiento += _CONTEO.size
+            plano = struct.unpack_from('!' + 'HI' * n, datos, desplazamiento)
+            desplazamiento += 6 * n
+            prediccion[familia] = dict(zip(plano[::2], plano[1::2]))
+        prediccion['fecha_prediccion'] = f"{year}-{month:02d}"
+        if ENGINES[engine] is not None:
+            prediccion['engine'] = ENGINES[engine]
+        predicciones.append(prediccion)
+    return predicciones
+
+
+def decodificar_intervalos(datos):
+    """JSON de predecir_intervalos → mismo formato (ids de tipo enteros)"""
+    intervalos = json.loads(datos.decode())
+    for prediccion in intervalos:
+        for familia in ('denuncias', 'emergencias'):
+            prediccion[familia] = {int(tipo_id): bandas for tipo_id, bandas in prediccion[familia].items()}
+    return intervalos
+
+
+# ============================================
+# SERVIDOR
+# ============================================
+
+class _ManejadorConexion(socketserver.BaseRequestHandler):
+    """Atiende solicitudes en una conexión persistente hasta que el cliente la cierra"""
+
+    def handle(self):
+        while True:
+            try:
+                datos = recibir_mensaje(self.request)
+            except (ConnectionError, OSError):
+                return
+            enviar_mensaje(self.request, self.server.servidor.atender(datos))
+
+
+class _ServidorUnix(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class ServidorInferencia:
+    """
+    Expone un ModeloPrediccionIncidencias por un socket Unix.
+
+    Uso:
+        servidor = ServidorInferencia(get_modelo(), '/tmp/inferencia.sock')
+        servidor.iniciar()            # bloquea; iniciar(en_hilo=True) para pruebas
+    """
+
+    def __init__(self, modelo, ruta_socket):
+        self.modelo = modelo
+        self.ruta_socket = ruta_socket
+        self._servidor = None
+        self._lock = threading.Lock()
+        self._solicitudes = 0
+        self._errores = 0
+
+    def iniciar(self, en_hilo=False):
+        # Un socket viejo de una ejecución anterior impediría el bind
+        if os.path.exists(self.ruta_socket):
+            os.unlink(self.ruta_socket)
+
+        self._servidor = _ServidorUnix(self.ruta_socket, _ManejadorConexion)
+        self._servidor.servidor = self
+        os.chmod(self.ruta_socket, 0o660)
+        print(f"🔌 Servidor de inferencia escuchando en {self.ruta_socket} (pid {os.getpid()})")
+
+        if en_hilo:
+            threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        else:
+            self._servidor.serve_forever()
+
+    def detener(self):
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+        if os.path.exists(self.ruta_socket):
+            os.unlink(self.ruta_socket)
+
+    def atender(self, datos):
+        """Decodifica una solicitud, la ejecuta y retorna la respuesta codificada"""
+        with self._lock:
+            self._solicitudes += 1
+        try:
+            op, year, month, n_months, engine, tipos, opciones = decodificar_solicitud(datos)
+            if op == OP_MES:
+                cuerpo = codificar_predicciones([self.modelo.predecir_mes(year, month, engine=engine)])
+            elif op == OP_TRAYECTORIA:
+                cuerpo = codificar_predicciones(
+                    self.modelo.predecir_trayectoria((year, month), n_months, tipos, engine)
+                )
+            elif op == OP_INTERVALOS:
+                cuerpo = json.dumps(self.modelo.predecir_intervalos(
+                    (year, month), n_months, opciones['n_muestras'], opciones['cuantiles'], tipos
+                ), default=float).encode()
+            elif op == OP_ESTADO:
+                cuerpo = json.dumps(self.estado()).encode()
+            else:
+                raise ValueError(f"Operación desconocida: {op}")
+            return bytes([ESTADO_OK]) + cuerpo
+        except ValueError as e:
+            return bytes([ESTADO_VALOR]) + str(e).encode()
+        except Exception as e:
+            traceback.print_exc()
+            with self._lock:
+                self._errores += 1
+            return bytes([ESTADO_ERROR]) + str(e).encode()
+
+    def estado(self):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'socket': self.ruta_socket,
+                'trained': bool(self.modelo.trained),
+                'version_modelo': self.modelo.version_modelo,
+                'solicitudes': self._solicitudes,
+                'errores': self._errores
+            }
+
+
+# ============================================
+# CLIENTE
+# ============================================
+
+class ClienteInferencia:
+    """
+    Cliente del servidor de inferencia con la interfaz de ModeloPrediccionIncidencias.
+
+    predecir_mes, predecir_trayectoria y predecir_intervalos van al servidor;
+    de `modelo_local` (cargado con carga_diferida=True para no cargar redes ni
+    TensorFlow) solo se leen los atributos de ATRIBUTOS_LOCALES: métricas,
+    series, versión, caché... Cualquier otro lanza AttributeError en lugar de
+    calcular en este proceso. Si el servidor no responde, las predicciones se
+    calculan con `modelo_local` y no se vuelve a intentar durante `reintento_s`
+    segundos.
+    """
+
+    ATRIBUTOS_LOCALES = frozenset({
+        'trained', 'version_modelo', 'arquitectura', 'motor_inferencia', 'carga_diferida',
+        'models_den', 'models_eme', 'den_monthly', 'eme_monthly', 'al_activar_version',
+        'obtener_metricas', 'estado_carga', 'verificar_version_disco', 'limpiar_cache',
+        'cache_predicciones', 'vuelo_unico', 'planificador', '_instantanea', '_get_cache_key'
+    })
+
+    def __init__(self, ruta_socket, modelo_local, timeout=TIMEOUT_S, reintento_s=REINTENTO_S,
+                 max_conexiones=MAX_CONEXIONES):
+        self.ruta_socket = ruta_socket
+        self.modelo_local = modelo_local
+        self.timeout = timeout
+        self.reintento_s = reintento_s
+        self.max_conexiones = max_conexiones
+        self._conexiones = []  # conexiones libres para reutilizar
+        self._lock = threading.Lock()
+        self._caido_hasta = 0.0
+        self._remotas = 0
+        self._respaldos = 0
+        self._fallas = 0
+        self._ultimo_error = None
+
+    def __getattr__(self, nombre):
+        # Solo se llama para atributos que el cliente no define
+        if nombre not in self.ATRIBUTOS_LOCALES:
+            raise AttributeError(f"ClienteInferencia no delega '{nombre}' al modelo local")
+        return getattr(self.modelo_local, nombre)
+
+    def predecir_mes(self, year, month, tipo=None, engine=None):
+        """Igual que ModeloPrediccionIncidencias.predecir_mes, calculado en el servidor"""
+        try:
+            return self._predicciones(codificar_solicitud(OP_MES, year, month, 1, engine))[0]
+        except ServicioNoDisponible:
+            self._contar_respaldo()
+            return self.modelo_local.predecir_mes(year, month, tipo, engine)
+
+    def predecir_trayectoria(self, start, n_months, tipos=None, engine=None):
+        """Igual que ModeloPrediccionIncidencias.predecir_trayectoria, calculado en el servidor"""
+        try:
+            return self._predicciones(codificar_solicitud(OP_TRAYECTORIA, start[0], start[1], n_months, engine, tipos))
+        except ServicioNoDisponible:
+            self._contar_respaldo()
+            return self.modelo_local.predecir_trayectoria(start, n_months, tipos, engine)
+
+    def predecir_intervalos(self, start, n_months, n_muestras=None, cuantiles=None, tipos=None):
+        """Igual que ModeloPrediccionIncidencias.predecir_intervalos, calculado en el servidor"""
+        from models.modelo_PREDICCION import CUANTILES_MC, N_MUESTRAS_MC
+
+        opciones = {'n_muestras': N_MUESTRAS_MC if n_muestras is None else n_muestras,
+                    'cuantiles': list(CUANTILES_MC if cuantiles is None else cuantiles)}
+        try:
+            return decodificar_intervalos(self._solicitar(
+                codificar_solicitud(OP_INTERVALOS, start[0], start[1], n_months, None, tipos, opciones)
+            ))
+        except ServicioNoDisponible:
+            self._contar_respaldo()
+            return self.modelo_local.predecir_intervalos(start, n_months, opciones['n_muestras'],
+                                                         opciones['cuantiles'], tipos)
+
+    def estado_servidor(self):
+        """Estado reportado por el servidor (None si no responde)"""
+        try:
+            return json.loads(self._solicitar(codificar_solicitud(OP_ESTADO)).decode())
+        except ServicioNoDisponible:
+            return None
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'socket': self.ruta_socket,
+                'disponible': time.time() >= self._caido_hasta,
+                'solicitudes_remotas': self._remotas,
+                'respaldos_locales': self._respaldos,
+                'fallas_conexion': self._fallas,
+                'conexiones_libres': len(self._conexiones),
+                'ultimo_error': self._ultimo_error
+            }
+
+    def cerrar(self):
+        with self._lock:
+            conexiones, self._conexiones = self._conexiones, []
+        for conexion in conexiones:
+            conexion.close()
+
+    def _contar_respaldo(self):
+        with self._lock:
+            self._respaldos += 1
+
+    def _predicciones(self, solicitud):
+        return decodificar_predicciones(self._solicitar(solicitud))
+
+    def _solicitar(self, solicitud):
+        """
+        Envía una solicitud y retorna el cuerpo de la respuesta.
+        Lanza ServicioNoDisponible si no hay servidor; ValueError/Exception si el servidor falló.
+        """
+        with self._lock:
+            if time.time() < self._caido_hasta:
+                raise ServicioNoDisponible(self._ultimo_error)
+
+        for intento in range(2):
+            conexion, reutilizada = self._tomar_conexion() if intento == 0 else (None, False)
+            try:
+                if conexion is None:
+                    conexion, reutilizada = self._conectar(), False
+                enviar_mensaje(conexion, solicitud)
+                respuesta = recibir_mensaje(conexion)
+                self._devolver_conexion(conexion)
+                break
+            except (OSError, ConnectionError) as e:
+                if conexion is not None:
+                    conexion.close()
+                # Una conexión reutilizada puede haber quedado muerta (servidor reiniciado): un reintento
+                if reutilizada and not isinstance(e, socket.timeout):
+                    continue
+                with self._lock:
+                    self._fallas += 1
+                    self._caido_hasta = time.time() + self.reintento_s
+                    self._ultimo_error = f"{type(e).__name__}: {e}"
+                print(f"⚠️  Servidor de inferencia no disponible ({self._ultimo_error}): se usa el modelo local")
+                raise ServicioNoDisponible(self._ultimo_error)
+
+        with self._lock:
+            self._remotas += 1
+
+        estado, cuerpo = respuesta[0], respuesta[1:]
+        if estado == ESTADO_VALOR:
+            raise ValueError(cuerpo.decode())
+        if estado != ESTADO_OK:
+            raise Exception(cuerpo.decode())
+        return cuerpo
+
+    def _conectar(self):
+        conexion = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conexion.settimeout(self.timeout)
+        try:
+            conexion.connect(self.ruta_socket)
+        except OSError:
+            conexion.close()
+            raise
+        return conexion
+
+    def _tomar_conexion(self):
+        with self._lock:
+            if self._conexiones:
+                return self._conexiones.pop(), True
+        return None, False
+
+    def _devolver_conexion(self, conexion):
+        with self._lock:
+            if len(self._conexiones) < self.max_conexiones:
+                self._conexiones.append(conexion)
+                return
+        conexion.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor de inferencia del modelo LSTM')
+    parser.add_argument('--socket', default=os.environ.get('SOCKET_INFERENCIA', '/tmp/inferencia_incidencias.sock'))
+    parser.add_argument('--sin-precalculo', action='store_true', help='No precalcular el horizonte de pronóstico')
+    args = parser.parse_args()
+
+    from models.modelo_PREDICCION import get_modelo
+    modelo = get_modelo()
+
+    # El servidor es quien calcula: aquí se llena el caché del horizonte
+    if not args.sin_precalculo and os.environ.get('PRECALCULAR_HORIZONTE', 'true').lower() == 'true':
+        from services.precalculo_service import servicio_precalculo
+        servicio_precalculo.registrar(modelo)
+
+    servidor = ServidorInferencia(modelo, args.socket)
+    try:
+        servidor.iniciar()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.detener()
+
+
+if __name__ == '__main__':
+    main()
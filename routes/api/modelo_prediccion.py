@@ -9,14 +9,54 @@ from datetime import datetime
 prediccion_bp = Blueprint('prediccion', __name__)
 
 
+def _engine_solicitado():
+    """Motor pedido en el body JSON o en la query (?engine=fast); None = automático"""
+    from models.modelo_PREDICCION import ENGINES_PREDICCION
+    
+    engine = (request.get_json(silent=True) or {}).get('engine') or request.args.get('engine')
+    if engine is not None and engine not in ENGINES_PREDICCION:
+        raise ValueError(f"engine debe ser uno de: {', '.join(ENGINES_PREDICCION)}")
+    return engine
+
+
+def _intervalos_solicitados():
+    """
+    Parámetros de los intervalos Monte Carlo pedidos en el body JSON
+    ("intervalos": true, "n_muestras", "cuantiles"); None = sin intervalos
+    """
+    from models.modelo_PREDICCION import N_MUESTRAS_MC, CUANTILES_MC
+    
+    datos = request.get_json(silent=True) or {}
+    if not datos.get('intervalos'):
+        return None
+    try:
+        n_muestras = int(datos.get('n_muestras', N_MUESTRAS_MC))
+        cuantiles = [float(q) for q in datos.get('cuantiles', CUANTILES_MC)]
+    except (ValueError, TypeError):
+        raise ValueError('n_muestras debe ser entero y cuantiles una lista de números')
+    return n_muestras, cuantiles
+
+
 @prediccion_bp.route('/health', methods=['GET'])
 def health_check():
     """Health check del servicio de predicción"""
+    from services.precalculo_service import servicio_precalculo
+    from models.servidor_inferencia import ClienteInferencia
+    
     modelo = current_app.modelo
+    if modelo is not None and modelo.trained:
+        modelo.verificar_version_disco()
     return jsonify({
         'status': 'ok',
         'service': 'Predicción de Incidencias',
-        'modelo_cargado': modelo is not None and modelo.trained if modelo else False
+        'modelo_cargado': modelo is not None and modelo.trained if modelo else False,
+        'version_modelo': modelo.version_modelo if modelo else None,
+        'carga_modelos': modelo.estado_carga() if modelo is not None and modelo.trained else None,
+        'cache': modelo.cache_predicciones.estadisticas() if modelo else None,
+        'calculos_compartidos': modelo.vuelo_unico.estadisticas() if modelo else None,
+        'microbatch': modelo.planificador.estadisticas() if modelo and modelo.planificador else None,
+        'precalculo': servicio_precalculo.estado(),
+        'servidor_inferencia': modelo.estadisticas() if isinstance(modelo, ClienteInferencia) else None
     }), 200
 
 
@@ -28,8 +68,17 @@ def predecir():
     Body JSON:
     {
         "year": 2027,
-        "month": 3
+        "month": 3,
+        "engine": "fast",    (opcional: "lstm" o "fast")
+        "intervalos": true,  (opcional: media y percentiles por Monte Carlo dropout)
+        "n_muestras": 30,    (opcional: se recorta a MAX_MUESTRAS_MC)
+        "cuantiles": [0.05, 0.5, 0.95]  (opcional)
     }
+    
+    Los intervalos siempre se calculan con las redes Keras, aunque el motor
+    configurado sea numpy o plano (el motor NumPy no cumple el presupuesto de
+    latencia); la respuesta informa "motor_intervalos", "n_muestras" usadas y
+    "n_muestras_solicitadas".
     """
     modelo = current_app.modelo
     
@@ -70,6 +119,9 @@ def predecir():
                 'error': 'year debe estar entre 2020 y 2050'
             }), 400
         
+        engine = _engine_solicitado()
+        intervalos = _intervalos_solicitados()
+        
         # Cargar modelo si no está cargado
         if modelo is None or not modelo.trained:
             from models.modelo_PREDICCION import get_modelo
@@ -84,13 +136,17 @@ def predecir():
         
         # Realizar predicción
         print(f"🔮 Prediciendo: {year}-{month:02d}")
-        prediccion = modelo.predecir_mes(year, month)
+        prediccion = modelo.predecir_mes(year, month, engine=engine)
         print(f"✅ Predicción completada para {year}-{month:02d}")
         
-        return jsonify({
+        respuesta = {
             'success': True,
             'data': prediccion
-        }), 200
+        }
+        if intervalos:
+            respuesta['intervalos'] = modelo.predecir_intervalos((year, month), 1, *intervalos)[0]
+        
+        return jsonify(respuesta), 200
         
     except ValueError as e:
         return jsonify({
@@ -114,7 +170,9 @@ def predecir_rango():
     {
         "year_inicio": 2027,
         "month_inicio": 1,
-        "meses": 3
+        "meses": 3,
+        "engine": "fast",    (opcional: "lstm" o "fast")
+        "intervalos": true   (opcional, ver /predecir)
     }
     """
     modelo = current_app.modelo
@@ -142,6 +200,9 @@ def predecir_rango():
                 'error': 'meses debe estar entre 1 y 24'
             }), 400
         
+        engine = _engine_solicitado()
+        intervalos = _intervalos_solicitados()
+        
         # Cargar modelo
         if modelo is None or not modelo.trained:
             from models.modelo_PREDICCION import get_modelo
@@ -154,25 +215,18 @@ def predecir_rango():
                     'error': 'Modelo no disponible'
                 }), 503
         
-        # Predecir cada mes
-        predicciones = []
-        current_year = year_inicio
-        current_month = month_inicio
+        # Toda la trayectoria en una sola pasada
+        predicciones = modelo.predecir_trayectoria((year_inicio, month_inicio), meses, engine=engine)
         
-        for _ in range(meses):
-            pred = modelo.predecir_mes(current_year, current_month)
-            predicciones.append(pred)
-            
-            current_month += 1
-            if current_month > 12:
-                current_month = 1
-                current_year += 1
-        
-        return jsonify({
+        respuesta = {
             'success': True,
             'data': predicciones,
             'total_meses': len(predicciones)
-        }), 200
+        }
+        if intervalos:
+            respuesta['intervalos'] = modelo.predecir_intervalos((year_inicio, month_inicio), meses, *intervalos)
+        
+        return jsonify(respuesta), 200
         
     except ValueError as e:
         return jsonify({
@@ -217,16 +271,174 @@ def obtener_metricas():
         }), 500
 
 
+@prediccion_bp.route('/metricas/backtest', methods=['GET'])
+def obtener_backtest():
+    """
+    Errores por horizonte del último backtesting walk-forward (?engine=lstm|fast).
+    Se genera con: python -m models.backtesting
+    """
+    modelo = current_app.modelo
+    
+    try:
+        engine = _engine_solicitado() or 'lstm'
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    try:
+        if modelo is None:
+            from models.modelo_PREDICCION import get_modelo
+            modelo = get_modelo()
+            current_app.modelo = modelo
+        
+        from models.backtesting import cargar_backtest
+        backtest = cargar_backtest(modelo, engine)
+        
+        if backtest is None:
+            return jsonify({
+                'success': False,
+                'error': f'No hay backtest para el engine {engine}. Ejecutar: python -m models.backtesting --engine {engine}'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'data': backtest
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Error interno: {str(e)}'
+        }), 500
+
+
+@prediccion_bp.route('/metricas/deriva', methods=['GET', 'POST'])
+def monitor_deriva():
+    """
+    Pronóstico frente a incidencias reales: error móvil e índice de deriva por tipo.
+    GET retorna el último informe; POST ingiere las filas nuevas de incidencia
+    y evalúa ahora (p. ej. desde un cron diario o mensual).
+    """
+    from services.deriva_service import servicio_deriva
+    
+    if request.method == 'GET':
+        return jsonify({
+            'success': True,
+            'data': servicio_deriva.estado()
+        }), 200
+    
+    modelo = current_app.modelo
+    
+    try:
+        if modelo is None or not modelo.trained:
+            return jsonify({
+                'success': False,
+                'error': 'Modelo no disponible'
+            }), 503
+        
+        return jsonify({
+            'success': True,
+            'data': servicio_deriva.ejecutar(modelo)
+        }), 200
+        
+    except ConnectionError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'error': f'Error interno: {str(e)}'
+        }), 500
+
+
 @prediccion_bp.route('/entrenar', methods=['POST'])
 def entrenar_modelo():
-    """Entrena el modelo con datos actualizados"""
+    """
+    Lanza el entrenamiento en segundo plano y retorna el id del trabajo (202).
+    El estado se consulta en GET /entrenar/<id_trabajo>.
+    
+    Body JSON (opcional):
+    {
+        "csv_path": "data_modelo/dataset.csv",
+        "n_procesos": 4,
+        "batch_size": 16,
+        "jit": false,
+        "incremental": false,
+        "busqueda": false,
+        "presupuesto_s": 3600,
+        "n_candidatos": 8
+    }
+    
+    Con "incremental": true se ajustan los modelos guardados solo con los meses
+    nuevos del dataset (ver reentrenar_incremental). Con "busqueda": true se elige
+    primero la configuración de la red de cada tipo, con un presupuesto de tiempo
+    (ver buscar_hiperparametros); un entrenamiento normal reutiliza la elegida.
+    """
     try:
         csv_path = 'data_modelo/dataset_incidencias_reque_2015_2024.csv'
+        n_procesos = current_app.config.get('PROCESOS_ENTRENAMIENTO', 1)
+        batch_size = current_app.config.get('BATCH_SIZE_ENTRENAMIENTO')
+        jit = current_app.config.get('JIT_ENTRENAMIENTO', False)
+        incremental = False
+        busqueda = None
 
         if request.is_json:
             data = request.get_json(silent=True) or {}
             if 'csv_path' in data:
                 csv_path = data['csv_path']
+            incremental = bool(data.get('incremental', False))
+            jit = bool(data.get('jit', jit))
+            if data.get('busqueda'):
+                from models.busqueda_hiperparametros import N_CANDIDATOS, PRESUPUESTO_S
+                try:
+                    busqueda = {
+                        'presupuesto_s': float(data.get('presupuesto_s', PRESUPUESTO_S)),
+                        'n_candidatos': int(data.get('n_candidatos', N_CANDIDATOS))
+                    }
+                except (ValueError, TypeError):
+                    return jsonify({
+                        'success': False,
+                        'error': 'presupuesto_s y n_candidatos deben ser numéricos'
+                    }), 400
+            for campo in ('n_procesos', 'batch_size'):
+                if campo in data:
+                    try:
+                        valor = int(data[campo])
+                    except (ValueError, TypeError):
+                        return jsonify({
+                            'success': False,
+                            'error': f'{campo} debe ser un número entero'
+                        }), 400
+                    if campo == 'n_procesos':
+                        n_procesos = valor
+                    else:
+                        batch_size = valor
+        
+        if n_procesos < 1:
+            return jsonify({
+                'success': False,
+                'error': 'n_procesos debe ser al menos 1'
+            }), 400
+        
+        if batch_size is not None and batch_size < 1:
+            return jsonify({
+                'success': False,
+                'error': 'batch_size debe ser al menos 1'
+            }), 400
+        
+        if busqueda is not None:
+            if incremental or current_app.config.get('ARQUITECTURA_MODELO', 'por_tipo') != 'por_tipo':
+                return jsonify({
+                    'success': False,
+                    'error': 'La búsqueda de hiperparámetros requiere un entrenamiento completo por_tipo'
+                }), 400
+            if busqueda['presupuesto_s'] <= 0 or busqueda['n_candidatos'] < 1:
+                return jsonify({
+                    'success': False,
+                    'error': 'presupuesto_s debe ser positivo y n_candidatos al menos 1'
+                }), 400
         
         import os
         if not os.path.exists(csv_path):
@@ -235,20 +447,44 @@ def entrenar_modelo():
                 'error': f'Archivo no encontrado: {csv_path}'
             }), 404
         
-        # Crear y entrenar modelo
-        from models.modelo_PREDICCION import ModeloPrediccionIncidencias
-        modelo = ModeloPrediccionIncidencias()
-        modelo.entrenar_modelos(csv_path)
+        from services.entrenamiento_service import servicio_entrenamiento, EntrenamientoEnCurso
+        
+        app = current_app._get_current_object()
         
-        # Actualizar modelo global
-        current_app.modelo = modelo
+        def al_completar(modelo_entrenado):
+            # Los demás procesos detectan la versión nueva en disco; aquí se recarga ya
+            modelo = getattr(app, 'modelo', None)
+            if modelo is not None and modelo.trained:
+                modelo.verificar_version_disco(forzar=True, esperar=True)
+            else:
+                app.modelo = modelo_entrenado
+                from services.info_modelo_service import servicio_info_modelo
+                servicio_info_modelo.registrar(modelo_entrenado)
+                if app.config.get('PRECALCULAR_HORIZONTE'):
+                    from services.precalculo_service import servicio_precalculo
+                    servicio_precalculo.registrar(modelo_entrenado)
+        
+        try:
+            trabajo = servicio_entrenamiento.iniciar(
+                csv_path, n_procesos=n_procesos, al_completar=al_completar, incremental=incremental,
+                batch_size=batch_size, jit=jit,
+                arquitectura=current_app.config.get('ARQUITECTURA_MODELO', 'por_tipo'),
+                busqueda=busqueda
+            )
+        except EntrenamientoEnCurso as e:
+            return jsonify({
+                'success': False,
+                'error': str(e),
+                'id_trabajo': e.id_trabajo
+            }), 409
         
         return jsonify({
             'success': True,
-            'message': '✅ Modelo entrenado exitosamente',
-            'tipos_denuncias': len(modelo.models_den),
-            'tipos_emergencias': len(modelo.models_eme)
-        }), 200
+            'message': 'Entrenamiento iniciado',
+            'id_trabajo': trabajo['id_trabajo'],
+            'estado_url': f"{request.path}/{trabajo['id_trabajo']}",
+            'data': trabajo
+        }), 202
     
     except Exception as e:
         traceback.print_exc()
@@ -258,6 +494,31 @@ def entrenar_modelo():
         }), 500
 
 
+@prediccion_bp.route('/entrenar/<id_trabajo>', methods=['GET'])
+def estado_entrenamiento(id_trabajo):
+    """Progreso por tipo, ETA, métricas y logs de un trabajo de entrenamiento"""
+    try:
+        from services.entrenamiento_service import servicio_entrenamiento
+        
+        trabajo = servicio_entrenamiento.obtener(id_trabajo)
+        if trabajo is None:
+            return jsonify({
+                'success': False,
+                'error': f'Trabajo no encontrado: {id_trabajo}'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'data': trabajo
+        }), 200
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @prediccion_bp.route('/limpiar_cache', methods=['POST'])
 def limpiar_cache():
     """Limpia el caché de predicciones"""
@@ -287,7 +548,12 @@ def limpiar_cache():
 def info_modelo():
     """
     Información detallada sobre el modelo, métricas de precisión y estadísticas
+    
+    Se calcula una vez por versión del modelo y se sirve desde memoria con ETag:
+    con If-None-Match igual al ETag actual se responde 304 sin cuerpo.
     """
+    from services.info_modelo_service import servicio_info_modelo
+    
     modelo = current_app.modelo
     
     try:
@@ -297,252 +563,22 @@ def info_modelo():
                 'error': 'Modelo no disponible'
             }), 503
         
-        # Calcular métricas agregadas de denuncias
-        metricas_den = modelo.obtener_metricas()['denuncias']
-        mae_den_values = [m['mae'] for m in metricas_den.values()]
-        rmse_den_values = [m['rmse'] for m in metricas_den.values()]
-        
-        # Calcular métricas agregadas de emergencias
-        metricas_eme = modelo.obtener_metricas()['emergencias']
-        mae_eme_values = [m['mae'] for m in metricas_eme.values()]
-        rmse_eme_values = [m['rmse'] for m in metricas_eme.values()]
-        
-        # Estadísticas de datos históricos - Denuncias
-        den_stats = modelo.den_monthly.groupby('id_denuncia')['count'].agg([
-            ('promedio', 'mean'),
-            ('maximo', 'max'),
-            ('minimo', 'min'),
-            ('desviacion', 'std'),
-            ('total_registros', 'count')
-        ]).round(2)
-        
-        # Estadísticas de datos históricos - Emergencias
-        eme_stats = modelo.eme_monthly.groupby('id_numero_emergencia')['count'].agg([
-            ('promedio', 'mean'),
-            ('maximo', 'max'),
-            ('minimo', 'min'),
-            ('desviacion', 'std'),
-            ('total_registros', 'count')
-        ]).round(2)
-        
-        # Calcular precisión relativa (MAE / promedio histórico)
-        precision_denuncias = {}
-        for tipo_id in metricas_den.keys():
-            mae = metricas_den[tipo_id]['mae']
-            promedio = den_stats.loc[tipo_id, 'promedio']
-            error_relativo = (mae / promedio * 100) if promedio > 0 else 0
-            precision_denuncias[int(tipo_id)] = {
-                'mae': round(mae, 2),
-                'rmse': round(metricas_den[tipo_id]['rmse'], 2),
-                'promedio_historico': round(promedio, 2),
-                'error_relativo_porcentaje': round(error_relativo, 2),
-                'precision_porcentaje': round(max(0, 100 - error_relativo), 2),
-                'interpretacion': _interpretar_precision(error_relativo)
-            }
-        
-        precision_emergencias = {}
-        for tipo_id in metricas_eme.keys():
-            mae = metricas_eme[tipo_id]['mae']
-            promedio = eme_stats.loc[tipo_id, 'promedio']
-            error_relativo = (mae / promedio * 100) if promedio > 0 else 0
-            precision_emergencias[int(tipo_id)] = {
-                'mae': round(mae, 2),
-                'rmse': round(metricas_eme[tipo_id]['rmse'], 2),
-                'promedio_historico': round(promedio, 2),
-                'error_relativo_porcentaje': round(error_relativo, 2),
-                'precision_porcentaje': round(max(0, 100 - error_relativo), 2),
-                'interpretacion': _interpretar_precision(error_relativo)
-            }
-        
-        # Forzar a int() para evitar "Unknown format code 'd'"
-        ultimo_mes_den = f"{int(modelo.den_monthly['year'].max())}-{int(modelo.den_monthly['month'].max()):02d}"
-        periodo_datos_den = f"{int(modelo.den_monthly['year'].min())}-{int(modelo.den_monthly['month'].min()):02d} a {int(modelo.den_monthly['year'].max())}-{int(modelo.den_monthly['month'].max()):02d}"
-
-        ultimo_mes_eme = f"{int(modelo.eme_monthly['year'].max())}-{int(modelo.eme_monthly['month'].max()):02d}"
-        periodo_datos_eme = f"{int(modelo.eme_monthly['year'].min())}-{int(modelo.eme_monthly['month'].min()):02d} a {int(modelo.eme_monthly['year'].max())}-{int(modelo.eme_monthly['month'].max()):02d}"
-
-        # Resumen general
-        info = {
-            'modelo': {
-                'arquitectura': 'Bidirectional LSTM (64-32-16-1)',
-                'lookback_meses': 6,
-                'features_temporales': ['mensual', 'trimestral', 'tendencia'],
-                'regularizacion': 'L2 + Dropout (20-30%)',
-                'funcion_perdida': 'Huber Loss',
-                'optimizador': 'Adam (lr=0.001)',
-                'seed_reproducibilidad': 42
-            },
-            
-            'datos': {
-                'denuncias': {
-                    'tipos_unicos': len(modelo.models_den),
-                    'ultimo_mes': ultimo_mes_den,
-                    'periodo_datos': periodo_datos_den,
-                    'total_meses_historicos': len(modelo.den_monthly['month'].unique()) * len(modelo.den_monthly['year'].unique())
-                },
-                'emergencias': {
-                    'tipos_unicos': len(modelo.models_eme),
-                    'ultimo_mes': ultimo_mes_eme,
-                    'periodo_datos': periodo_datos_eme,
-                    'total_meses_historicos': len(modelo.eme_monthly['month'].unique()) * len(modelo.eme_monthly['year'].unique())
-                }
-            },
-            
-            'metricas_agregadas': {
-                'denuncias': {
-                    'mae_promedio': round(sum(mae_den_values) / len(mae_den_values), 2),
-                    'mae_minimo': round(min(mae_den_values), 2),
-                    'mae_maximo': round(max(mae_den_values), 2),
-                    'rmse_promedio': round(sum(rmse_den_values) / len(rmse_den_values), 2),
-                    'rmse_minimo': round(min(rmse_den_values), 2),
-                    'rmse_maximo': round(max(rmse_den_values), 2),
-                    'interpretacion': _interpretar_mae_global(sum(mae_den_values) / len(mae_den_values))
-                },
-                'emergencias': {
-                    'mae_promedio': round(sum(mae_eme_values) / len(mae_eme_values), 2),
-                    'mae_minimo': round(min(mae_eme_values), 2),
-                    'mae_maximo': round(max(mae_eme_values), 2),
-                    'rmse_promedio': round(sum(rmse_eme_values) / len(rmse_eme_values), 2),
-                    'rmse_minimo': round(min(rmse_eme_values), 2),
-                    'rmse_maximo': round(max(rmse_eme_values), 2),
-                    'interpretacion': _interpretar_mae_global(sum(mae_eme_values) / len(mae_eme_values))
-                }
-            },
-            
-            'precision_por_tipo': {
-                'denuncias': precision_denuncias,
-                'emergencias': precision_emergencias
-            },
-            
-            'estadisticas_historicas': {
-                'denuncias': {int(k): v for k, v in den_stats.to_dict('index').items()},
-                'emergencias': {int(k): v for k, v in eme_stats.to_dict('index').items()}
-            },
-            
-            'calidad_global': {
-                'denuncias': _evaluar_calidad_global(
-                    sum(mae_den_values) / len(mae_den_values),
-                    sum([p['error_relativo_porcentaje'] for p in precision_denuncias.values()]) / len(precision_denuncias)
-                ),
-                'emergencias': _evaluar_calidad_global(
-                    sum(mae_eme_values) / len(mae_eme_values),
-                    sum([p['error_relativo_porcentaje'] for p in precision_emergencias.values()]) / len(precision_emergencias)
-                )
-            },
-            
-            'recomendaciones': _generar_recomendaciones(
-                sum(mae_den_values) / len(mae_den_values),
-                sum(mae_eme_values) / len(mae_eme_values),
-                len(modelo.den_monthly),
-                len(modelo.eme_monthly)
-            )
-        }
+        resumen = servicio_info_modelo.obtener(modelo)
         
-        return jsonify({
-            'success': True,
-            'data': info
-        }), 200
+        if request.if_none_match.contains(resumen['etag']):
+            respuesta = current_app.response_class(status=304)
+        else:
+            respuesta = jsonify({
+                'success': True,
+                'data': resumen['data']
+            })
+        
+        respuesta.set_etag(resumen['etag'])
+        respuesta.headers['Cache-Control'] = 'no-cache'  # el navegador revalida con el ETag
+        return respuesta
         
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
-
-
-def _interpretar_precision(error_relativo):
-    """Interpreta el error relativo"""
-    if error_relativo < 10:
-        return 'Excelente - Error muy bajo'
-    elif error_relativo < 20:
-        return 'Buena - Error aceptable'
-    elif error_relativo < 35:
-        return 'Moderada - Error considerable'
-    elif error_relativo < 50:
-        return 'Regular - Error alto'
-    else:
-        return 'Baja - Error muy alto'
-
-
-def _interpretar_mae_global(mae):
-    """Interpreta el MAE global"""
-    if mae < 2:
-        return 'Excelente - Predicciones muy precisas'
-    elif mae < 4:
-        return 'Buena - Predicciones confiables'
-    elif mae < 6:
-        return 'Moderada - Predicciones aceptables'
-    else:
-        return 'Regular - Considerar mejorar el modelo'
-
-
-def _evaluar_calidad_global(mae_promedio, error_relativo_promedio):
-    """Evalúa la calidad global del modelo"""
-    score = 100 - (error_relativo_promedio * 1.5)  # Solo usar % de error
-    score = max(0, min(100, score))
-    
-    if score >= 85:
-        nivel = 'Excelente'
-        color = 'verde'
-        confianza = 'Alta'
-    elif score >= 70:
-        nivel = 'Buena'
-        color = 'verde-claro'
-        confianza = 'Moderada-Alta'
-    elif score >= 55:
-        nivel = 'Aceptable'
-        color = 'amarillo'
-        confianza = 'Moderada'
-    else:
-        nivel = 'Mejorable'
-        color = 'naranja'
-        confianza = 'Baja-Moderada'
-    
-    return {
-        'score': round(score, 2),
-        'nivel': nivel,
-        'color': color,
-        'confianza': confianza,
-        'descripcion': f'El modelo tiene una calidad {nivel.lower()} con un score de {round(score, 2)}/100'
-    }
-
-
-def _generar_recomendaciones(mae_den, mae_eme, n_datos_den, n_datos_eme):
-    """Genera recomendaciones basadas en las métricas"""
-    recomendaciones = []
-    
-    if mae_den > 5 or mae_eme > 5:
-        recomendaciones.append({
-            'tipo': 'warning',
-            'mensaje': 'MAE alto detectado. Considera reentrenar con más datos históricos.',
-            'accion': 'Agregar más meses de datos históricos al dataset'
-        })
-    
-    if n_datos_den < 500:
-        recomendaciones.append({
-            'tipo': 'info',
-            'mensaje': 'Dataset de denuncias relativamente pequeño.',
-            'accion': 'Incrementar el período de datos históricos para mejorar precisión'
-        })
-    
-    if n_datos_eme < 500:
-        recomendaciones.append({
-            'tipo': 'info',
-            'mensaje': 'Dataset de emergencias relativamente pequeño.',
-            'accion': 'Incrementar el período de datos históricos para mejorar precisión'
-        })
-    
-    if mae_den < 3 and mae_eme < 3:
-        recomendaciones.append({
-            'tipo': 'success',
-            'mensaje': '¡Modelo con excelente desempeño!',
-            'accion': 'Las predicciones son confiables para toma de decisiones'
-        })
-    
-    recomendaciones.append({
-        'tipo': 'tip',
-        'mensaje': 'Validación continua recomendada',
-        'accion': 'Comparar predicciones con datos reales mensualmente y reentrenar si es necesario'
-    })
-    
-    return recomendaciones
@@ -9,6 +9,16 @@ import traceback
 espacial_bp = Blueprint('prediccion_espacial', __name__)
 
 
+def _distribuir_sectores(modelo, prediccion_global, year, month, incluir_detalles=True):
+    """Distribución por sectores: la precalculada para la versión activa, o se calcula ahora"""
+    from services.precalculo_service import servicio_precalculo
+    
+    precalculada = servicio_precalculo.sectores(modelo.version_modelo, year, month, incluir_detalles)
+    if precalculada is not None:
+        return precalculada
+    return modelo_espacial.predecir_sectores(prediccion_global, incluir_detalles=incluir_detalles)
+
+
 @espacial_bp.route('/info', methods=['GET'])
 def info_modelo_espacial():
     try:
@@ -96,12 +106,15 @@ def predecir_espacial(year, month):
         # Recalcular densidad si se solicita
         if recalcular_densidad or not modelo_espacial.densidad_historica:
             modelo_espacial.calcular_densidad_historica()
+            if recalcular_densidad:
+                from services.precalculo_service import servicio_precalculo
+                servicio_precalculo.invalidar_sectores()
             
         pred_global_desglose = prediccion_global.get('prediccion_por_tipo', prediccion_global)
         
         # Distribuir por sectores
-        prediccion_sectores = modelo_espacial.predecir_sectores(
-                    pred_global_desglose, 
+        prediccion_sectores = _distribuir_sectores(
+                    modelo, pred_global_desglose, year, month,
                     incluir_detalles=incluir_detalles
                 )        
         
@@ -160,7 +173,7 @@ def obtener_sectores_criticos(year, month):
                 return jsonify({'success': False, 'error': 'Modelo no disponible'}), 503
         
         prediccion_global = modelo.predecir_mes(year, month)
-        prediccion_sectores = modelo_espacial.predecir_sectores(prediccion_global)
+        prediccion_sectores = _distribuir_sectores(modelo, prediccion_global, year, month)
         
         niveles_prioridad = {'muy_alto': 5, 'alto': 4, 'medio': 3, 'bajo': 2, 'muy_bajo': 1}
         prioridad_minima = niveles_prioridad.get(nivel_minimo, 3)
@@ -204,7 +217,7 @@ def comparar_sectores():
                 return jsonify({'success': False, 'error': 'Modelo no disponible'}), 503
         
         prediccion_global = modelo.predecir_mes(year, month)
-        prediccion_sectores = modelo_espacial.predecir_sectores(prediccion_global)
+        prediccion_sectores = _distribuir_sectores(modelo, prediccion_global, year, month)
         
         sectores_comparar = [s for s in prediccion_sectores if s['id_sector'] in sectores_ids]
         
@@ -267,9 +280,13 @@ def predecir_rango_espacial():
         # Predecir
         series_por_sector = {}
         
-        for mes_data in meses:
-            prediccion_global = modelo.predecir_mes(mes_data['year'], mes_data['month'])
-            prediccion_sectores = modelo_espacial.predecir_sectores(prediccion_global, incluir_detalles=False)
+        # Toda la trayectoria en una sola pasada
+        trayectoria = modelo.predecir_trayectoria((year_inicio, month_inicio), len(meses)) if meses else []
+        
+        for mes_data, prediccion_global in zip(meses, trayectoria):
+            prediccion_sectores = _distribuir_sectores(
+                modelo, prediccion_global, mes_data['year'], mes_data['month'], incluir_detalles=False
+            )
             
             for sector in prediccion_sectores:
                 id_sector = sector['id_sector']
@@ -0,0 +1,169 @@
+"""
+scripts/benchmark_arquitecturas.py
+Red por tipo (18 redes) frente a red global (una sola red) en:
+  - precisión: MAE/RMSE de validación promedio (metadata.pkl)
+  - tiempo de entrenamiento (segundos_entrenamiento de las métricas)
+  - tiempo de carga y memoria (RSS) del proceso tras cargar
+  - latencia de un paso del pronóstico y de una trayectoria de 24 meses sin caché
+
+Cada arquitectura se mide en un proceso aparte para que el RSS no se mezcle.
+
+Ejecutar desde la raíz del proyecto:
+  python scripts/benchmark_arquitecturas.py                      # artefactos actuales
+  python scripts/benchmark_arquitecturas.py --entrenar datos.csv  # entrena ambas en un directorio temporal
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from models import modelo_PREDICCION
+from models.modelo_PREDICCION import ModeloPrediccionIncidencias, ARQUITECTURAS, MOTORES_INFERENCIA
+
+
+def rss_mb():
+    """Memoria residente actual del proceso en MB"""
+    try:
+        with open('/proc/self/status') as f:
+            for linea in f:
+                if linea.startswith('VmRSS:'):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def configurar_directorios(directorio):
+    """Artefactos y caché bajo `directorio` (None = los del proyecto con caché temporal)"""
+    if directorio:
+        modelo_PREDICCION.MODEL_DIR = os.path.join(directorio, 'modelos_entrenados')
+        modelo_PREDICCION.DATA_DIR = os.path.join(directorio, 'datos_procesados')
+    modelo_PREDICCION.CACHE_DIR = tempfile.mkdtemp(prefix='cache_benchmark_')
+
+
+def medir(arquitectura, motor, repeticiones):
+    """Mide una arquitectura en este proceso y retorna un dict"""
+    rss_inicial = rss_mb()
+    inicio = time.perf_counter()
+    modelo = ModeloPrediccionIncidencias(motor_inferencia=motor, fusionado=True, arquitectura=arquitectura)
+    modelo.cargar_modelos()
+    t_carga = time.perf_counter() - inicio
+    rss_cargado = rss_mb()
+
+    metricas = modelo.obtener_metricas()
+    todas = list(metricas['denuncias'].values()) + list(metricas['emergencias'].values())
+    segundos = [m.get('segundos_entrenamiento') for m in todas]
+
+    # Un paso del pronóstico con todos los tipos, por tipo y fusionado
+    latencias = {}
+    for nombre, model_dict in (('denuncias', modelo.models_den), ('emergencias', modelo.models_eme)):
+        ventanas = {t: info['estado']['ventana'].astype(np.float32) for t, info in model_dict.items()}
+        for clave, fusionado in (('paso_por_tipo_ms', None),
+                                 ('paso_fusionado_ms', modelo.predictores_fusionados.get(nombre))):
+            if clave == 'paso_fusionado_ms' and fusionado is None:
+                continue
+            modelo._predecir_paso(model_dict, ventanas, fusionado)  # calentamiento
+            t0 = time.perf_counter()
+            for _ in range(repeticiones):
+                modelo._predecir_paso(model_dict, ventanas, fusionado)
+            latencias[clave] = latencias.get(clave, 0.0) + (time.perf_counter() - t0) / repeticiones * 1000
+
+    # Trayectoria de 24 meses sin caché
+    ultimo = modelo.den_monthly[['year', 'month']].max()
+    inicio_tray = (int(ultimo['year']) + 1, 1)
+    modelo.limpiar_cache()
+    t0 = time.perf_counter()
+    modelo.predecir_trayectoria(inicio_tray, 24)
+    t_trayectoria = (time.perf_counter() - t0) * 1000
+
+    return {
+        'arquitectura': arquitectura,
+        'tipos': len(todas),
+        'mae': float(np.mean([m['mae'] for m in todas])),
+        'rmse': float(np.mean([m['rmse'] for m in todas])),
+        'entrenamiento_s': float(sum(segundos)) if all(s is not None for s in segundos) else None,
+        'carga_s': t_carga,
+        'rss_mb': rss_cargado,
+        'rss_modelos_mb': rss_cargado - rss_inicial,
+        'trayectoria_24_ms': t_trayectoria,
+        **latencias
+    }
+
+
+def entrenar(csv_path, directorio, epochs):
+    """Entrena ambas arquitecturas con el mismo dataset en `directorio`"""
+    configurar_directorios(directorio)
+    for arquitectura in ARQUITECTURAS:
+        ModeloPrediccionIncidencias(arquitectura=arquitectura).entrenar_modelos(csv_path, epochs=epochs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de arquitecturas del modelo LSTM')
+    parser.add_argument('--entrenar', metavar='CSV', help='Entrenar ambas arquitecturas antes de medir')
+    parser.add_argument('--epochs', type=int, default=300)
+    parser.add_argument('--directorio', help='Directorio de artefactos (default: el del proyecto, o uno temporal con --entrenar)')
+    parser.add_argument('--motor', choices=MOTORES_INFERENCIA, default='numpy')
+    parser.add_argument('--repeticiones', type=int, default=50)
+    parser.add_argument('--medir', choices=ARQUITECTURAS, help=argparse.SUPPRESS)  # proceso hijo
+    args = parser.parse_args()
+
+    if args.medir:
+        configurar_directorios(args.directorio)
+        print(json.dumps(medir(args.medir, args.motor, args.repeticiones)))
+        return
+
+    directorio = args.directorio
+    if args.entrenar:
+        directorio = directorio or tempfile.mkdtemp(prefix='benchmark_arquitecturas_')
+        entrenar(args.entrenar, directorio, args.epochs)
+
+    resultados = []
+    for arquitectura in ARQUITECTURAS:
+        comando = [sys.executable, os.path.abspath(__file__), '--medir', arquitectura,
+                   '--motor', args.motor, '--repeticiones', str(args.repeticiones)]
+        if directorio:
+            comando += ['--directorio', directorio]
+        salida = subprocess.run(comando, cwd=RAIZ, capture_output=True, text=True)
+        if salida.returncode != 0:
+            print(f"⚠️  {arquitectura}: no se pudo medir ({salida.stderr.strip().splitlines()[-1:]})")
+            continue
+        resultados.append(json.loads(salida.stdout.strip().splitlines()[-1]))
+
+    filas = [
+        ('Tipos', 'tipos', '{:.0f}'),
+        ('MAE promedio', 'mae', '{:.2f}'),
+        ('RMSE promedio', 'rmse', '{:.2f}'),
+        ('Entrenamiento (s)', 'entrenamiento_s', '{:.1f}'),
+        ('Carga (s)', 'carga_s', '{:.2f}'),
+        ('RSS tras cargar (MB)', 'rss_mb', '{:.0f}'),
+        ('RSS de los modelos (MB)', 'rss_modelos_mb', '{:.0f}'),
+        ('Paso por tipo (ms)', 'paso_por_tipo_ms', '{:.2f}'),
+        ('Paso fusionado (ms)', 'paso_fusionado_ms', '{:.2f}'),
+        ('Trayectoria 24 meses (ms)', 'trayectoria_24_ms', '{:.1f}'),
+    ]
+
+    print("\n" + "=" * 62)
+    print(f"{'Motor: ' + args.motor:<30}" + ''.join(f"{r['arquitectura']:>16}" for r in resultados))
+    print("=" * 62)
+    for nombre, clave, formato in filas:
+        valores = [r.get(clave) for r in resultados]
+        print(f"{nombre:<30}" + ''.join(
+            f"{formato.format(v) if v is not None else 'n/d':>16}" for v in valores
+        ))
+    print("=" * 62)
+    if directorio:
+        print(f"Artefactos: {directorio}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+scripts/benchmark_dataset.py
+Tiempo de make_lstm_dataset frente a la construcción anterior fila por fila
+
+Usa la serie mensual de cada tipo de denuncia en datos_procesados/ repetida
+1x, 10x y 100x, y verifica que X, y y los scalers sean idénticos.
+
+Ejecutar desde la raíz del proyecto: python scripts/benchmark_dataset.py [lookback]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import RobustScaler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.modelo_PREDICCION import ModeloPrediccionIncidencias, FEATURES, DATA_DIR
+
+
+def dataset_fila_por_fila(df_in, lookback=6):
+    """Implementación anterior de make_lstm_dataset (referencia)"""
+    df = df_in[FEATURES].copy()
+    scalers = {c: RobustScaler() for c in FEATURES}
+    for c in FEATURES:
+        df[c] = scalers[c].fit_transform(df[[c]])
+
+    X, y = [], []
+    for i in range(lookback, len(df)):
+        X.append(df.iloc[i-lookback:i].values)
+        y.append(df.iloc[i]['count'])
+
+    return np.array(X), np.array(y), scalers
+
+
+def medir(funcion, repeticiones):
+    """Tiempo medio en milisegundos"""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        resultado = funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1000, resultado
+
+
+def main():
+    lookback = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+
+    modelo = ModeloPrediccionIncidencias()
+    den_monthly = pd.read_pickle(os.path.join(DATA_DIR, 'den_monthly.pkl'))
+    tipos = sorted(den_monthly['id_denuncia'].dropna().unique())
+
+    print("\n" + "=" * 66)
+    print(f"{'Longitud':<12}{'Filas/tipo':>12}{'fila a fila':>16}{'vectorizado':>14}{'speedup':>12}")
+    print("=" * 66)
+
+    for factor in (1, 10, 100):
+        t_anterior = t_nuevo = 0.0
+        filas = 0
+        repeticiones = 3 if factor < 100 else 1
+
+        for tipo_id in tipos:
+            serie = den_monthly[den_monthly['id_denuncia'] == tipo_id]
+            serie = pd.concat([serie] * factor, ignore_index=True)
+            filas = len(serie)
+
+            t, referencia = medir(lambda: dataset_fila_por_fila(serie, lookback), repeticiones)
+            t_anterior += t
+            t, nuevo = medir(lambda: modelo.make_lstm_dataset(serie, lookback), repeticiones)
+            t_nuevo += t
+
+            assert np.array_equal(referencia[0], nuevo[0]) and np.array_equal(referencia[1], nuevo[1])
+            for c in FEATURES:
+                assert np.array_equal(referencia[2][c].center_, nuevo[2][c].center_)
+                assert np.array_equal(referencia[2][c].scale_, nuevo[2][c].scale_)
+
+        print(f"{str(factor) + 'x':<12}{filas:>12}{t_anterior:>13.1f} ms{t_nuevo:>11.1f} ms"
+              f"{t_anterior / t_nuevo:>11.1f}x")
+
+    print("=" * 66)
+    print(f"✅ Resultados idénticos ({len(tipos)} tipos, lookback={lookback})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+scripts/benchmark_inferencia.py
+Latencia por paso de pronóstico sobre los artefactos de modelos_entrenados/
+
+Compara:
+  - model.predict (camino anterior del bucle recursivo)
+  - predictor compilado con firma fija (motor keras)
+  - motor NumPy
+  - inferencia fusionada (todos los tipos de una familia en una invocación)
+
+Ejecutar desde la raíz del proyecto: python scripts/benchmark_inferencia.py [repeticiones]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.modelo_PREDICCION import ModeloPrediccionIncidencias
+
+
+def medir(funcion, X, repeticiones):
+    """Latencia media en milisegundos"""
+    funcion(X)  # calentamiento
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion(X)
+    return (time.perf_counter() - inicio) / repeticiones * 1000
+
+
+def main():
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+    modelo_keras = ModeloPrediccionIncidencias(motor_inferencia='keras', fusionado=True)
+    modelo_keras.cargar_modelos()
+    modelo_numpy = ModeloPrediccionIncidencias(motor_inferencia='numpy', fusionado=True)
+    modelo_numpy.cargar_modelos()
+
+    print("\n" + "=" * 78)
+    print(f"{'Modelo':<14}{'model.predict':>18}{'compilado':>16}{'numpy':>14}{'speedup':>14}")
+    print("=" * 78)
+
+    totales = np.zeros(3)
+
+    for prefijo, dict_keras, dict_numpy in (
+        ('den', modelo_keras.models_den, modelo_numpy.models_den),
+        ('eme', modelo_keras.models_eme, modelo_numpy.models_eme)
+    ):
+        for tipo_id in sorted(dict_keras):
+            info = dict_keras[tipo_id]
+            X = np.random.default_rng(0).normal(
+                size=(1, info['lookback'], len(info['scalers']))
+            ).astype(np.float32)
+
+            t_predict = medir(lambda x: info['model'].predict(x, verbose=0), X, repeticiones)
+            t_compilado = medir(info['predictor'], X, repeticiones)
+            t_numpy = medir(dict_numpy[tipo_id]['predictor'], X, repeticiones)
+            totales += (t_predict, t_compilado, t_numpy)
+
+            print(f"{prefijo}_tipo_{int(tipo_id):<5}{t_predict:>15.3f} ms{t_compilado:>13.3f} ms"
+                  f"{t_numpy:>11.3f} ms{t_predict / t_compilado:>13.1f}x")
+
+    print("-" * 78)
+    print(f"{'Total/paso':<14}{totales[0]:>15.3f} ms{totales[1]:>13.3f} ms"
+          f"{totales[2]:>11.3f} ms{totales[0] / totales[1]:>13.1f}x")
+    print("\n(Total/paso = un mes de pronóstico para los 18 tipos)")
+
+    print("\n" + "=" * 78)
+    print(f"{'Fusionado':<14}{'keras':>18}{'numpy':>16}")
+    print("=" * 78)
+
+    fusion_total = np.zeros(2)
+    for familia in ('denuncias', 'emergencias'):
+        tiempos = []
+        for modelo in (modelo_keras, modelo_numpy):
+            fusionado = modelo.predictores_fusionados[familia]
+            X = np.random.default_rng(0).normal(
+                size=(len(fusionado.tipos), 1, fusionado.lookback, fusionado.n_features)
+            ).astype(np.float32)
+            tiempos.append(medir(fusionado, X, repeticiones))
+        fusion_total += tiempos
+        print(f"{familia:<14}{tiempos[0]:>15.3f} ms{tiempos[1]:>13.3f} ms")
+
+    print("-" * 78)
+    print(f"{'Total/paso':<14}{fusion_total[0]:>15.3f} ms{fusion_total[1]:>13.3f} ms\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+scripts/benchmark_intervalos.py
+Latencia de los intervalos Monte Carlo dropout frente al pronóstico puntual
+
+Con cada motor configurado (keras, numpy, plano; inferencia por tipo) mide con
+caché frío:
+  - predecir_trayectoria: pronóstico puntual del horizonte con ese motor
+  - predecir_intervalos: N pasadas con dropout activo por tipo y mes, que
+    siempre corren sobre las redes Keras (MOTOR_INTERVALOS)
+y compara los intervalos con PRESUPUESTO_INTERVALOS_MC veces el puntual de
+keras. Los pedidos de más de MAX_MUESTRAS_MC muestras se recortan.
+
+El caché de predicciones se redirige a un directorio temporal.
+
+Ejecutar desde la raíz del proyecto:
+    python scripts/benchmark_intervalos.py [repeticiones] [meses]
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import modelo_PREDICCION
+from models.modelo_PREDICCION import (
+    ModeloPrediccionIncidencias, MAX_MUESTRAS_MC, PRESUPUESTO_INTERVALOS_MC
+)
+
+INICIO = (2025, 1)
+MOTORES = ('keras', 'numpy', 'plano')
+MUESTRAS = (10, MAX_MUESTRAS_MC, 100)
+
+
+def medir(modelo, funcion, repeticiones):
+    """Latencia mediana en milisegundos, vaciando el caché antes de cada corrida"""
+    modelo.limpiar_cache()
+    funcion()  # calentamiento
+    tiempos = []
+    for _ in range(repeticiones):
+        modelo.limpiar_cache()
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos) * 1000
+
+
+def main():
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    meses = int(sys.argv[2]) if len(sys.argv) > 2 else 24
+
+    modelo_PREDICCION.CACHE_DIR = tempfile.mkdtemp(prefix='benchmark_intervalos_')
+
+    print("\n" + "=" * 78)
+    print(f"{meses} meses x 18 tipos, caché frío, {repeticiones} repeticiones")
+    print("=" * 78)
+    print(f"{'Motor':<10}{'N':>10}{'puntual':>14}{'intervalos':>14}{'razón keras':>14}{'presupuesto':>14}")
+    print("-" * 78)
+
+    t_keras = None
+    fuera = []
+    for motor in MOTORES:
+        modelo = ModeloPrediccionIncidencias(motor_inferencia=motor)
+        modelo.cargar_modelos()
+
+        t_punto = medir(modelo, lambda: modelo.predecir_trayectoria(INICIO, meses), repeticiones)
+        if t_keras is None:
+            t_keras = t_punto
+        for n_muestras in MUESTRAS:
+            t_intervalos = medir(
+                modelo, lambda: modelo.predecir_intervalos(INICIO, meses, n_muestras=n_muestras), repeticiones
+            )
+            usadas = modelo.predecir_intervalos(INICIO, 1, n_muestras=n_muestras)[0]['n_muestras']
+            razon = t_intervalos / t_keras
+            dentro = razon <= PRESUPUESTO_INTERVALOS_MC
+            if not dentro:
+                fuera.append(f'{motor} N={n_muestras}')
+            print(f"{motor:<10}{f'{n_muestras}→{usadas}':>10}{t_punto:>11.1f} ms{t_intervalos:>11.1f} ms"
+                  f"{razon:>13.2f}x{'✓' if dentro else '✗':>10} {PRESUPUESTO_INTERVALOS_MC:.1f}x")
+
+    print("-" * 78)
+    if fuera:
+        print(f"⚠️  Fuera de presupuesto: {', '.join(fuera)}\n")
+        sys.exit(1)
+    print(f"✅ Intervalos dentro de {PRESUPUESTO_INTERVALOS_MC:.1f}x el puntual de keras en todos los motores\n")
+
+
+if __name__ == "__main__":
+    main()
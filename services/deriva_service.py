@@ -0,0 +1,407 @@
+"""
+services/deriva_service.py
+Monitor de deriva: pronóstico frente a conteos reales de la tabla incidencia
+"""
+import json
+import os
+import threading
+import time
+import traceback
+from datetime import date
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo se garantiza una ejecución por proceso
+    fcntl = None
+
+DIR_DERIVA = 'monitor_deriva'
+ARCHIVO_ESTADO = 'estado.json'
+ARCHIVO_LOCK = 'deriva.lock'
+ARCHIVO_CSV = 'incidencias_mensuales.csv'
+
+UMBRAL_DERIVA = 2.0  # MAE móvil / MAE de validación del entrenamiento
+VENTANA_MESES = 6  # meses cerrados en las estadísticas móviles
+MIN_MESES = 3  # meses observados antes de evaluar la deriva de un tipo
+TAMANO_LOTE = 5000  # filas de incidencia por consulta
+INTERVALO_HORAS = 24
+
+FAMILIAS = (('denuncias', 'id_denuncia'), ('emergencias', 'id_numero_emergencia'))
+
+# Rango por clave primaria desde la marca de agua: solo se leen las filas nuevas
+CONSULTA_NUEVAS = """
+    SELECT id_incidencia, fecha, id_denuncia, id_numero_emergencia
+    FROM incidencia
+    WHERE id_incidencia > %s
+    ORDER BY id_incidencia
+    LIMIT %s
+"""
+
+# Marca de agua de la primera ejecución: búsquedas por índice (fecha, clave primaria)
+CONSULTA_PRIMERA_POSTERIOR = "SELECT MIN(id_incidencia) AS id_incidencia FROM incidencia WHERE fecha >= %s"
+CONSULTA_ULTIMA = "SELECT MAX(id_incidencia) AS id_incidencia FROM incidencia"
+
+
+def _clave_mes(year, month):
+    return f'{year}-{month:02d}'
+
+
+def _siguiente_mes(year, month):
+    return (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+class DerivaService:
+    """
+    Compara el pronóstico con lo que realmente ocurrió.
+
+    Cada ejecución agrega por mes y tipo (id_denuncia / id_numero_emergencia)
+    solo las filas de incidencia con id_incidencia mayor a la marca de agua
+    guardada, y avanza la marca. Los conteos mensuales acumulados, la marca y
+    el último informe viven en DIR_DERIVA/estado.json. La primera ejecución
+    parte de `marca_inicial` o, sin ella, del id anterior a la primera
+    incidencia posterior al histórico del modelo: nunca recorre la tabla entera.
+
+    Mientras un mes está abierto se guarda el pronóstico que el modelo sirve
+    para él (la primera vez que se ve, del caché); al cerrarse se compara con
+    los conteos reales. Un mes cerrado sin incidencias ingeridas cuenta como
+    cero. Por tipo se calculan el MAE y el sesgo móviles de los últimos meses
+    cerrados; el índice de deriva es el MAE móvil dividido por el MAE de
+    validación del entrenamiento. Si algún tipo supera el umbral lanza un
+    reentrenamiento incremental con todos los meses cerrados posteriores al
+    histórico del modelo (una vez por versión del modelo).
+    """
+
+    def __init__(self, directorio=DIR_DERIVA, umbral=UMBRAL_DERIVA, ventana=VENTANA_MESES,
+                 min_meses=MIN_MESES, tamano_lote=TAMANO_LOTE, obtener_conexion=None, marca_inicial=None):
+        if umbral <= 0 or ventana < 1 or min_meses < 1 or tamano_lote < 1:
+            raise ValueError("umbral, ventana, min_meses y tamano_lote deben ser positivos")
+
+        self.directorio = directorio
+        self.umbral = umbral
+        self.ventana = ventana
+        self.min_meses = min_meses
+        self.tamano_lote = tamano_lote
+        self.marca_inicial = marca_inicial
+        self.reentrenar = True
+        self._obtener_conexion = obtener_conexion
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo = None
+        self._error = None
+
+    def registrar(self, modelo, intervalo_horas=INTERVALO_HORAS):
+        """Ejecuta el monitor ahora y luego cada `intervalo_horas` en un hilo aparte"""
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._bucle, args=(modelo, intervalo_horas * 3600), daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+
+    def _bucle(self, modelo, intervalo):
+        while True:
+            try:
+                self.ejecutar(modelo)
+            except Exception as e:
+                traceback.print_exc()
+                self._error = str(e)
+            if self._detener.wait(intervalo):
+                return
+
+    def ejecutar(self, modelo, hoy=None):
+        """
+        Ingesta incremental, estadísticas móviles y, si hay deriva, reentrenamiento.
+
+        Args:
+            hoy: Fecha de referencia (default: hoy); los meses anteriores a su mes están cerrados
+        Returns:
+            dict: Estado del monitor (ver estado()); 'omitido' si otro proceso lo está ejecutando
+        """
+        with self._lock:
+            archivo_lock = self._tomar_lock()
+            if archivo_lock is False:
+                return {'omitido': 'El monitor de deriva ya se está ejecutando en otro proceso'}
+            try:
+                inicio = time.time()
+                estado = self._cargar_estado()
+                filas = self._ingerir(estado, modelo)
+                hoy = hoy or date.today()
+                self._registrar_pronosticos(modelo, estado, hoy)
+
+                meses = self._meses_cerrados(modelo, hoy)
+                informe = self._evaluar(modelo, estado, meses)
+                informe.update({'filas_nuevas': filas, 'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                                'segundos': round(time.time() - inicio, 2)})
+                if informe['tipos_con_deriva'] and self.reentrenar:
+                    informe['reentrenamiento'] = self._reentrenar(modelo, estado, informe, meses)
+
+                estado['informe'] = informe
+                self._guardar_estado(estado)
+                self._error = None
+                print(f"📉 Monitor de deriva: {filas} filas nuevas, "
+                      f"{len(informe['tipos_con_deriva'])} tipos con deriva")
+                return self._resumen(estado)
+            finally:
+                self._soltar_lock(archivo_lock)
+
+    def _ingerir(self, estado, modelo):
+        """Agrega a los conteos mensuales las filas posteriores a la marca de agua y la avanza"""
+        if self._obtener_conexion is None:
+            from utils.database import obtenerconexion
+            conexion = obtenerconexion()
+        else:
+            conexion = self._obtener_conexion()
+        if conexion is None:
+            raise ConnectionError('No se pudo conectar a la base de datos')
+
+        marca = estado['marca_agua']
+        leidas = 0
+        try:
+            with conexion.cursor() as cursor:
+                if marca is None:
+                    marca = self._marca_primera_ejecucion(cursor, modelo)
+                while True:
+                    cursor.execute(CONSULTA_NUEVAS, (marca, self.tamano_lote))
+                    filas = cursor.fetchall()
+                    for fila in filas:
+                        fecha = fila['fecha']
+                        if fecha is None:
+                            continue
+                        mes = _clave_mes(fecha.year, fecha.month)
+                        for familia, columna in FAMILIAS:
+                            if fila[columna] is None:
+                                continue
+                            conteos = estado['reales'][familia].setdefault(mes, {})
+                            tipo = str(int(fila[columna]))
+                            conteos[tipo] = conteos.get(tipo, 0) + 1
+                    if filas:
+                        marca = filas[-1]['id_incidencia']
+                        leidas += len(filas)
+                    if len(filas) < self.tamano_lote:
+                        break
+        finally:
+            conexion.close()
+
+        estado['marca_agua'] = marca
+        return leidas
+
+    def _marca_primera_ejecucion(self, cursor, modelo):
+        """
+        marca_inicial, o el id anterior a la primera incidencia desde el mes
+        siguiente al histórico del modelo (el máximo id si aún no hay ninguna).
+        """
+        if self.marca_inicial is not None:
+            return self.marca_inicial
+
+        from models.modelo_PREDICCION import _rango_meses
+
+        year, month = _siguiente_mes(*_rango_meses(modelo.den_monthly)[1])
+        cursor.execute(CONSULTA_PRIMERA_POSTERIOR, (date(year, month, 1),))
+        primera = cursor.fetchone()['id_incidencia']
+        if primera is not None:
+            return primera - 1
+        cursor.execute(CONSULTA_ULTIMA, ())
+        return cursor.fetchone()['id_incidencia'] or 0
+
+    def _meses_cerrados(self, modelo, hoy):
+        """Meses cerrados posteriores al histórico del modelo, tengan o no incidencias ingeridas"""
+        from models.modelo_PREDICCION import _rango_meses
+
+        meses = []
+        mes = _siguiente_mes(*_rango_meses(modelo.den_monthly)[1])
+        while mes < (hoy.year, hoy.month):
+            meses.append(mes)
+            mes = _siguiente_mes(*mes)
+        return meses
+
+    def _registrar_pronosticos(self, modelo, estado, hoy):
+        """
+        Guarda el pronóstico servido para cada mes hasta el actual la primera vez
+        que se ve; después no se reemplaza (tampoco tras un reentrenamiento).
+        Se descartan los meses que ya forman parte del histórico del modelo.
+        """
+        from models.modelo_PREDICCION import _rango_meses
+
+        _, ultimo = _rango_meses(modelo.den_monthly)
+        pronosticos = estado.setdefault('pronosticos', {})
+        for clave in [clave for clave in pronosticos if clave <= _clave_mes(*ultimo)]:
+            del pronosticos[clave]
+
+        mes = _siguiente_mes(*ultimo)
+        while mes <= (hoy.year, hoy.month) and _clave_mes(*mes) in pronosticos:
+            mes = _siguiente_mes(*mes)
+        if mes > (hoy.year, hoy.month):
+            return
+
+        n_meses = (hoy.year - mes[0]) * 12 + hoy.month - mes[1] + 1
+        for prediccion in modelo.predecir_trayectoria(mes, n_meses):
+            clave = _clave_mes(prediccion['year'], prediccion['month'])
+            pronosticos.setdefault(clave, {
+                'version_modelo': modelo.version_modelo,
+                **{familia: {str(tipo): valor for tipo, valor in prediccion[familia].items()}
+                   for familia, _ in FAMILIAS}
+            })
+
+    def _evaluar(self, modelo, estado, meses_cerrados):
+        """Error móvil por tipo sobre los últimos `ventana` meses cerrados frente al pronóstico guardado"""
+        meses = meses_cerrados[-self.ventana:]
+        informe = {
+            'version_modelo': modelo.version_modelo,
+            'meses': [_clave_mes(*mes) for mes in meses],
+            'umbral': self.umbral,
+            'denuncias': {},
+            'emergencias': {},
+            'tipos_con_deriva': []
+        }
+        if not meses:
+            return informe
+
+        metricas = modelo.obtener_metricas()
+
+        for familia, _ in FAMILIAS:
+            for tipo_id, metricas_tipo in metricas[familia].items():
+                tipo = str(int(tipo_id))
+                reales = [estado['reales'][familia].get(_clave_mes(*mes), {}).get(tipo, 0) for mes in meses]
+                predichos = [estado['pronosticos'][_clave_mes(*mes)][familia].get(tipo, 0) for mes in meses]
+                errores = [p - r for p, r in zip(predichos, reales)]
+
+                mae = sum(abs(e) for e in errores) / len(errores)
+                indice = mae / max(float(metricas_tipo['mae']), 1.0)
+                deriva = len(meses) >= self.min_meses and indice > self.umbral
+                informe[familia][int(tipo_id)] = {
+                    'meses': len(meses),
+                    'reales': reales,
+                    'predichos': predichos,
+                    'mae': mae,
+                    'sesgo': sum(errores) / len(errores),
+                    'mae_validacion': float(metricas_tipo['mae']),
+                    'indice_deriva': indice,
+                    'deriva': deriva
+                }
+                if deriva:
+                    informe['tipos_con_deriva'].append(f'{familia[:3]}_{int(tipo_id)}')
+
+        return informe
+
+    def _reentrenar(self, modelo, estado, informe, meses_cerrados):
+        """Reentrenamiento incremental con todos los meses cerrados (uno por versión del modelo)"""
+        anterior = estado.get('reentrenamiento')
+        if anterior and anterior['version_modelo'] == modelo.version_modelo:
+            return dict(anterior, estado='ya_solicitado')
+        if modelo.arquitectura != 'por_tipo':
+            return {'estado': 'omitido', 'motivo': 'El reentrenamiento incremental solo admite la arquitectura por_tipo'}
+
+        from services.entrenamiento_service import servicio_entrenamiento, EntrenamientoEnCurso
+
+        # Todos los meses cerrados desde el histórico, también los sin incidencias:
+        # el dataset no puede tener huecos (reentrenar_incremental los rechaza)
+        csv_path = self._exportar_csv(estado, [_clave_mes(*mes) for mes in meses_cerrados])
+
+        def al_completar(modelo_entrenado):
+            # Los demás procesos detectan la versión nueva en disco; aquí se recarga ya
+            modelo.verificar_version_disco(forzar=True, esperar=True)
+
+        try:
+            trabajo = servicio_entrenamiento.iniciar(csv_path, incremental=True, al_completar=al_completar,
+                                                     arquitectura=modelo.arquitectura)
+        except EntrenamientoEnCurso as e:
+            return {'estado': 'entrenamiento_en_curso', 'id_trabajo': e.id_trabajo}
+
+        print(f"🔁 Deriva en {', '.join(informe['tipos_con_deriva'])}: reentrenamiento {trabajo['id_trabajo']}")
+        estado['reentrenamiento'] = {
+            'estado': 'solicitado',
+            'version_modelo': modelo.version_modelo,
+            'id_trabajo': trabajo['id_trabajo'],
+            'tipos': list(informe['tipos_con_deriva']),
+            'fecha': time.strftime('%Y-%m-%dT%H:%M:%S')
+        }
+        return estado['reentrenamiento']
+
+    def _exportar_csv(self, estado, meses):
+        """
+        Dataset para reentrenar_incremental desde los conteos agregados: una fila
+        por incidencia (fecha = primer día del mes) de cada mes cerrado. Un mes sin
+        incidencias lleva una fila sin tipo, así cuenta como cero y no como hueco.
+        """
+        import pandas as pd
+        from models.modelo_PREDICCION import _reemplazo_atomico
+
+        partes = []
+        for familia, columna in FAMILIAS:
+            for mes in meses:
+                for tipo, cantidad in estado['reales'][familia].get(mes, {}).items():
+                    partes.append(pd.DataFrame({'fecha': f'{mes}-01', columna: [int(tipo)] * cantidad}))
+        for mes in meses:
+            if not any(estado['reales'][familia].get(mes) for familia, _ in FAMILIAS):
+                partes.append(pd.DataFrame({'fecha': [f'{mes}-01']}))
+
+        df = (pd.concat(partes, ignore_index=True)
+              .reindex(columns=['fecha', 'id_denuncia', 'id_numero_emergencia'])
+              .astype({'id_denuncia': 'Int64', 'id_numero_emergencia': 'Int64'})
+              .sort_values('fecha', kind='stable'))
+
+        ruta = os.path.join(self.directorio, ARCHIVO_CSV)
+        _reemplazo_atomico(ruta, lambda ruta_tmp: df.to_csv(ruta_tmp, index=False))
+        return ruta
+
+    def _ruta_estado(self):
+        return os.path.join(self.directorio, ARCHIVO_ESTADO)
+
+    def _cargar_estado(self):
+        try:
+            with open(self._ruta_estado()) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'marca_agua': None, 'reales': {familia: {} for familia, _ in FAMILIAS},
+                    'pronosticos': {}, 'informe': None, 'reentrenamiento': None}
+
+    def _guardar_estado(self, estado):
+        """Escribe el estado de forma atómica (marca de agua y conteos siempre juntos)"""
+        os.makedirs(self.directorio, exist_ok=True)
+        ruta = self._ruta_estado()
+        ruta_tmp = f'{ruta}.tmp'
+        with open(ruta_tmp, 'w') as f:
+            json.dump(estado, f)
+        os.replace(ruta_tmp, ruta)
+
+    def _tomar_lock(self):
+        """Lock de archivo entre procesos (False si otro proceso lo tiene)"""
+        if fcntl is None:
+            return None
+
+        os.makedirs(self.directorio, exist_ok=True)
+        archivo = open(os.path.join(self.directorio, ARCHIVO_LOCK), 'a+')
+        try:
+            fcntl.flock(archivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            archivo.close()
+            return False
+        return archivo
+
+    def _soltar_lock(self, archivo):
+        if archivo:
+            fcntl.flock(archivo, fcntl.LOCK_UN)
+            archivo.close()
+
+    def _resumen(self, estado):
+        """Copia serializable (claves de texto, igual que la leída del disco)"""
+        meses = sorted(set(estado['reales']['denuncias']) | set(estado['reales']['emergencias']))
+        return json.loads(json.dumps({
+            'marca_agua': estado['marca_agua'],
+            'meses_ingeridos': meses,
+            'umbral': self.umbral,
+            'ventana_meses': self.ventana,
+            'informe': estado['informe'],
+            'reentrenamiento': estado.get('reentrenamiento'),
+            'error': self._error
+        }))
+
+    def estado(self):
+        """Marca de agua, último informe y último reentrenamiento solicitado"""
+        # El archivo se reemplaza de forma atómica: se lee sin esperar a una ejecución en curso
+        return self._resumen(self._cargar_estado())
+
+
+# Instancia global
+servicio_deriva = DerivaService()
@@ -0,0 +1,276 @@
+"""
+services/entrenamiento_service.py
+Trabajos de entrenamiento del modelo LSTM en segundo plano
+"""
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo se garantiza un trabajo por proceso
+    fcntl = None
+
+DIR_TRABAJOS = 'trabajos_entrenamiento'
+ARCHIVO_LOCK = 'entrenamiento.lock'
+MAX_LINEAS_LOG = 200
+
+ESTADOS_ACTIVOS = ('en_cola', 'en_curso')
+
+
+class EntrenamientoEnCurso(Exception):
+    """Ya hay un trabajo de entrenamiento en ejecución (en este u otro proceso)"""
+
+    def __init__(self, id_trabajo=None):
+        self.id_trabajo = id_trabajo
+        super().__init__(f'Ya hay un entrenamiento en curso: {id_trabajo or "desconocido"}')
+
+
+class EntrenamientoService:
+    """
+    Ejecuta entrenar_modelos() en un hilo aparte y publica su estado.
+
+    El estado de cada trabajo se guarda en DIR_TRABAJOS/<id>.json para que
+    cualquier proceso de la aplicación pueda consultarlo. Un solo trabajo a la
+    vez: lock en el proceso y lock de archivo (flock) entre procesos.
+    """
+
+    def __init__(self, directorio=DIR_TRABAJOS):
+        self.directorio = directorio
+        self._lock = threading.Lock()
+        self._trabajo_actual = None
+
+    def iniciar(self, csv_path, n_procesos=1, al_completar=None, incremental=False,
+                batch_size=None, jit=False, arquitectura='por_tipo', busqueda=None):
+        """
+        Lanza un trabajo de entrenamiento.
+
+        Args:
+            csv_path: Dataset de incidencias
+            n_procesos: Procesos de entrenamiento (ver entrenar_modelos)
+            incremental: Ajustar los modelos guardados con los meses nuevos (ver reentrenar_incremental)
+            batch_size: Tamaño de lote (None = BATCH_SIZE_ENTRENAMIENTO del modelo)
+            jit: Compilar los pasos de entrenamiento con XLA
+            arquitectura: 'por_tipo' o 'global' (ver ModeloPrediccionIncidencias)
+            busqueda: {'presupuesto_s', 'n_candidatos'} para elegir antes la configuración
+                de la red de cada tipo (ver buscar_hiperparametros); None = entrenar con
+                la configuración guardada de cada tipo
+            al_completar: callable(modelo) que se ejecuta solo si el entrenamiento termina bien
+
+        Returns:
+            dict: Estado inicial del trabajo
+
+        Raises:
+            EntrenamientoEnCurso: Si ya hay otro trabajo en ejecución
+        """
+        with self._lock:
+            if self._trabajo_actual is not None:
+                raise EntrenamientoEnCurso(self._trabajo_actual['id_trabajo'])
+
+            id_trabajo = uuid.uuid4().hex[:12]
+            archivo_lock = self._tomar_lock(id_trabajo)
+
+            trabajo = {
+                'id_trabajo': id_trabajo,
+                'estado': 'en_cola',
+                'csv_path': csv_path,
+                'n_procesos': n_procesos,
+                'incremental': incremental,
+                'batch_size': batch_size,
+                'jit': jit,
+                'arquitectura': arquitectura,
+                'busqueda': busqueda,
+                'creado': time.time(),
+                'inicio': None,
+                'fin': None,
+                'progreso': {'total': 0, 'completados': 0, 'porcentaje': 0.0, 'eta_segundos': None},
+                'tipos': {},
+                'version_modelo': None,
+                'resumen': None,
+                'error': None,
+                'logs': []
+            }
+            self._trabajo_actual = trabajo
+            self._guardar(trabajo)
+
+        threading.Thread(
+            target=self._ejecutar, args=(trabajo, archivo_lock, al_completar), daemon=True
+        ).start()
+
+        return self.obtener(id_trabajo)
+
+    def obtener(self, id_trabajo):
+        """Estado de un trabajo (None si no existe)"""
+        with self._lock:
+            if self._trabajo_actual is not None and self._trabajo_actual['id_trabajo'] == id_trabajo:
+                return json.loads(json.dumps(self._trabajo_actual))
+
+        try:
+            with open(self._ruta_trabajo(id_trabajo)) as f:
+                trabajo = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        # El proceso que lo ejecutaba terminó sin cerrarlo
+        if trabajo['estado'] in ESTADOS_ACTIVOS and not self._lock_ocupado():
+            trabajo['estado'] = 'interrumpido'
+
+        return trabajo
+
+    def trabajo_actual(self):
+        """Id del trabajo en ejecución en este proceso (None si no hay)"""
+        with self._lock:
+            return self._trabajo_actual['id_trabajo'] if self._trabajo_actual else None
+
+    def _ejecutar(self, trabajo, archivo_lock, al_completar):
+        from models.modelo_PREDICCION import ModeloPrediccionIncidencias
+
+        try:
+            with self._lock:
+                trabajo['estado'] = 'en_curso'
+                trabajo['inicio'] = time.time()
+                self._log(trabajo, f"Entrenamiento iniciado: {trabajo['csv_path']} ({trabajo['n_procesos']} procesos)")
+                self._guardar(trabajo)
+
+            progreso = lambda evento, datos: self._registrar_progreso(trabajo, evento, datos)
+            modelo = ModeloPrediccionIncidencias(arquitectura=trabajo['arquitectura'])
+            resumen = None
+
+            opciones = {'jit': trabajo['jit']}
+            if trabajo['batch_size']:
+                opciones['batch_size'] = trabajo['batch_size']
+
+            if trabajo['incremental']:
+                modelo.cargar_modelos()
+                resumen = modelo.reentrenar_incremental(trabajo['csv_path'], progreso=progreso)
+            elif trabajo['busqueda']:
+                from models.busqueda_hiperparametros import buscar_hiperparametros
+                resumen = buscar_hiperparametros(modelo, trabajo['csv_path'], n_procesos=trabajo['n_procesos'],
+                                                 progreso=progreso, **trabajo['busqueda'], **opciones)
+            else:
+                # Cada tipo conserva la configuración elegida por la última búsqueda
+                modelo.entrenar_modelos(trabajo['csv_path'], n_procesos=trabajo['n_procesos'], progreso=progreso,
+                                        hiperparametros=modelo.hiperparametros_guardados(), **opciones)
+
+            # Los modelos nuevos se activan solo si el entrenamiento terminó bien
+            if al_completar is not None:
+                al_completar(modelo)
+
+            with self._lock:
+                trabajo['estado'] = 'completado'
+                trabajo['version_modelo'] = modelo.version_modelo
+                trabajo['resumen'] = json.loads(json.dumps(resumen, default=float))
+                self._log(trabajo, f"✅ Entrenamiento completado, versión {modelo.version_modelo}")
+
+        except Exception as e:
+            traceback.print_exc()
+            with self._lock:
+                trabajo['estado'] = 'error'
+                trabajo['error'] = str(e)
+                self._log(trabajo, f"❌ Error: {e}")
+
+        finally:
+            with self._lock:
+                trabajo['fin'] = time.time()
+                trabajo['progreso']['eta_segundos'] = 0 if trabajo['estado'] == 'completado' else None
+                self._guardar(trabajo)
+                self._trabajo_actual = None
+            self._soltar_lock(archivo_lock)
+
+    def _registrar_progreso(self, trabajo, evento, datos):
+        """Callback de entrenar_modelos"""
+        with self._lock:
+            progreso = trabajo['progreso']
+
+            if evento == 'inicio':
+                progreso['total'] = len(datos['tipos'])
+                for prefijo, tipo_id in datos['tipos']:
+                    trabajo['tipos'][f'{prefijo}_{int(tipo_id)}'] = {
+                        'estado': 'pendiente', 'metrics': None, 'segundos': None
+                    }
+                self._log(trabajo, f"{progreso['total']} tipos por entrenar")
+
+            elif evento == 'tipo_completado':
+                clave = f"{datos['prefijo']}_{int(datos['tipo_id'])}"
+                metricas = datos['metrics']
+                trabajo['tipos'][clave] = {
+                    'estado': 'completado' if metricas else 'omitido',
+                    'metrics': {k: float(v) for k, v in metricas.items()} if metricas else None,
+                    'segundos': round(datos['segundos'], 2)
+                }
+
+                progreso['completados'] += 1
+                progreso['porcentaje'] = round(100 * progreso['completados'] / max(1, progreso['total']), 1)
+
+                # ETA por tiempo de pared: ya refleja los procesos en paralelo
+                transcurrido = time.time() - trabajo['inicio']
+                restantes = progreso['total'] - progreso['completados']
+                progreso['eta_segundos'] = round(transcurrido / progreso['completados'] * restantes, 1)
+
+                if metricas:
+                    self._log(trabajo, f"{clave}: MAE {metricas['mae']:.2f} | RMSE {metricas['rmse']:.2f} "
+                                       f"({datos['segundos']:.1f} s)")
+                else:
+                    self._log(trabajo, f"{clave}: omitido (datos insuficientes)")
+
+            self._guardar(trabajo)
+
+    def _log(self, trabajo, mensaje):
+        trabajo['logs'].append(f"[{time.strftime('%H:%M:%S')}] {mensaje}")
+        del trabajo['logs'][:-MAX_LINEAS_LOG]
+
+    def _ruta_trabajo(self, id_trabajo):
+        return os.path.join(self.directorio, f'{os.path.basename(id_trabajo)}.json')
+
+    def _guardar(self, trabajo):
+        """Escribe el estado del trabajo de forma atómica"""
+        os.makedirs(self.directorio, exist_ok=True)
+        ruta = self._ruta_trabajo(trabajo['id_trabajo'])
+        ruta_tmp = f'{ruta}.tmp'
+        with open(ruta_tmp, 'w') as f:
+            json.dump(trabajo, f)
+        os.replace(ruta_tmp, ruta)
+
+    def _tomar_lock(self, id_trabajo):
+        """Lock de archivo entre procesos; lanza EntrenamientoEnCurso si otro lo tiene"""
+        if fcntl is None:
+            return None
+
+        os.makedirs(self.directorio, exist_ok=True)
+        archivo = open(os.path.join(self.directorio, ARCHIVO_LOCK), 'a+')
+        try:
+            fcntl.flock(archivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            archivo.seek(0)
+            otro = archivo.read().strip() or None
+            archivo.close()
+            raise EntrenamientoEnCurso(otro)
+
+        archivo.seek(0)
+        archivo.truncate()
+        archivo.write(id_trabajo)
+        archivo.flush()
+        return archivo
+
+    def _soltar_lock(self, archivo):
+        if archivo is not None:
+            fcntl.flock(archivo, fcntl.LOCK_UN)
+            archivo.close()
+
+    def _lock_ocupado(self):
+        """True si algún proceso tiene tomado el lock de entrenamiento"""
+        if fcntl is None:
+            return True
+        try:
+            archivo = self._tomar_lock('')
+        except EntrenamientoEnCurso:
+            return True
+        self._soltar_lock(archivo)
+        return False
+
+
+# Instancia global
+servicio_entrenamiento = EntrenamientoService()
@@ -0,0 +1,327 @@
+"""
+services/info_modelo_service.py
+Resumen del modelo de predicción (GET /api/modelo/prediccion/info)
+
+El resumen (métricas agregadas, estadísticas históricas y tablas de precisión)
+solo cambia cuando cambian los modelos: se calcula una vez por versión al
+cargar o entrenar y se sirve desde memoria con un ETag derivado del contenido.
+"""
+import hashlib
+import json
+import threading
+import time
+
+
+class InfoModeloService:
+    """
+    Resumen precalculado de la versión activa del modelo.
+
+    Se registra en modelo.al_activar_version; si una solicitud llega con otra
+    versión activa (p. ej. recarga en otro proceso) el resumen se recalcula ahí.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._resumen = None  # {'version', 'data', 'etag', 'generado'}
+
+    def registrar(self, modelo):
+        """Recalcula el resumen en cada versión activada del modelo (y ahora, si ya está cargado)"""
+        if self.actualizar not in modelo.al_activar_version:
+            modelo.al_activar_version.append(self.actualizar)
+        if modelo.trained:
+            self.actualizar(modelo)
+
+    def actualizar(self, modelo):
+        """
+        Calcula y guarda el resumen de la versión activa.
+
+        Returns:
+            dict: {'version', 'data', 'etag', 'generado'}
+        """
+        activos = modelo._instantanea()
+        data = construir_info(activos)
+        contenido = json.dumps(data, sort_keys=True, default=str)
+        resumen = {
+            'version': activos['version'],
+            'data': data,
+            'etag': hashlib.sha1(f"{activos['version']}:{contenido}".encode()).hexdigest()[:20],
+            'generado': time.time()
+        }
+        with self._lock:
+            self._resumen = resumen
+        return resumen
+
+    def obtener(self, modelo):
+        """Resumen de la versión activa (se calcula solo si cambió la versión)"""
+        with self._lock:
+            resumen = self._resumen
+        if resumen is not None and resumen['version'] == modelo.version_modelo:
+            return resumen
+        return self.actualizar(modelo)
+
+    def invalidar(self):
+        """Descarta el resumen; el próximo obtener() lo recalcula"""
+        with self._lock:
+            self._resumen = None
+
+
+def construir_info(activos):
+    """
+    Información detallada sobre el modelo, métricas de precisión y estadísticas
+
+    Args:
+        activos: Instantánea de modelos (ver ModeloPrediccionIncidencias._instantanea)
+    Returns:
+        dict: Resumen servido por /info
+    """
+    from models.modelo_PREDICCION import _rango_meses
+
+    den_monthly = activos['den_monthly']
+    eme_monthly = activos['eme_monthly']
+    
+    # Calcular métricas agregadas de denuncias
+    metricas_den = {int(t): info['metrics'] for t, info in activos['models_den'].items()}
+    mae_den_values = [m['mae'] for m in metricas_den.values()]
+    rmse_den_values = [m['rmse'] for m in metricas_den.values()]
+    
+    # Calcular métricas agregadas de emergencias
+    metricas_eme = {int(t): info['metrics'] for t, info in activos['models_eme'].items()}
+    mae_eme_values = [m['mae'] for m in metricas_eme.values()]
+    rmse_eme_values = [m['rmse'] for m in metricas_eme.values()]
+    
+    # Estadísticas de datos históricos - Denuncias
+    den_stats = den_monthly.groupby('id_denuncia')['count'].agg([
+        ('promedio', 'mean'),
+        ('maximo', 'max'),
+        ('minimo', 'min'),
+        ('desviacion', 'std'),
+        ('total_registros', 'count')
+    ]).round(2)
+    
+    # Estadísticas de datos históricos - Emergencias
+    eme_stats = eme_monthly.groupby('id_numero_emergencia')['count'].agg([
+        ('promedio', 'mean'),
+        ('maximo', 'max'),
+        ('minimo', 'min'),
+        ('desviacion', 'std'),
+        ('total_registros', 'count')
+    ]).round(2)
+    
+    # Calcular precisión relativa (MAE / promedio histórico)
+    precision_denuncias = {}
+    for tipo_id in metricas_den.keys():
+        mae = metricas_den[tipo_id]['mae']
+        promedio = den_stats.loc[tipo_id, 'promedio']
+        error_relativo = (mae / promedio * 100) if promedio > 0 else 0
+        precision_denuncias[int(tipo_id)] = {
+            'mae': round(mae, 2),
+            'rmse': round(metricas_den[tipo_id]['rmse'], 2),
+            'promedio_historico': round(promedio, 2),
+            'error_relativo_porcentaje': round(error_relativo, 2),
+            'precision_porcentaje': round(max(0, 100 - error_relativo), 2),
+            'interpretacion': _interpretar_precision(error_relativo)
+        }
+    
+    precision_emergencias = {}
+    for tipo_id in metricas_eme.keys():
+        mae = metricas_eme[tipo_id]['mae']
+        promedio = eme_stats.loc[tipo_id, 'promedio']
+        error_relativo = (mae / promedio * 100) if promedio > 0 else 0
+        precision_emergencias[int(tipo_id)] = {
+            'mae': round(mae, 2),
+            'rmse': round(metricas_eme[tipo_id]['rmse'], 2),
+            'promedio_historico': round(promedio, 2),
+            'error_relativo_porcentaje': round(error_relativo, 2),
+            'precision_porcentaje': round(max(0, 100 - error_relativo), 2),
+            'interpretacion': _interpretar_precision(error_relativo)
+        }
+    
+    # (year, month) juntos: con un año parcial el máximo de month por separado es de otro año
+    (primer_year_den, primer_month_den), (ultimo_year_den, ultimo_month_den) = _rango_meses(den_monthly)
+    ultimo_mes_den = f"{ultimo_year_den}-{ultimo_month_den:02d}"
+    periodo_datos_den = f"{primer_year_den}-{primer_month_den:02d} a {ultimo_mes_den}"
+
+    (primer_year_eme, primer_month_eme), (ultimo_year_eme, ultimo_month_eme) = _rango_meses(eme_monthly)
+    ultimo_mes_eme = f"{ultimo_year_eme}-{ultimo_month_eme:02d}"
+    periodo_datos_eme = f"{primer_year_eme}-{primer_month_eme:02d} a {ultimo_mes_eme}"
+
+    # Resumen general
+    info = {
+        'modelo': {
+            'arquitectura': 'Bidirectional LSTM (64-32-16-1)',
+            'lookback_meses': 6,
+            'features_temporales': ['mensual', 'trimestral', 'tendencia'],
+            'regularizacion': 'L2 + Dropout (20-30%)',
+            'funcion_perdida': 'Huber Loss',
+            'optimizador': 'Adam (lr=0.001)',
+            'seed_reproducibilidad': 42
+        },
+        
+        'datos': {
+            'denuncias': {
+                'tipos_unicos': len(activos['models_den']),
+                'ultimo_mes': ultimo_mes_den,
+                'periodo_datos': periodo_datos_den,
+                'total_meses_historicos': len(den_monthly['month'].unique()) * len(den_monthly['year'].unique())
+            },
+            'emergencias': {
+                'tipos_unicos': len(activos['models_eme']),
+                'ultimo_mes': ultimo_mes_eme,
+                'periodo_datos': periodo_datos_eme,
+                'total_meses_historicos': len(eme_monthly['month'].unique()) * len(eme_monthly['year'].unique())
+            }
+        },
+        
+        'metricas_agregadas': {
+            'denuncias': {
+                'mae_promedio': round(sum(mae_den_values) / len(mae_den_values), 2),
+                'mae_minimo': round(min(mae_den_values), 2),
+                'mae_maximo': round(max(mae_den_values), 2),
+                'rmse_promedio': round(sum(rmse_den_values) / len(rmse_den_values), 2),
+                'rmse_minimo': round(min(rmse_den_values), 2),
+                'rmse_maximo': round(max(rmse_den_values), 2),
+                'interpretacion': _interpretar_mae_global(sum(mae_den_values) / len(mae_den_values))
+            },
+            'emergencias': {
+                'mae_promedio': round(sum(mae_eme_values) / len(mae_eme_values), 2),
+                'mae_minimo': round(min(mae_eme_values), 2),
+                'mae_maximo': round(max(mae_eme_values), 2),
+                'rmse_promedio': round(sum(rmse_eme_values) / len(rmse_eme_values), 2),
+                'rmse_minimo': round(min(rmse_eme_values), 2),
+                'rmse_maximo': round(max(rmse_eme_values), 2),
+                'interpretacion': _interpretar_mae_global(sum(mae_eme_values) / len(mae_eme_values))
+            }
+        },
+        
+        'precision_por_tipo': {
+            'denuncias': precision_denuncias,
+            'emergencias': precision_emergencias
+        },
+        
+        'estadisticas_historicas': {
+            'denuncias': {int(k): v for k, v in den_stats.to_dict('index').items()},
+            'emergencias': {int(k): v for k, v in eme_stats.to_dict('index').items()}
+        },
+        
+        'calidad_global': {
+            'denuncias': _evaluar_calidad_global(
+                sum(mae_den_values) / len(mae_den_values),
+                sum([p['error_relativo_porcentaje'] for p in precision_denuncias.values()]) / len(precision_denuncias)
+            ),
+            'emergencias': _evaluar_calidad_global(
+                sum(mae_eme_values) / len(mae_eme_values),
+                sum([p['error_relativo_porcentaje'] for p in precision_emergencias.values()]) / len(precision_emergencias)
+            )
+        },
+        
+        'recomendaciones': _generar_recomendaciones(
+            sum(mae_den_values) / len(mae_den_values),
+            sum(mae_eme_values) / len(mae_eme_values),
+            len(den_monthly),
+            len(eme_monthly)
+        )
+    }
+    
+    return info
+
+
+def _interpretar_precision(error_relativo):
+    """Interpreta el error relativo"""
+    if error_relativo < 10:
+        return 'Excelente - Error muy bajo'
+    elif error_relativo < 20:
+        return 'Buena - Error aceptable'
+    elif error_relativo < 35:
+        return 'Moderada - Error considerable'
+    elif error_relativo < 50:
+        return 'Regular - Error alto'
+    else:
+        return 'Baja - Error muy alto'
+
+
+def _interpretar_mae_global(mae):
+    """Interpreta el MAE global"""
+    if mae < 2:
+        return 'Excelente - Predicciones muy precisas'
+    elif mae < 4:
+        return 'Buena - Predicciones confiables'
+    elif mae < 6:
+        return 'Moderada - Predicciones aceptables'
+    else:
+        return 'Regular - Considerar mejorar el modelo'
+
+
+def _evaluar_calidad_global(mae_promedio, error_relativo_promedio):
+    """Evalúa la calidad global del modelo"""
+    score = 100 - (error_relativo_promedio * 1.5)  # Solo usar % de error
+    score = max(0, min(100, score))
+    
+    if score >= 85:
+        nivel = 'Excelente'
+        color = 'verde'
+        confianza = 'Alta'
+    elif score >= 70:
+        nivel = 'Buena'
+        color = 'verde-claro'
+        confianza = 'Moderada-Alta'
+    elif score >= 55:
+        nivel = 'Aceptable'
+        color = 'amarillo'
+        confianza = 'Moderada'
+    else:
+        nivel = 'Mejorable'
+        color = 'naranja'
+        confianza = 'Baja-Moderada'
+    
+    return {
+        'score': round(score, 2),
+        'nivel': nivel,
+        'color': color,
+        'confianza': confianza,
+        'descripcion': f'El modelo tiene una calidad {nivel.lower()} con un score de {round(score, 2)}/100'
+    }
+
+
+def _generar_recomendaciones(mae_den, mae_eme, n_datos_den, n_datos_eme):
+    """Genera recomendaciones basadas en las métricas"""
+    recomendaciones = []
+    
+    if mae_den > 5 or mae_eme > 5:
+        recomendaciones.append({
+            'tipo': 'warning',
+            'mensaje': 'MAE alto detectado. Considera reentrenar con más datos históricos.',
+            'accion': 'Agregar más meses de datos históricos al dataset'
+        })
+    
+    if n_datos_den < 500:
+        recomendaciones.append({
+            'tipo': 'info',
+            'mensaje': 'Dataset de denuncias relativamente pequeño.',
+            'accion': 'Incrementar el período de datos históricos para mejorar precisión'
+        })
+    
+    if n_datos_eme < 500:
+        recomendaciones.append({
+            'tipo': 'info',
+            'mensaje': 'Dataset de emergencias relativamente pequeño.',
+            'accion': 'Incrementar el período de datos históricos para mejorar precisión'
+        })
+    
+    if mae_den < 3 and mae_eme < 3:
+        recomendaciones.append({
+            'tipo': 'success',
+            'mensaje': '¡Modelo con excelente desempeño!',
+            'accion': 'Las predicciones son confiables para toma de decisiones'
+        })
+    
+    recomendaciones.append({
+        'tipo': 'tip',
+        'mensaje': 'Validación continua recomendada',
+        'accion': 'Comparar predicciones con datos reales mensualmente y reentrenar si es necesario'
+    })
+    
+    return recomendaciones
+
+
+# Instancia global
+servicio_info_modelo = InfoModeloService()
@@ -0,0 +1,199 @@
+"""
+services/precalculo_service.py
+Precálculo del horizonte de pronóstico tras cargar o reentrenar el modelo LSTM
+"""
+import copy
+import threading
+import time
+import traceback
+
+HORIZONTE_MESES = 24
+
+
+class PrecalculoService:
+    """
+    Llena el caché de predicciones con los próximos `horizonte` meses de todos
+    los tipos y precalcula la distribución por sectores de cada mes.
+
+    Se registra en modelo.al_activar_version: cada versión nueva (carga,
+    recarga en caliente o entrenamiento) lanza un precálculo en un hilo aparte.
+    Si llega otra versión mientras corre, se repite una sola vez al terminar.
+    """
+
+    def __init__(self, horizonte=HORIZONTE_MESES):
+        if horizonte < 1:
+            raise ValueError("horizonte debe ser al menos 1")
+
+        self.horizonte = horizonte
+        self._lock = threading.Lock()
+        self._en_curso = False
+        self._repetir = False
+        self._sectores = {}  # (version, year, month, incluir_detalles) -> predicción por sectores
+        self._estado = {
+            'estado': 'sin_ejecutar',
+            'version_modelo': None,
+            'horizonte_meses': horizonte,
+            'desde': None,
+            'hasta': None,
+            'inicio': None,
+            'fin': None,
+            'segundos': None,
+            'cobertura': None,
+            'error': None
+        }
+
+    def registrar(self, modelo):
+        """Precalcula en cada versión activada del modelo (y ahora, si ya está cargado)"""
+        if self._programar not in modelo.al_activar_version:
+            modelo.al_activar_version.append(self._programar)
+        if modelo.trained:
+            self._programar(modelo)
+
+    def _programar(self, modelo):
+        with self._lock:
+            if self._en_curso:
+                self._repetir = True
+                return
+            self._en_curso = True
+            self._estado['estado'] = 'en_curso'
+
+        threading.Thread(target=self._ejecutar_pendientes, args=(modelo,), daemon=True).start()
+
+    def _ejecutar_pendientes(self, modelo):
+        while True:
+            self.ejecutar(modelo)
+            with self._lock:
+                if not self._repetir:
+                    self._en_curso = False
+                    return
+                self._repetir = False
+
+    def ejecutar(self, modelo):
+        """
+        Precálculo síncrono del horizonte para la versión activa.
+
+        Returns:
+            dict: Estado final (ver estado())
+        """
+        inicio = time.time()
+        version = modelo.version_modelo
+        desde = self._primer_mes(modelo)
+        meses = self._meses(desde)
+
+        with self._lock:
+            self._estado.update({
+                'estado': 'en_curso', 'version_modelo': version, 'horizonte_meses': self.horizonte,
+                'desde': f"{desde[0]}-{desde[1]:02d}", 'hasta': f"{meses[-1][0]}-{meses[-1][1]:02d}",
+                'inicio': inicio, 'fin': None, 'segundos': None, 'error': None
+            })
+
+        try:
+            # Toda la trayectoria en una sola pasada llena el caché de cada mes y tipo
+            trayectoria = modelo.predecir_trayectoria(desde, self.horizonte)
+            sectores, error_sectores = self._precalcular_sectores(version, trayectoria)
+            cobertura = self._cobertura(modelo, version, meses, trayectoria[0].get('engine'),
+                                        len({clave[:3] for clave in sectores}))
+
+            with self._lock:
+                self._sectores = {clave: valor for clave, valor in self._sectores.items() if clave[0] == version}
+                self._sectores.update(sectores)
+                self._estado.update({'estado': 'completado', 'cobertura': cobertura, 'error': error_sectores})
+            print(f"✅ Horizonte precalculado: {self.horizonte} meses desde {self._estado['desde']} "
+                  f"(versión {version})")
+
+        except Exception as e:
+            traceback.print_exc()
+            with self._lock:
+                self._estado.update({'estado': 'error', 'error': str(e)})
+
+        finally:
+            with self._lock:
+                self._estado['fin'] = time.time()
+                self._estado['segundos'] = round(self._estado['fin'] - inicio, 2)
+
+        return self.estado()
+
+    def _precalcular_sectores(self, version, trayectoria):
+        """
+        Distribución por sectores de cada mes, con y sin detalles (las dos variantes
+        que piden las rutas); un error aquí no invalida el pronóstico.
+        """
+        try:
+            from models.modelo_PREDICCION_ESPACIAL import modelo_espacial
+
+            sectores = {}
+            for prediccion in trayectoria:
+                for incluir_detalles in (False, True):
+                    distribucion = modelo_espacial.predecir_sectores(prediccion, incluir_detalles=incluir_detalles)
+                    if distribucion:
+                        sectores[(version, prediccion['year'], prediccion['month'], incluir_detalles)] = distribucion
+            return sectores, None
+        except Exception as e:
+            print(f"⚠️  No se pudo precalcular la distribución por sectores: {e}")
+            return {}, f'sectores: {e}'
+
+    def _primer_mes(self, modelo):
+        """Mes siguiente al último dato histórico (mismo criterio que predecir_mes)"""
+        from models.modelo_PREDICCION import _rango_meses
+
+        _, (year, month) = _rango_meses(modelo.den_monthly)
+        return (year + 1, 1) if month == 12 else (year, month + 1)
+
+    def _meses(self, desde):
+        year, month = desde
+        meses = []
+        for _ in range(self.horizonte):
+            meses.append((year, month))
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return meses
+
+    def _cobertura(self, modelo, version, meses, engine, meses_sectores):
+        """
+        Predicciones del horizonte presentes en el caché para `version` (engine None = LSTM),
+        sin contar aciertos/fallos ni alterar la recencia LRU
+        """
+        esperadas = 0
+        en_cache = 0
+        for tipo_modelo, model_dict in (('denuncias', modelo.models_den), ('emergencias', modelo.models_eme)):
+            cache_modelo = f'{tipo_modelo}:{engine}' if engine else tipo_modelo
+            for tipo_id in model_dict:
+                for year, month in meses:
+                    esperadas += 1
+                    clave = modelo._get_cache_key(year, month, tipo_id, cache_modelo, version)
+                    en_cache += modelo.cache_predicciones.contiene_sin_contar(clave)
+        return {
+            'meses': len(meses),
+            'tipos': len(modelo.models_den) + len(modelo.models_eme),
+            'predicciones': en_cache,
+            'esperadas': esperadas,
+            'porcentaje': round(100 * en_cache / esperadas, 1) if esperadas else 0.0,
+            'engine': engine or 'lstm',
+            'meses_con_sectores': meses_sectores
+        }
+
+    def sectores(self, version, year, month, incluir_detalles=True):
+        """
+        Distribución por sectores precalculada (None si no está). Retorna una
+        copia: quien la modifique no altera la que reciben las demás solicitudes.
+        """
+        with self._lock:
+            distribucion = self._sectores.get((version, year, month, bool(incluir_detalles)))
+        return copy.deepcopy(distribucion)
+
+    def invalidar_sectores(self):
+        """Descarta las distribuciones precalculadas (p. ej. al recalcular la densidad)"""
+        with self._lock:
+            self._sectores = {}
+            if self._estado['cobertura']:
+                self._estado['cobertura']['meses_con_sectores'] = 0
+
+    def estado(self):
+        """Estado del último precálculo"""
+        with self._lock:
+            estado = dict(self._estado)
+            estado['cobertura'] = dict(estado['cobertura']) if estado['cobertura'] else None
+            return estado
+
+
+# Instancia global
+servicio_precalculo = PrecalculoService()
@@ -0,0 +1,736 @@
+# test_models.py
+"""
+Pruebas del modelo de predicción LSTM sobre los artefactos de modelos_entrenados/
+Ejecutar: python -m pytest tests/test_models.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from models import modelo_PREDICCION
+
+
+@pytest.fixture
+def entorno_modelo(tmp_path, monkeypatch):
+    """Trabaja sobre los artefactos del repo sin tocar el caché versionado"""
+    monkeypatch.chdir(RAIZ)
+    monkeypatch.setattr(modelo_PREDICCION, 'CACHE_DIR', str(tmp_path))
+    return tmp_path
+
+
+def _modelo(motor, fusionado=False):
+    modelo = modelo_PREDICCION.ModeloPrediccionIncidencias(motor_inferencia=motor, fusionado=fusionado)
+    modelo.limpiar_cache()
+    modelo.cargar_modelos()
+    return modelo
+
+
+def test_motor_numpy_igual_a_keras(entorno_modelo):
+    pytest.importorskip('tensorflow')
+    modelo = _modelo('numpy')
+
+    resultado = modelo.verificar_motor_numpy()
+
+    assert resultado['ok'], resultado
+
+
+def test_prediccion_numpy_igual_a_keras(entorno_modelo):
+    pytest.importorskip('tensorflow')
+
+    pred_numpy = _modelo('numpy').predecir_mes(2025, 3)
+    pred_keras = _modelo('keras').predecir_mes(2025, 3)
+
+    assert pred_numpy == pred_keras
+
+
+def test_inferencia_fusionada_igual_a_por_tipo(entorno_modelo):
+    por_tipo = _modelo('numpy').predecir_mes(2026, 1)
+    fusionado = _modelo('numpy', fusionado=True)
+
+    assert set(fusionado.predictores_fusionados) == {'denuncias', 'emergencias'}
+    assert fusionado.predecir_mes(2026, 1) == por_tipo
+
+
+def test_carga_diferida_igual_a_completa(entorno_modelo):
+    completa = _modelo('numpy').predecir_mes(2025, 8)
+
+    diferida = modelo_PREDICCION.ModeloPrediccionIncidencias(motor_inferencia='numpy', carga_diferida=True)
+    diferida.limpiar_cache()
+    diferida.cargar_modelos()
+    assert diferida.estado_carga()['denuncias'] == {'cargados': 0, 'total': 12}
+
+    assert diferida.predecir_mes(2025, 8) == completa
+    assert diferida.estado_carga()['denuncias'] == {'cargados': 12, 'total': 12}
+
+    # El precalentamiento en segundo plano deja todas las redes listas
+    precalentada = modelo_PREDICCION.ModeloPrediccionIncidencias(
+        motor_inferencia='numpy', carga_diferida=True, precalentar=True
+    )
+    precalentada.cargar_modelos()
+    for _ in range(600):
+        if precalentada.estado_carga()['precalentamiento'] == 'completo':
+            break
+        time.sleep(0.05)
+    assert precalentada.estado_carga()['emergencias'] == {'cargados': 6, 'total': 6}
+
+
+def test_trayectoria_igual_a_meses_sueltos(entorno_modelo):
+    trayectoria = _modelo('numpy').predecir_trayectoria((2025, 11), 4)
+    por_mes = _modelo('numpy')
+
+    assert [(p['year'], p['month']) for p in trayectoria] == [(2025, 11), (2025, 12), (2026, 1), (2026, 2)]
+    assert trayectoria == [por_mes.predecir_mes(p['year'], p['month']) for p in trayectoria]
+
+
+def test_cache_persistente_por_version(entorno_modelo):
+    modelo = _modelo('numpy')
+    prediccion = modelo.predecir_mes(2025, 4)
+
+    # Un segundo proceso/instancia lee del mismo almacén sin recalcular
+    otro = modelo_PREDICCION.ModeloPrediccionIncidencias(motor_inferencia='numpy')
+    otro.cargar_modelos()
+    otro._predecir_paso = None  # falla si intenta recalcular
+    assert otro.predecir_mes(2025, 4) == prediccion
+    assert otro.cache_predicciones.estadisticas()['fallos'] == 0
+
+    # Otra versión de modelo no ve esas predicciones
+    otro.version_modelo = 'otra'
+    assert otro.cache_predicciones.get(otro._get_cache_key(2025, 4, 1, 'denuncias')) is None
+
+
+def test_recarga_en_caliente_nueva_version(entorno_modelo, monkeypatch):
+    import pickle
+    import shutil
+
+    for carpeta in ('MODEL_DIR', 'DATA_DIR'):
+        destino = entorno_modelo / carpeta
+        shutil.copytree(os.path.join(RAIZ, getattr(modelo_PREDICCION, carpeta)), destino)
+        monkeypatch.setattr(modelo_PREDICCION, carpeta, str(destino))
+
+    modelo = _modelo('numpy')
+    version_anterior = modelo.version_modelo
+    assert modelo.verificar_version_disco(forzar=True) is False
+
+    # Otro proceso publica una versión nueva (aquí: solo cambian las métricas)
+    ruta_metadata = entorno_modelo / 'MODEL_DIR' / 'metadata.pkl'
+    metadata = pickle.loads(ruta_metadata.read_bytes())
+    metadata['den_metrics'][1] = {'mae': 0.0, 'rmse': 0.0}
+    ruta_metadata.write_bytes(pickle.dumps(metadata))
+    nueva_version = modelo_PREDICCION.ModeloPrediccionIncidencias(motor_inferencia='numpy')._publicar_version()
+
+    assert nueva_version != version_anterior
+    assert modelo.verificar_version_disco(forzar=True, esperar=True) is True
+    assert modelo.version_modelo == nueva_version
+    assert modelo.obtener_metricas()['denuncias'][1] == {'mae': 0.0, 'rmse': 0.0}
+    assert modelo._get_cache_key(2025, 4, 1, 'denuncias')[0] == nueva_version
+
+
+def test_entrenamiento_paralelo_reproducible(entorno_modelo):
+    pytest.importorskip('tensorflow')
+    modelo = _modelo('numpy')
+    tareas = [('den', modelo.den_monthly, 1), ('eme', modelo.eme_monthly, 2)]
+
+    dos_procesos = modelo._entrenar_en_paralelo(tareas, n_procesos=2, epochs=3)
+    un_proceso = modelo._entrenar_en_paralelo(tareas[::-1], n_procesos=1, epochs=3)
+
+    assert set(dos_procesos) == {('den', 1), ('eme', 2)}
+    for clave, resultado in dos_procesos.items():
+        metricas = resultado['metrics']
+        assert (metricas['mae'], metricas['rmse']) == (un_proceso[clave]['metrics']['mae'], un_proceso[clave]['metrics']['rmse'])
+        assert metricas['segundos_entrenamiento'] > 0
+        X = resultado['estado']['ventana'][np.newaxis].astype(np.float32)
+        assert np.array_equal(resultado['predictor'](X), un_proceso[clave]['predictor'](X))
+
+
+_SCRIPT_PRINCIPAL = """
+import multiprocessing, os, sys
+from concurrent.futures import ProcessPoolExecutor
+
+if __name__ == '__main__':
+    from models.procesos_entrenamiento import sin_reimportar_main
+    sin_reimportar_main()
+
+# Como create_app() en app.py: no debe correr en los procesos del pool
+with open(os.environ['MARCAS'], 'a') as f:
+    f.write(__name__ + '\\n')
+
+if __name__ == '__main__':
+    from models.procesos_entrenamiento import _inicializar_proceso_entrenamiento
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_inicializar_proceso_entrenamiento, initargs=(1,)) as pool:
+        print(pool.submit(os.getpid).result() != os.getpid())
+"""
+
+
+def test_pool_spawn_no_reejecuta_script_principal(tmp_path):
+    pytest.importorskip('tensorflow')
+    import subprocess
+
+    script = tmp_path / 'principal.py'
+    script.write_text(_SCRIPT_PRINCIPAL)
+    marcas = tmp_path / 'marcas.txt'
+    salida = subprocess.run([sys.executable, str(script)], cwd=RAIZ, capture_output=True, text=True, timeout=300,
+                            env=dict(os.environ, MARCAS=str(marcas), PYTHONPATH=RAIZ))
+
+    assert salida.returncode == 0, salida.stderr
+    assert salida.stdout.split()[-1] == 'True'
+    assert marcas.read_text().split() == ['__main__']
+
+
+def test_reentrenamiento_incremental_extiende_serie(entorno_modelo):
+    pytest.importorskip('tensorflow')
+    modelo = _modelo('numpy')
+    anterior = modelo.den_monthly
+
+    # Un año nuevo con los mismos conteos que el último
+    nuevo = anterior[anterior['year'] == 2024].assign(year=2025, trend=0)
+    extendida, meses = modelo._extender_serie(anterior, nuevo)
+
+    assert meses == 12
+    assert extendida.iloc[:len(anterior)].equals(anterior)
+    assert list(extendida['trend']) == list(range(len(extendida)))
+    assert modelo._extender_serie(extendida, nuevo) == (extendida, 0)
+
+    # Ajuste fino desde la red guardada, con los mismos scalers
+    info = modelo.models_den[1]
+    ajustado, mae_sin_ajuste = modelo._ajustar_tipo('den', extendida, 1, info, epochs=1)
+
+    assert ajustado['scalers'] is info['scalers']
+    assert ajustado['estado']['n_filas'] == info['estado']['n_filas'] + 12
+    assert ajustado['metrics']['mae'] >= 0 and mae_sin_ajuste >= 0
+
+
+def test_arquitectura_global_guardar_y_cargar(entorno_modelo, monkeypatch):
+    pytest.importorskip('tensorflow')
+    for carpeta in ('MODEL_DIR', 'DATA_DIR'):
+        monkeypatch.setattr(modelo_PREDICCION, carpeta, str(entorno_modelo / carpeta))
+
+    modelo = modelo_PREDICCION.ModeloPrediccionIncidencias(arquitectura='global')
+    modelo.den_monthly = pd.read_pickle(os.path.join(RAIZ, 'datos_procesados', 'den_monthly.pkl'))
+    modelo.eme_monthly = pd.read_pickle(os.path.join(RAIZ, 'datos_procesados', 'eme_monthly.pkl'))
+    tareas = [('den', modelo.den_monthly, 1), ('den', modelo.den_monthly, 2), ('eme', modelo.eme_monthly, 1)]
+    for (prefijo, tipo_id), result in modelo._entrenar_global(tareas, epochs=1).items():
+        (modelo.models_den if prefijo == 'den' else modelo.models_eme)[tipo_id] = result
+    modelo.trained = True
+    modelo.version_modelo = modelo.guardar_modelos()
+
+    # Una sola red para todos los tipos, separada de los artefactos por tipo
+    archivos = os.listdir(entorno_modelo / 'MODEL_DIR' / 'global')
+    assert modelo_PREDICCION.ARCHIVO_RED_GLOBAL in archivos
+    assert not [a for a in archivos if a.startswith('den_tipo_')]
+
+    esperado = modelo.predecir_mes(2025, 6)
+    for motor, fusionado in (('numpy', False), ('keras', True)):
+        cargado = modelo_PREDICCION.ModeloPrediccionIncidencias(
+            motor_inferencia=motor, fusionado=fusionado, arquitectura='global'
+        )
+        cargado.limpiar_cache()
+        cargado.cargar_modelos()
+        assert cargado.predecir_mes(2025, 6) == esperado
+    assert set(cargado.obtener_metricas()['denuncias']) == {1, 2}
+
+
+def test_motor_rapido_por_solicitud_y_respaldo(entorno_modelo):
+    modelo = _modelo('numpy')
+    lstm = modelo.predecir_mes(2025, 9)
+
+    rapido = modelo.predecir_mes(2025, 9, engine='fast')
+    assert rapido['engine'] == 'fast' and 'engine' not in lstm
+    assert set(rapido['denuncias']) == set(lstm['denuncias'])
+    assert all(isinstance(v, int) and v >= 0 for v in rapido['emergencias'].values())
+
+    # Caché separado: la predicción LSTM no cambia
+    assert modelo.predecir_mes(2025, 9) == lstm
+    with pytest.raises(ValueError):
+        modelo.predecir_mes(2025, 9, engine='arima')
+
+    # Sin redes LSTM se usa el motor rápido automáticamente
+    for info in modelo.models_den.values():
+        info['predictor'] = None
+    assert modelo.predecir_mes(2025, 9) == rapido
+
+    brechas = modelo.obtener_metricas()['motor_rapido']['denuncias'][1]
+    assert brechas['brecha_mae'] == brechas['mae'] - modelo.obtener_metricas()['denuncias'][1]['mae']
+
+
+def test_intervalos_monte_carlo(entorno_modelo):
+    pytest.importorskip('tensorflow')
+    modelo = _modelo('numpy')
+    intervalos = modelo.predecir_intervalos((2025, 1), 3, n_muestras=30, cuantiles=(0.1, 0.5, 0.9))
+    assert [(p['year'], p['month']) for p in intervalos] == [(2025, 1), (2025, 2), (2025, 3)]
+
+    bandas = intervalos[2]['denuncias'][1]
+    assert set(bandas) == {'media', 'p10', 'p50', 'p90'}
+    assert 0 <= bandas['p10'] <= bandas['p50'] <= bandas['p90']
+
+    # Con motor numpy se calculan con las redes Keras, con dropout reproducible
+    assert intervalos[0]['motor_intervalos'] == modelo_PREDICCION.MOTOR_INTERVALOS == 'keras'
+    assert _modelo('keras').predecir_intervalos((2025, 1), 3, n_muestras=30, cuantiles=(0.1, 0.5, 0.9)) == intervalos
+
+    # Segunda llamada desde el caché; sin caché el resultado es el mismo
+    assert modelo.predecir_intervalos((2025, 1), 3, n_muestras=30, cuantiles=(0.1, 0.5, 0.9)) == intervalos
+    modelo.limpiar_cache()
+    assert modelo.predecir_intervalos((2025, 3), 1, n_muestras=30, cuantiles=(0.9, 0.1, 0.5))[0] == intervalos[2]
+
+    # Más muestras que MAX_MUESTRAS_MC se recortan para cumplir el presupuesto de latencia
+    recortado = modelo.predecir_intervalos((2025, 3), 1, n_muestras=500, cuantiles=(0.1, 0.5, 0.9))[0]
+    assert (recortado['n_muestras'], recortado['n_muestras_solicitadas']) == (modelo_PREDICCION.MAX_MUESTRAS_MC, 500)
+    assert recortado['denuncias'] == intervalos[2]['denuncias']
+
+    # El pronóstico puntual no se ve afectado
+    assert 'engine' not in modelo.predecir_mes(2025, 3)
+    with pytest.raises(ValueError):
+        modelo.predecir_intervalos((2025, 1), 1, n_muestras=1)
+
+
+def test_microbatch_agrupa_solicitudes_concurrentes(entorno_modelo):
+    import threading
+    from models.planificador_inferencia import PlanificadorInferencia
+
+    planificador = PlanificadorInferencia(max_espera_ms=2000, max_lote=8)
+    lotes = []
+    barrera = threading.Barrier(6)
+    resultados = {}
+
+    def duplicar(lista):
+        lotes.append(len(lista))
+        return [{t: 2 * v for t, v in ventanas.items()} for ventanas in lista]
+
+    def solicitud(i):
+        with planificador.sesion():
+            barrera.wait()
+            resultados[i] = planificador.ejecutar('den', {1: i}, duplicar)
+
+    hilos = [threading.Thread(target=solicitud, args=(i,)) for i in range(6)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    # Todas las sesiones enviaron su paso: un solo lote, sin esperar el máximo
+    assert lotes == [6]
+    assert resultados == {i: {1: 2 * i} for i in range(6)}
+    assert planificador.estadisticas()['pasos_por_lote'] == 6
+
+    # Con el modelo: mismas predicciones que sin micro-batching
+    meses = [(2025, m) for m in range(7, 13)]
+    esperado = {mes: _modelo('numpy', fusionado=True).predecir_mes(*mes) for mes in meses}
+    modelo = modelo_PREDICCION.ModeloPrediccionIncidencias(motor_inferencia='numpy', fusionado=True, microbatch=True)
+    modelo.limpiar_cache()
+    modelo.cargar_modelos()
+    obtenido = {}
+    hilos = [threading.Thread(target=lambda mes=mes: obtenido.update({mes: modelo.predecir_mes(*mes)}))
+             for mes in meses]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert obtenido == esperado
+    assert modelo.planificador.estadisticas()['pasos'] > 0
+
+
+def test_dataset_vectorizado_igual_a_fila_por_fila(entorno_modelo):
+    from scripts.benchmark_dataset import dataset_fila_por_fila
+
+    modelo = modelo_PREDICCION.ModeloPrediccionIncidencias()
+    den_monthly = pd.read_pickle('datos_procesados/den_monthly.pkl')
+    serie = den_monthly[den_monthly['id_denuncia'] == 1]
+
+    X_ref, y_ref, scalers_ref = dataset_fila_por_fila(serie)
+    X, y, scalers = modelo.make_lstm_dataset(serie)
+
+    assert X.dtype == X_ref.dtype and np.array_equal(X, X_ref) and np.array_equal(y, y_ref)
+    for c in modelo_PREDICCION.FEATURES:
+        assert np.array_equal(scalers[c].center_, scalers_ref[c].center_)
+        assert np.array_equal(scalers[c].scale_, scalers_ref[c].scale_)
+        assert np.array_equal(scalers[c].transform(serie[[c]]), scalers_ref[c].transform(serie[[c]]))
+
+    # Con scalers ya ajustados solo se transforma
+    X_2, _, _ = modelo.make_lstm_dataset(serie, scalers=scalers_ref)
+    assert np.array_equal(X_2, X_ref)
+    assert len(modelo.make_lstm_dataset(serie.iloc[:6])[0]) == 0
+
+
+def test_solicitudes_concurrentes_un_solo_calculo(entorno_modelo, monkeypatch):
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    meses = [(2025, 10), (2026, 2), (2026, 6)]
+    esperado = {mes: _modelo('numpy').predecir_mes(*mes) for mes in meses}
+
+    modelo = _modelo('numpy')
+    calculos = []
+    original = modelo._forecast_trayectoria_cached
+
+    def contar(model_dict, meses_objetivo, tipo_modelo, *args, **kwargs):
+        calculos.append((tuple(meses_objetivo), tipo_modelo))
+        time.sleep(0.2)  # que el resto de solicitudes lleguen mientras tanto
+        return original(model_dict, meses_objetivo, tipo_modelo, *args, **kwargs)
+
+    monkeypatch.setattr(modelo, '_forecast_trayectoria_cached', contar)
+    barrera = threading.Barrier(96)
+
+    def solicitud(i):
+        barrera.wait()
+        return modelo.predecir_mes(*meses[i % 3])
+
+    with ThreadPoolExecutor(max_workers=96) as pool:
+        obtenidos = list(pool.map(solicitud, range(96)))
+
+    assert all(p == esperado[(p['year'], p['month'])] for p in obtenidos)
+    # Un cálculo por mes y familia; el resto esperó y compartió el resultado
+    assert sorted(calculos) == sorted(((mes,), familia) for mes in meses for familia in ('denuncias', 'emergencias'))
+    assert modelo.vuelo_unico.estadisticas() == {'calculados': 3, 'compartidos': 93, 'en_curso': 0}
+
+
+def test_cache_concurrente(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+    from models.cache_predicciones import CachePredicciones
+
+    cache = CachePredicciones(str(tmp_path / 'cache.sqlite3'), max_memoria=50, lote_escritura=7)
+
+    def trabajar(hilo):
+        for mes in range(1, 13):
+            clave = ('v1', 'denuncias', hilo, 2030, mes)
+            cache[clave] = hilo * 100 + mes
+            assert cache.get(clave) == hilo * 100 + mes
+            if mes % 4 == 0:
+                cache.flush()
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(trabajar, range(48)))
+
+    assert len(cache) == 48 * 12
+    assert cache.estadisticas()['pendientes'] == 0
+
+
+def test_cache_limite_lru(tmp_path):
+    from models.cache_predicciones import CachePredicciones
+
+    cache = CachePredicciones(str(tmp_path / 'cache.sqlite3'), max_entradas=10, max_memoria=4, lote_escritura=3)
+    for mes in range(1, 13):
+        cache[('v1', 'denuncias', 1, 2030, mes)] = mes
+    cache.flush()
+
+    assert len(cache) == 10
+    assert cache.get(('v1', 'denuncias', 1, 2030, 1)) is None
+    assert cache.get(('v1', 'denuncias', 1, 2030, 12)) == 12
+
+
+def test_cache_contiene_sin_contar(tmp_path):
+    from models.cache_predicciones import CachePredicciones
+
+    cache = CachePredicciones(str(tmp_path / 'cache.sqlite3'), max_memoria=2)
+    claves = [('v1', 'denuncias', 1, 2030, mes) for mes in (1, 2, 3, 4)]
+    for mes, clave in enumerate(claves[:3], 1):
+        cache[clave] = mes
+    cache.flush()
+    cache[claves[3]] = 4
+
+    # Solo en disco, en memoria, pendiente de escribir y ausente
+    assert cache.contiene_sin_contar(claves[0]) and cache.contiene_sin_contar(claves[2])
+    assert cache.contiene_sin_contar(claves[3])
+    assert not cache.contiene_sin_contar(('v1', 'denuncias', 1, 2030, 5))
+
+    # Sin contadores ni recencia: el LRU de memoria y los accesos a persistir no cambian
+    assert (cache.aciertos, cache.fallos) == (0, 0)
+    assert list(cache._memoria) == claves[2:] and not cache._accedidos
+
+
+def test_motor_invalido():
+    with pytest.raises(ValueError):
+        modelo_PREDICCION.ModeloPrediccionIncidencias(motor_inferencia='cuda')
+
+
+def test_servidor_inferencia_con_respaldo_local(entorno_modelo):
+    from models.servidor_inferencia import ServidorInferencia, ClienteInferencia
+
+    modelo = _modelo('numpy')
+    local = modelo_PREDICCION.ModeloPrediccionIncidencias(motor_inferencia='numpy', carga_diferida=True)
+    local.cargar_modelos()
+
+    ruta = str(entorno_modelo / 'inferencia.sock')
+    servidor = ServidorInferencia(modelo, ruta)
+    servidor.iniciar(en_hilo=True)
+    try:
+        cliente = ClienteInferencia(ruta, local, timeout=10)
+        assert cliente.predecir_mes(2025, 4) == modelo.predecir_mes(2025, 4)
+        assert cliente.predecir_trayectoria((2025, 1), 6, {'emergencias': [1, 2]}, engine='fast') == \
+            modelo.predecir_trayectoria((2025, 1), 6, {'emergencias': [1, 2]}, engine='fast')
+        with pytest.raises(ValueError):
+            cliente.predecir_mes(2020, 1)
+        intervalos = cliente.predecir_intervalos((2025, 1), 2, 8, (0.1, 0.9), {'denuncias': [1]})
+        assert intervalos == modelo.predecir_intervalos((2025, 1), 2, 8, (0.1, 0.9), {'denuncias': [1]})
+        assert list(intervalos[0]['denuncias']) == [1]
+
+        # Una sola conexión reutilizada; lo demás se delega al modelo local
+        assert cliente.estadisticas()['conexiones_libres'] == 1
+        assert cliente.version_modelo == cliente.estado_servidor()['version_modelo']
+        assert all(info['predictor'] is None for info in local.models_den.values())
+        with pytest.raises(AttributeError):
+            cliente.entrenar_modelos
+    finally:
+        servidor.detener()
+
+    # Sin servidor: se calcula con el modelo local y no se reintenta enseguida
+    caido = ClienteInferencia(str(entorno_modelo / 'no_existe.sock'), local, timeout=1)
+    assert caido.predecir_mes(2025, 4) == modelo.predecir_mes(2025, 4)
+    assert caido.predecir_mes(2025, 5) == modelo.predecir_mes(2025, 5)
+    estadisticas = caido.estadisticas()
+    assert not estadisticas['disponible'] and estadisticas['fallas_conexion'] == 1
+    assert estadisticas['respaldos_locales'] == 2
+
+
+def test_artefacto_plano_cuantizado(entorno_modelo, monkeypatch):
+    import json
+    import shutil
+    from models.artefacto_plano import exportar_artefacto_plano, verificar_artefacto_plano
+
+    for carpeta in ('MODEL_DIR', 'DATA_DIR'):
+        destino = entorno_modelo / carpeta
+        shutil.copytree(os.path.join(RAIZ, getattr(modelo_PREDICCION, carpeta)), destino)
+        monkeypatch.setattr(modelo_PREDICCION, carpeta, str(destino))
+
+    modelo = _modelo('numpy')
+    exportado = exportar_artefacto_plano(modelo, 'float16')
+    assert exportado['redes'] == 18 and exportado['version_modelo'] == modelo.version_modelo
+
+    # Mismas predicciones que los .keras, leyendo los pesos del mapeo
+    plano = _modelo('plano')
+    assert plano._artefacto_plano is not None
+    assert plano.predecir_mes(2025, 5) == modelo.predecir_mes(2025, 5)
+
+    # int8: dentro de la tolerancia de MAE en la validación histórica
+    ruta_int8 = str(entorno_modelo / 'int8.bin')
+    exportar_artefacto_plano(modelo, 'int8', ruta_int8)
+    resultado = verificar_artefacto_plano(modelo, ruta_int8)
+    assert resultado['ok'] and resultado['precision'] == 'int8'
+    assert set(resultado['emergencias']) == set(range(1, 7))
+
+    # Artefacto de otra versión: se ignora y se leen los .keras
+    (entorno_modelo / 'MODEL_DIR' / 'version.json').write_text(json.dumps({'version': 'otra'}))
+    assert _modelo('plano')._artefacto_plano is None
+
+
+_PROCESO_PLANO = """
+import json, sys, tracemalloc
+import numpy as np
+from models.artefacto_plano import ArtefactoPlano
+
+tracemalloc.start()
+artefacto = ArtefactoPlano(sys.argv[1])
+for nombre in artefacto.nombres():
+    red = artefacto.red(nombre)
+    red(np.zeros((1,) + red.input_shape, dtype=np.float32))
+retenidos = tracemalloc.get_traced_memory()[0]
+print('listo', flush=True)
+sys.stdin.readline()
+
+mapeo, campos = False, {}
+with open('/proc/self/smaps') as f:
+    for linea in f:
+        partes = linea.split()
+        if '-' in partes[0] and not partes[0].endswith(':'):
+            mapeo = partes[-1] == sys.argv[1]
+        elif mapeo and partes[0] in ('Rss:', 'Shared_Clean:', 'Shared_Dirty:', 'Private_Clean:', 'Private_Dirty:'):
+            campos[partes[0][:-1]] = campos.get(partes[0][:-1], 0) + int(partes[1]) * 1024
+print(json.dumps(dict(campos, retenidos=retenidos)), flush=True)
+"""
+
+
+def test_artefacto_plano_paginas_compartidas(entorno_modelo, monkeypatch):
+    """Dos procesos con el artefacto float16 comparten sus páginas y no copian los pesos a float32"""
+    import json
+    import subprocess
+    from models.artefacto_plano import exportar_artefacto_plano
+
+    if not os.path.exists('/proc/self/smaps'):
+        pytest.skip('Requiere /proc/<pid>/smaps')
+
+    ruta = str(entorno_modelo / 'plano.bin')
+    exportar_artefacto_plano(_modelo('numpy'), 'float16', ruta)
+    with open(ruta, 'rb') as f:
+        largo = int.from_bytes(f.read(16)[8:], 'little')
+        indice = json.loads(f.read(largo))
+
+    def elementos(nodo):
+        if isinstance(nodo, dict):
+            if 'offset' in nodo:
+                return int(np.prod(nodo['shape']))
+            return sum(elementos(valor) for clave, valor in nodo.items() if clave != 'escala')
+        if isinstance(nodo, list):
+            return sum(elementos(valor) for valor in nodo)
+        return 0
+    bytes_float32 = 4 * elementos(indice['redes'])
+
+    procesos = [subprocess.Popen([sys.executable, '-c', _PROCESO_PLANO, ruta], cwd=RAIZ, text=True,
+                                 stdin=subprocess.PIPE, stdout=subprocess.PIPE) for _ in range(2)]
+    try:
+        for proceso in procesos:
+            assert proceso.stdout.readline().strip() == 'listo'
+        medidas = []
+        for proceso in procesos:
+            proceso.stdin.write('\n')
+            proceso.stdin.flush()
+            medidas.append(json.loads(proceso.stdout.readline()))
+    finally:
+        for proceso in procesos:
+            proceso.kill()
+            proceso.wait()
+
+    for medida in medidas:
+        # Todo el archivo mapeado y compartido con el otro proceso, sin páginas privadas
+        # (recién escrito, sus páginas en el caché del sistema pueden seguir sucias)
+        assert medida['Rss'] >= os.path.getsize(ruta)
+        assert medida['Shared_Clean'] + medida['Shared_Dirty'] == medida['Rss']
+        assert medida['Private_Clean'] == medida['Private_Dirty'] == 0
+        # Los pesos float32 no quedan en memoria privada: solo el índice y temporales del forward
+        assert medida['retenidos'] < 0.25 * bytes_float32
+
+
+def test_backtest_walk_forward(entorno_modelo, monkeypatch):
+    import shutil
+    from models.backtesting import ejecutar_backtest, cargar_backtest
+
+    for carpeta in ('MODEL_DIR', 'DATA_DIR'):
+        destino = entorno_modelo / carpeta
+        shutil.copytree(os.path.join(RAIZ, getattr(modelo_PREDICCION, carpeta)), destino)
+        monkeypatch.setattr(modelo_PREDICCION, carpeta, str(destino))
+
+    modelo = _modelo('numpy')
+    resultado = ejecutar_backtest(modelo, horizonte=3, n_origenes=6)
+
+    tabla = resultado['denuncias'][1]
+    assert [fila['horizonte'] for fila in tabla] == [1, 2, 3]
+    assert [fila['n'] for fila in tabla] == [6, 5, 4]
+    assert [fila['n'] for fila in resultado['resumen']['emergencias']] == [36, 30, 24]
+    assert all(fila['mae'] >= 0 and fila['rmse'] >= fila['mae'] for fila in tabla)
+
+    # El pool de procesos (un modelo cargado por proceso) da las mismas tablas
+    en_paralelo = ejecutar_backtest(modelo, horizonte=3, n_origenes=6, n_procesos=2, guardar=False)
+    assert en_paralelo['denuncias'] == resultado['denuncias']
+    assert en_paralelo['emergencias'] == resultado['emergencias']
+
+    guardado = cargar_backtest(modelo)
+    assert guardado['vigente'] and guardado['denuncias'] == resultado['denuncias']
+    assert cargar_backtest(modelo, 'fast') is None
+
+
+def test_busqueda_hiperparametros_mitades_sucesivas(entorno_modelo, monkeypatch):
+    pytest.importorskip('tensorflow')
+    import shutil
+    from models.busqueda_hiperparametros import buscar_hiperparametros, programa_rondas
+
+    assert programa_rondas(8, 300) == [(8, 38), (4, 75), (2, 150), (1, 300)]
+
+    for carpeta in ('MODEL_DIR', 'DATA_DIR'):
+        destino = entorno_modelo / carpeta
+        shutil.copytree(os.path.join(RAIZ, getattr(modelo_PREDICCION, carpeta)), destino)
+        monkeypatch.setattr(modelo_PREDICCION, carpeta, str(destino))
+
+    modelo = _modelo('keras')
+    resumen = buscar_hiperparametros(modelo, tipos=[('den', 1), ('eme', 2)], n_candidatos=2, epochs=2)
+
+    assert [ronda['entrenados'] for ronda in resumen['rondas']] == [4, 2]
+    assert not resumen['presupuesto_agotado']
+    ganador = resumen['denuncias'][1]
+    assert len(ganador['candidatos']) == 2 and ganador['candidatos'][0]['hiperparametros'] == modelo_PREDICCION.HIPERPARAMETROS_DEFAULT
+
+    # La configuración ganadora queda en metadata y cargar_modelos reconstruye la red
+    recargado = _modelo('keras')
+    assert recargado.models_den[1]['hiperparametros'] == ganador['hiperparametros']
+    assert recargado.models_den[1]['lookback'] == ganador['hiperparametros']['lookback']
+    assert recargado.models_eme[2]['hiperparametros'] == resumen['emergencias'][2]['hiperparametros']
+    assert recargado.models_den[2]['hiperparametros'] is None
+    assert set(recargado.hiperparametros_guardados()) == {('den', 1), ('eme', 2)}
+    assert recargado.predecir_mes(2025, 6) == _modelo('numpy').predecir_mes(2025, 6)
+
+    # Sin tiempo solo se evalúa el candidato por defecto de cada tipo
+    agotado = buscar_hiperparametros(recargado, tipos=[('den', 3)], n_candidatos=4, epochs=2, presupuesto_s=1e-6)
+    assert agotado['presupuesto_agotado']
+    assert agotado['denuncias'][3]['hiperparametros'] == modelo_PREDICCION.HIPERPARAMETROS_DEFAULT
+
+
+def test_busqueda_hiperparametros_tipo_con_pocos_meses(entorno_modelo, monkeypatch):
+    pytest.importorskip('tensorflow')
+    import shutil
+    import pandas as pd
+    from models.busqueda_hiperparametros import buscar_hiperparametros
+
+    for carpeta in ('MODEL_DIR', 'DATA_DIR'):
+        destino = entorno_modelo / carpeta
+        shutil.copytree(os.path.join(RAIZ, getattr(modelo_PREDICCION, carpeta)), destino)
+        monkeypatch.setattr(modelo_PREDICCION, carpeta, str(destino))
+
+    # Un tipo nuevo con 20 meses: alcanza para la red por defecto, no para la búsqueda
+    modelo = _modelo('keras')
+    col_tipo = modelo.den_monthly.columns[2]
+    nuevo = modelo.den_monthly[modelo.den_monthly[col_tipo] == 1].tail(20).copy()
+    nuevo[col_tipo] = 99
+    modelo.den_monthly = pd.concat([modelo.den_monthly, nuevo]).sort_values(['year', 'month', col_tipo],
+                                                                          ignore_index=True)
+
+    resumen = buscar_hiperparametros(modelo, tipos=[('den', 99)], n_candidatos=2, epochs=2)
+
+    assert resumen['rondas'][0]['entrenados'] == 0
+    assert resumen['denuncias'][99]['candidatos'] == []
+    assert resumen['denuncias'][99]['hiperparametros'] == modelo_PREDICCION.HIPERPARAMETROS_DEFAULT
+
+    # El tipo queda en la versión publicada
+    recargado = _modelo('keras')
+    assert recargado.version_modelo == resumen['version_modelo']
+    assert recargado.models_den[99]['hiperparametros'] == modelo_PREDICCION.HIPERPARAMETROS_DEFAULT
+    assert 99 in recargado.predecir_mes(2025, 6)['denuncias']
+
+
+def test_reentrenamiento_incremental_anio_parcial(entorno_modelo, monkeypatch):
+    pytest.importorskip('tensorflow')
+    import shutil
+
+    for carpeta in ('MODEL_DIR', 'DATA_DIR'):
+        destino = entorno_modelo / carpeta
+        shutil.copytree(os.path.join(RAIZ, getattr(modelo_PREDICCION, carpeta)), destino)
+        monkeypatch.setattr(modelo_PREDICCION, carpeta, str(destino))
+
+    modelo = _modelo('keras')
+    anteriores = {prefijo: len(serie) for prefijo, serie in (('den', modelo.den_monthly), ('eme', modelo.eme_monthly))}
+
+    # 2025-01..03 con los conteos de 2024; la denuncia 12 no tiene incidencias
+    partes = []
+    for serie, columna in ((modelo.den_monthly, 'id_denuncia'), (modelo.eme_monthly, 'id_numero_emergencia')):
+        for fila in serie[(serie['year'] == 2024) & (serie['month'] <= 3)].itertuples():
+            tipo_id = getattr(fila, columna)
+            if (columna, tipo_id) != ('id_denuncia', 12):
+                partes.append(pd.DataFrame({'fecha': f'2025-{fila.month:02d}-15', columna: [tipo_id] * fila.count}))
+    csv_path = entorno_modelo / 'nuevos.csv'
+    (pd.concat(partes, ignore_index=True)
+     .reindex(columns=['fecha', 'id_denuncia', 'id_numero_emergencia'])
+     .to_csv(csv_path, index=False))
+
+    resumen = modelo.reentrenar_incremental(str(csv_path), epochs=1, tolerancia=float('inf'))
+
+    assert resumen['meses_nuevos'] == 3
+    assert len(modelo.den_monthly) == anteriores['den'] + 3 * 12
+    assert len(modelo.eme_monthly) == anteriores['eme'] + 3 * 6
+    assert list(modelo.den_monthly['trend']) == list(range(len(modelo.den_monthly)))
+    sin_incidencias = modelo.den_monthly[(modelo.den_monthly['year'] == 2025) & (modelo.den_monthly['id_denuncia'] == 12)]
+    assert list(sin_incidencias['count']) == [0, 0, 0]
+
+    for info in list(modelo.models_den.values()) + list(modelo.models_eme.values()):
+        assert (info['estado']['ultimo_year'], info['estado']['ultimo_month']) == (2025, 3)
+        assert modelo._meses_pendientes(info['estado'], 2025, 5) == [(2025, 4), (2025, 5)]
+
+    with pytest.raises(ValueError):
+        modelo.predecir_mes(2025, 3)
+    prediccion = modelo.predecir_mes(2025, 4)
+    assert set(prediccion['denuncias']) == set(modelo.models_den)
+    assert _modelo('numpy').predecir_mes(2025, 4) == prediccion
@@ -0,0 +1,352 @@
+# test_services.py
+"""
+Pruebas de los servicios de la aplicación
+Ejecutar: python -m pytest tests/test_services.py
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from models import modelo_PREDICCION
+from services.entrenamiento_service import EntrenamientoService, EntrenamientoEnCurso
+
+
+def _esperar_fin(servicio, id_trabajo, limite=30):
+    for _ in range(limite * 20):
+        trabajo = servicio.obtener(id_trabajo)
+        if trabajo['estado'] not in ('en_cola', 'en_curso'):
+            return trabajo
+        time.sleep(0.05)
+    raise AssertionError(f'El trabajo {id_trabajo} no terminó')
+
+
+@pytest.fixture
+def entrenamiento_simulado(tmp_path, monkeypatch):
+    """Reemplaza el entrenamiento real (minutos) por uno que solo reporta progreso"""
+    monkeypatch.setattr(modelo_PREDICCION, 'CACHE_DIR', str(tmp_path / 'cache'))
+    continuar = threading.Event()
+
+    def entrenar_modelos(self, csv_path, n_procesos=1, epochs=300, progreso=None, **opciones):
+        tipos = [('den', 1), ('den', 2), ('eme', 1)]
+        progreso('inicio', {'tipos': tipos})
+        for prefijo, tipo_id in tipos:
+            continuar.wait(5)
+            progreso('tipo_completado', {'prefijo': prefijo, 'tipo_id': tipo_id, 'segundos': 0.1,
+                                         'metrics': {'mae': 1.0, 'rmse': 2.0}})
+        if csv_path == 'falla.csv':
+            raise RuntimeError('dataset inválido')
+        self.version_modelo = 'nueva'
+
+    monkeypatch.setattr(modelo_PREDICCION.ModeloPrediccionIncidencias, 'entrenar_modelos', entrenar_modelos)
+    return continuar
+
+
+def test_entrenamiento_en_segundo_plano(tmp_path, entrenamiento_simulado):
+    servicio = EntrenamientoService(str(tmp_path / 'trabajos'))
+    completados = []
+
+    trabajo = servicio.iniciar('datos.csv', al_completar=completados.append)
+    assert trabajo['estado'] in ('en_cola', 'en_curso')
+
+    # Un solo trabajo a la vez, también desde otra instancia (otro proceso)
+    with pytest.raises(EntrenamientoEnCurso):
+        servicio.iniciar('datos.csv')
+    with pytest.raises(EntrenamientoEnCurso):
+        EntrenamientoService(str(tmp_path / 'trabajos')).iniciar('datos.csv')
+
+    entrenamiento_simulado.set()
+    final = _esperar_fin(servicio, trabajo['id_trabajo'])
+
+    assert final['estado'] == 'completado'
+    assert final['version_modelo'] == 'nueva'
+    assert final['progreso']['completados'] == final['progreso']['total'] == 3
+    assert final['tipos']['eme_1']['metrics'] == {'mae': 1.0, 'rmse': 2.0}
+    assert len(completados) == 1
+
+    # Otro proceso lee el estado desde disco
+    assert EntrenamientoService(str(tmp_path / 'trabajos')).obtener(trabajo['id_trabajo'])['estado'] == 'completado'
+
+
+def test_entrenamiento_fallido_no_activa_modelos(tmp_path, entrenamiento_simulado):
+    servicio = EntrenamientoService(str(tmp_path / 'trabajos'))
+    completados = []
+    entrenamiento_simulado.set()
+
+    trabajo = servicio.iniciar('falla.csv', al_completar=completados.append)
+    final = _esperar_fin(servicio, trabajo['id_trabajo'])
+
+    assert final['estado'] == 'error'
+    assert 'dataset inválido' in final['error']
+    assert completados == []
+
+    # El lock quedó libre
+    otro = servicio.iniciar('datos.csv')
+    assert _esperar_fin(servicio, otro['id_trabajo'])['estado'] == 'completado'
+
+
+def test_precalculo_horizonte(tmp_path, monkeypatch):
+    import types
+    from services.precalculo_service import PrecalculoService
+
+    monkeypatch.chdir(RAIZ)
+    monkeypatch.setattr(modelo_PREDICCION, 'CACHE_DIR', str(tmp_path / 'cache'))
+
+    # Distribución por sectores sin base de datos: un solo sector con todo
+    espacial = types.ModuleType('models.modelo_PREDICCION_ESPACIAL')
+    espacial.modelo_espacial = types.SimpleNamespace(predecir_sectores=lambda prediccion, incluir_detalles=True: [
+        {'id_sector': 1, 'total': sum(prediccion['denuncias'].values()) + sum(prediccion['emergencias'].values()),
+         'detalles': incluir_detalles}
+    ])
+    monkeypatch.setitem(sys.modules, 'models.modelo_PREDICCION_ESPACIAL', espacial)
+
+    modelo = modelo_PREDICCION.ModeloPrediccionIncidencias(motor_inferencia='numpy')
+    modelo.limpiar_cache()
+    modelo.cargar_modelos()
+    servicio = PrecalculoService(horizonte=6)
+
+    # Se registra y arranca en segundo plano con el modelo ya cargado
+    servicio.registrar(modelo)
+    for _ in range(600):
+        if servicio.estado()['estado'] == 'completado':
+            break
+        time.sleep(0.05)
+    estado = servicio.estado()
+
+    assert estado['version_modelo'] == modelo.version_modelo
+    assert (estado['desde'], estado['hasta']) == ('2025-01', '2025-06')
+    assert estado['cobertura']['predicciones'] == estado['cobertura']['esperadas'] == 6 * 18
+    assert estado['cobertura']['meses_con_sectores'] == 6 and estado['fin'] >= estado['inicio']
+
+    # Medir la cobertura no cuenta aciertos
+    contadores = (modelo.cache_predicciones.aciertos, modelo.cache_predicciones.fallos)
+    servicio._cobertura(modelo, modelo.version_modelo, servicio._meses((2025, 1)), None, 6)
+    assert (modelo.cache_predicciones.aciertos, modelo.cache_predicciones.fallos) == contadores
+
+    # Las solicitudes del horizonte ya no calculan nada
+    modelo._predecir_paso = None
+    prediccion = modelo.predecir_mes(2025, 6)
+    total = sum(prediccion['denuncias'].values()) + sum(prediccion['emergencias'].values())
+    assert servicio.sectores(modelo.version_modelo, 2025, 6) == [{'id_sector': 1, 'total': total, 'detalles': True}]
+
+    # La variante pedida, y una copia: modificarla no altera la precalculada
+    sin_detalles = servicio.sectores(modelo.version_modelo, 2025, 6, incluir_detalles=False)
+    assert sin_detalles == [{'id_sector': 1, 'total': total, 'detalles': False}]
+    sin_detalles[0]['total'] = -1
+    assert servicio.sectores(modelo.version_modelo, 2025, 6, incluir_detalles=False)[0]['total'] == total
+    assert servicio._programar in modelo.al_activar_version
+
+
+def test_info_modelo_precalculado_con_etag(tmp_path, monkeypatch):
+    from flask import Flask
+    from routes.api.modelo_prediccion import prediccion_bp
+    from services.info_modelo_service import servicio_info_modelo
+
+    monkeypatch.chdir(RAIZ)
+    monkeypatch.setattr(modelo_PREDICCION, 'CACHE_DIR', str(tmp_path / 'cache'))
+    modelo = modelo_PREDICCION.ModeloPrediccionIncidencias(motor_inferencia='numpy', carga_diferida=True)
+    modelo.cargar_modelos()
+    servicio_info_modelo.registrar(modelo)
+
+    app = Flask(__name__)
+    app.modelo = modelo
+    app.register_blueprint(prediccion_bp, url_prefix='/api/modelo/prediccion')
+    cliente = app.test_client()
+
+    respuesta = cliente.get('/api/modelo/prediccion/info')
+    etag = respuesta.headers['ETag']
+    assert respuesta.status_code == 200 and len(respuesta.json['data']['precision_por_tipo']['denuncias']) == 12
+
+    # Mismo contenido: 304 sin recalcular
+    with monkeypatch.context() as parche:
+        parche.setattr('services.info_modelo_service.construir_info', None)
+        respuesta = cliente.get('/api/modelo/prediccion/info', headers={'If-None-Match': etag})
+    assert respuesta.status_code == 304 and respuesta.headers['ETag'] == etag and not respuesta.data
+
+    # Otra versión activa: el resumen se recalcula y cambia el ETag
+    modelo.version_modelo = 'otra'
+    respuesta = cliente.get('/api/modelo/prediccion/info', headers={'If-None-Match': etag})
+    assert respuesta.status_code == 200 and respuesta.headers['ETag'] != etag
+
+
+class _ConexionIncidencias:
+    """Tabla incidencia en memoria con la misma interfaz que la conexión pymysql (DictCursor)"""
+
+    def __init__(self, filas):
+        self.filas = filas
+        self.consultas = []
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, consulta, parametros):
+        self.consultas.append((consulta.split()[1], parametros))
+        if 'MIN(id_incidencia)' in consulta:
+            ids = [f['id_incidencia'] for f in self.filas if f['fecha'] >= parametros[0]]
+            self._resultado = [{'id_incidencia': min(ids, default=None)}]
+        elif 'MAX(id_incidencia)' in consulta:
+            self._resultado = [{'id_incidencia': max((f['id_incidencia'] for f in self.filas), default=None)}]
+        else:
+            marca, limite = parametros
+            self._resultado = [f for f in self.filas if f['id_incidencia'] > marca][:limite]
+
+    def fetchall(self):
+        return self._resultado
+
+    def fetchone(self):
+        return self._resultado[0]
+
+    def close(self):
+        pass
+
+
+def test_monitor_deriva_incremental(tmp_path, monkeypatch):
+    pytest.importorskip('tensorflow')
+    import shutil
+    from datetime import date
+    import pandas as pd
+    from services import entrenamiento_service
+    from services.deriva_service import DerivaService
+
+    monkeypatch.chdir(RAIZ)
+    monkeypatch.setattr(modelo_PREDICCION, 'CACHE_DIR', str(tmp_path / 'cache'))
+    for carpeta in ('MODEL_DIR', 'DATA_DIR'):
+        shutil.copytree(getattr(modelo_PREDICCION, carpeta), tmp_path / carpeta)
+        monkeypatch.setattr(modelo_PREDICCION, carpeta, str(tmp_path / carpeta))
+    servicio_entrenamiento = EntrenamientoService(directorio=str(tmp_path / 'trabajos'))
+    monkeypatch.setattr(entrenamiento_service, 'servicio_entrenamiento', servicio_entrenamiento)
+
+    modelo = modelo_PREDICCION.ModeloPrediccionIncidencias(motor_inferencia='numpy', carga_diferida=True)
+    modelo.cargar_modelos()
+    version_inicial = modelo.version_modelo
+    pronostico = {(p['year'], p['month']): p for p in modelo.predecir_trayectoria((2025, 1), 4)}
+
+    # Incidencias ya incluidas en el histórico: la primera ingesta no las lee
+    filas = [{'id_incidencia': i + 1, 'fecha': date(2024, 12, 20), 'id_denuncia': 1, 'id_numero_emergencia': None}
+             for i in range(50)]
+
+    # Incidencias reales iguales al pronóstico, salvo la denuncia 1 (+300 por mes)
+    def registrar_mes(year, month):
+        for familia, columna, otra in (('denuncias', 'id_denuncia', 'id_numero_emergencia'),
+                                       ('emergencias', 'id_numero_emergencia', 'id_denuncia')):
+            for tipo_id, cantidad in pronostico[(year, month)][familia].items():
+                cantidad += 300 if (familia, tipo_id) == ('denuncias', 1) else 0
+                for _ in range(cantidad):
+                    filas.append({'id_incidencia': len(filas) + 1, 'fecha': date(year, month, 15),
+                                  columna: tipo_id, otra: None})
+
+    for month in (1, 2, 3):
+        registrar_mes(2025, month)
+    conexion = _ConexionIncidencias(filas)
+
+    servicio = DerivaService(directorio=str(tmp_path / 'deriva'), tamano_lote=1000, obtener_conexion=lambda: conexion)
+    estado = servicio.ejecutar(modelo, hoy=date(2025, 4, 10))
+    informe = estado['informe']
+
+    # Marca inicial por índice (primera incidencia desde 2025-01) y luego solo rangos por clave primaria
+    assert conexion.consultas[0] == ('MIN(id_incidencia)', (date(2025, 1, 1),))
+    assert conexion.consultas[1] == ('id_incidencia,', (50, 1000))
+    assert estado['marca_agua'] == len(filas) and informe['filas_nuevas'] == len(filas) - 50
+    assert informe['meses'] == ['2025-01', '2025-02', '2025-03']
+    assert informe['tipos_con_deriva'] == ['den_1']
+    assert informe['denuncias']['1']['mae'] == 300 and informe['emergencias']['2']['mae'] == 0
+
+    # Reentrenamiento incremental real con el dataset reconstruido desde los conteos
+    exportado = pd.read_csv(tmp_path / 'deriva' / 'incidencias_mensuales.csv')
+    assert len(exportado) == len(filas) - 50 and exportado['fecha'].iloc[-1] == '2025-03-01'
+    trabajo = _esperar_fin(servicio_entrenamiento, estado['reentrenamiento']['id_trabajo'], limite=900)
+    assert trabajo['estado'] == 'completado', trabajo['error']
+    assert trabajo['resumen']['meses_nuevos'] == 3
+
+    # El modelo recargado pronostica desde 2025-04, el siguiente mes abierto
+    assert modelo.version_modelo == trabajo['version_modelo'] != version_inicial
+    info = modelo.models_den[1]
+    assert (info['estado']['ultimo_year'], info['estado']['ultimo_month']) == (2025, 3)
+    assert modelo._meses_pendientes(info['estado'], 2025, 5) == [(2025, 4), (2025, 5)]
+    with pytest.raises(ValueError):
+        modelo.predecir_mes(2025, 3)
+    assert set(modelo.predecir_mes(2025, 4)['denuncias']) == set(modelo.models_den)
+
+    # Solo se leen las filas nuevas; tras el reentrenamiento se evalúan los meses posteriores
+    marca = estado['marca_agua']
+    conexion.consultas.clear()
+    registrar_mes(2025, 4)
+    estado = servicio.ejecutar(modelo, hoy=date(2025, 5, 2))
+
+    assert conexion.consultas[0] == ('id_incidencia,', (marca, 1000))
+    assert estado['informe']['filas_nuevas'] == len(filas) - marca
+    assert estado['informe']['meses'] == ['2025-04'] and estado['informe']['tipos_con_deriva'] == []
+    assert servicio.estado()['informe'] == estado['informe']
+
+    # 2025-04 se compara con el pronóstico servido antes del reentrenamiento, no con el del modelo nuevo
+    assert estado['informe']['denuncias']['1']['predichos'] == [pronostico[(2025, 4)]['denuncias'][1]]
+    assert estado['informe']['denuncias']['1']['mae'] == 300 and estado['informe']['emergencias']['2']['mae'] == 0
+
+    # La misma versión no se reentrena dos veces
+    solicitado = {'version_modelo': modelo.version_modelo, 'id_trabajo': 'x1'}
+    assert servicio._reentrenar(modelo, {'reentrenamiento': solicitado}, estado['informe'], [])['estado'] == 'ya_solicitado'
+
+
+def test_monitor_deriva_meses_sin_incidencias(tmp_path, monkeypatch):
+    """Los meses cerrados sin filas cuentan como cero y el dataset de reentrenamiento no tiene huecos"""
+    from datetime import date
+    import pandas as pd
+    from services import entrenamiento_service
+    from services.deriva_service import DerivaService
+
+    monkeypatch.chdir(RAIZ)
+    monkeypatch.setattr(modelo_PREDICCION, 'CACHE_DIR', str(tmp_path / 'cache'))
+    modelo = modelo_PREDICCION.ModeloPrediccionIncidencias(motor_inferencia='numpy', carga_diferida=True)
+    modelo.cargar_modelos()
+
+    solicitudes = []
+
+    class Entrenamiento:
+        def iniciar(self, csv_path, **opciones):
+            solicitudes.append(csv_path)
+            return {'id_trabajo': 'x1'}
+
+    monkeypatch.setattr(entrenamiento_service, 'servicio_entrenamiento', Entrenamiento())
+
+    # El histórico termina en 2024-12 y no hay incidencias hasta 2026-01
+    filas = [{'id_incidencia': i + 1, 'fecha': date(2026, 1 + i % 3, 10), 'id_denuncia': 1, 'id_numero_emergencia': None}
+             for i in range(600)]
+    conexion = _ConexionIncidencias(filas)
+    servicio = DerivaService(directorio=str(tmp_path / 'deriva'), umbral=0.01, obtener_conexion=lambda: conexion)
+    informe = servicio.ejecutar(modelo, hoy=date(2026, 4, 10))['informe']
+
+    pronostico = modelo.predecir_trayectoria((2025, 10), 6)
+    assert informe['meses'] == ['2025-10', '2025-11', '2025-12', '2026-01', '2026-02', '2026-03']
+    assert informe['denuncias']['1']['reales'] == [0, 0, 0, 200, 200, 200]
+    assert informe['denuncias']['1']['predichos'] == [p['denuncias'][1] for p in pronostico]
+    assert informe['emergencias']['1']['reales'] == [0] * 6
+
+    # El dataset exportado cubre 2025-01..2026-03; los meses vacíos llevan una fila sin tipo
+    exportado = pd.read_csv(solicitudes[0])
+    assert exportado['fecha'].nunique() == 15 and len(exportado) == 600 + 12
+    assert exportado.loc[exportado['fecha'] < '2026', ['id_denuncia', 'id_numero_emergencia']].isna().all().all()
+
+    den_monthly, meses_den, eme_monthly, meses_eme = modelo._series_extendidas(solicitudes[0])
+    assert meses_den == meses_eme == 15
+    nuevos = den_monthly[den_monthly['year'] >= 2025]
+    assert nuevos[nuevos['year'] == 2025]['count'].sum() == 0
+    assert list(nuevos[nuevos['id_denuncia'] == 1]['count'].iloc[-3:]) == [200, 200, 200]
+    assert list(den_monthly['trend']) == list(range(len(den_monthly)))
+
+    # Sin los meses de 2025 el reentrenamiento se rechaza en lugar de pegar 2026 tras 2024-12
+    hueco = tmp_path / 'hueco.csv'
+    exportado[exportado['fecha'] >= '2026'].to_csv(hueco, index=False)
+    with pytest.raises(ValueError):
+        modelo._series_extendidas(str(hueco))